@@ -0,0 +1,230 @@
+"""Process-pool backend for analyze_image with warm MediaPipe workers.
+
+Workers are spawned (never forked, MediaPipe graphs are not fork-safe),
+import image_analysis once in their initializer and run a warm-up pass, so
+every later task only pays for the analysis itself. Upload bytes are handed
+over through multiprocessing shared memory instead of being pickled through
+the executor's pipe. The result cache stays in the serving process, so all
+workers share it and its stats cover the whole pool. A timed-out or crashed
+analysis retires its pool through recover(): new work goes to a fresh one.
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import (
+    CancelledError, Future, InvalidStateError, ProcessPoolExecutor, TimeoutError as FutureTimeoutError)
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import config
+from image_analysis import get_content_hash, result_cache, result_cache_key
+from readiness import registry
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _init_worker():
+    """Load MediaPipe once per worker process and warm the graphs up"""
+    import numpy as np
+
+    # Each worker runs one analysis at a time, so one graph bundle is enough
+    config.MODEL_POOL_SIZE = 1
+    # Request scopes don't cross the process boundary, so in JSON mode the
+    # workers keep only warnings and errors
+    import log_config
+    log_config.configure_logging(background_detail=False)
+    import image_analysis
+
+    blank = np.zeros((256, 256, 3), dtype=np.uint8)
+    try:
+        with image_analysis.get_model_pool().checkout() as models:
+            models.pose.process(blank)
+            models.face_detection.process(blank)
+    except Exception as e:
+        logger.warning("⚠️ Worker warm-up failed: %s", e)
+
+
+def _ping():
+    return True
+
+
+def _analyze_shared(shm_name, size, reduction, profile, content_hash=None):
+    """Worker entry point: analyze the upload stored in shared memory shm_name"""
+    import image_analysis
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    view = shm.buf[:size]
+    try:
+        return image_analysis.analyze_image(view, reduction, profile, content_hash, use_cache=False)
+    finally:
+        view.release()
+        shm.close()
+
+
+def pool_size():
+    return config.ANALYSIS_WORKERS or multiprocessing.cpu_count()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = pool_size()
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker)
+            logger.info("🧵 Started analysis process pool with %s worker(s)", workers)
+        return _executor
+
+
+def _terminate(processes):
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+
+def recover(executor=None, crashed=False):
+    """Retire a pool (the current one by default) after a timed-out or crashed analysis.
+
+    Later submissions start a fresh pool. A crashed pool is shut down
+    straight away; after a timeout, tasks already in the old pool get
+    ANALYSIS_TIMEOUT seconds to finish before its workers are terminated,
+    which fails whatever is left with BrokenProcessPool.
+    """
+    global _executor
+    with _executor_lock:
+        if executor is None:
+            executor = _executor
+        if executor is None or _executor is not executor:
+            # Not started, or already replaced
+            return
+        _executor = None
+        # Every child of this process is a pool worker, and the replacement
+        # pool can't start while we hold the lock
+        processes = multiprocessing.active_children()
+    if crashed:
+        executor.shutdown(wait=False, cancel_futures=True)
+        return
+    logger.warning("♻️ Recycling the analysis process pool after a timeout")
+    executor.shutdown(wait=False)
+    timer = threading.Timer(config.ANALYSIS_TIMEOUT, _terminate, (processes,))
+    timer.daemon = True
+    timer.start()
+
+
+def start_workers():
+    """Spawn and warm every worker up front instead of on the first requests"""
+    executor = get_executor()
+    futures = [executor.submit(_ping) for _ in range(pool_size())]
+    for future in futures:
+        future.result()
+
+
+def _start_pool():
+    start_workers()
+    return get_executor()
+
+
+# Warm worker pool as a readiness component (only started by the server in process mode)
+workers = registry.register("analysis_workers", _start_pool)
+
+
+def _cached(image_data, reduction, profile, content_hash):
+    """(cache key, cached result or None) for an upload; no key for an unknown profile"""
+    try:
+        key = result_cache_key(content_hash or get_content_hash(image_data), reduction, profile)
+    except ValueError:
+        # The worker reports the unknown profile
+        return None, None
+    result = result_cache.get(key)
+    if result is not None:
+        logger.info("⚡ Cache hit for image hash: %s", key[:8])
+        result["cached"] = True
+    return key, result
+
+
+def _cache_when_done(future, key):
+    """Future that completes after future's result has been put in the result cache"""
+    cached = Future()
+
+    def _store(future):
+        try:
+            result = future.result()
+        except CancelledError:
+            cached.cancel()
+            return
+        except BaseException as e:
+            try:
+                cached.set_exception(e)
+            except InvalidStateError:
+                pass
+            return
+        if "error" not in result:
+            # As analyze_image caches it: without this request's stage timings
+            result_cache.set(key, {k: v for k, v in result.items() if k != "stage_seconds"})
+        try:
+            cached.set_result(result)
+        except InvalidStateError:
+            # Cancelled by the caller in the meantime
+            pass
+
+    # Cancelling the returned future cancels the task if it hasn't started
+    cached.add_done_callback(lambda done: future.cancel() if done.cancelled() else None)
+    future.add_done_callback(_store)
+    return cached
+
+
+def submit_analysis(image_data, reduction=None, profile=None, executor=None, content_hash=None):
+    """Submit an upload to the process pool and return a Future of the analysis result.
+
+    Cached uploads get an already completed Future without reaching a worker.
+    """
+    key, result = _cached(image_data, reduction, profile, content_hash)
+    if result is not None:
+        done = Future()
+        done.set_result(result)
+        return done
+    executor = executor or get_executor()
+    shm = shared_memory.SharedMemory(create=True, size=max(1, len(image_data)))
+    shm.buf[:len(image_data)] = image_data
+
+    def _release(_future):
+        shm.close()
+        shm.unlink()
+
+    try:
+        future = executor.submit(_analyze_shared, shm.name, len(image_data), reduction, profile, content_hash)
+    except Exception:
+        _release(None)
+        raise
+    future.add_done_callback(_release)
+    return _cache_when_done(future, key) if key is not None else future
+
+
+def analyze_image_in_worker(image_data, reduction=None, profile=None, timeout=None, content_hash=None):
+    """Run analyze_image in the process pool, waiting at most timeout seconds"""
+    timeout = config.ANALYSIS_TIMEOUT if timeout is None else timeout
+    executor = get_executor()
+    try:
+        future = submit_analysis(image_data, reduction, profile, executor, content_hash)
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        logger.error("❌ Analysis timed out after %ss", timeout)
+        recover(executor)
+        return {"error": "Analysis timed out", "timeout": True}
+    except BrokenProcessPool as e:
+        logger.error("❌ Analysis worker crashed: %s", e)
+        recover(executor, crashed=True)
+        return {"error": "Analysis worker crashed"}
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True, cancel_futures=True)
+            _executor = None
@@ -1,17 +1,34 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-from image_analysis import analyze_image
-from recommed_outfits import recommend_outfits
+from werkzeug.exceptions import RequestEntityTooLarge
+from image_analysis import result_cache, mediapipe_models, get_pose_profile, POSE_PROFILES
+from recommed_outfits import model_versions
+from readiness import registry
+from catalogue_cache import CatalogueCache
+from upload_ingest import MULTIPART_SLACK, UploadRejected, check_content_length, read_upload
+from video_stream import SessionLimitError, sessions as stream_sessions
+import handlers
+from handlers import profile_latency
 from datetime import datetime
+from functools import partial
+import hmac
+import json
 import logging
 from pymongo import MongoClient
-import sys
+import tarfile
+import zipfile
+import config
+import log_config
+import metrics
+import time
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG, stream=sys.stdout)
+log_config.configure_logging()
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+# Werkzeug refuses larger bodies while reading them, chunked ones included,
+# so request.files never spools more than one upload's worth
+app.config['MAX_CONTENT_LENGTH'] = config.MAX_UPLOAD_BYTES + MULTIPART_SLACK if config.MAX_UPLOAD_BYTES else None
 
 # Enable CORS for all routes and origins - more permissive configuration
 CORS(app, 
@@ -20,14 +37,88 @@ CORS(app,
      allow_headers=["Content-Type", "Authorization"],
      supports_credentials=False)
 
-# MongoDB connection
-try:
-    client = MongoClient('')
-    db = client['']
-    logger.debug("MongoDB connection established to fashiondb")
-except Exception as e:
-    logger.error(f"Failed to connect to MongoDB: {e}")
-    db = None
+# MongoDB connection and the read-through cache in front of the outfits
+# collection, both set up by startup()
+db = None
+catalogue_cache = None
+
+def connect_database():
+    global db, catalogue_cache
+    try:
+        client = MongoClient(config.MONGO_URI)
+        db = client[config.MONGO_DB]
+        logger.debug("MongoDB connection established to fashiondb")
+    except Exception as e:
+        logger.error("Failed to connect to MongoDB: %s", e)
+        db = None
+    catalogue_cache = CatalogueCache(
+        db['outfits'] if db is not None else None,
+        max_entries=config.CATALOGUE_CACHE_SIZE,
+        ttl_seconds=config.CATALOGUE_CACHE_TTL)
+    handlers.register_cache_metrics(catalogue_cache)
+
+def preload_catalogue():
+    if not config.CATALOGUE_PRELOAD or db is None:
+        return 0
+    try:
+        return catalogue_cache.preload()
+    except Exception as e:
+        # A cold cache only costs latency; don't hold readiness hostage to MongoDB
+        logger.error("Catalogue preload failed: %s", e)
+        return 0
+
+catalogue = registry.register("catalogue", preload_catalogue)
+READY_COMPONENTS = handlers.analysis_components() + [catalogue.name]
+
+def startup():
+    """Connect to MongoDB and start loading the heavy components.
+
+    Not done at import time: spawned analysis workers import this module
+    again as __mp_main__ and must not connect, load models or start pools.
+    """
+    connect_database()
+    # Load in the background so the server accepts connections immediately;
+    # /ready reports when they are warm
+    registry.start(READY_COMPONENTS)
+    model_versions.start_watching(config.MODEL_WATCH_INTERVAL)
+
+@app.before_request
+def start_request_log():
+    g.request_started = time.perf_counter()
+    g.request_id, g.log_token = log_config.start_request(request.headers.get('X-Request-ID'))
+
+def finish_streamed_request(method, path, status, started, request_id, token):
+    log_config.log_request(method, path, status, started, request_id)
+    log_config.end_request(token)
+
+@app.after_request
+def log_request_summary(response):
+    if 'request_id' in g:
+        response.headers['X-Request-ID'] = g.request_id
+        if response.is_streamed:
+            # The body is produced after this hook returns: keep the logging
+            # scope open and log the summary once it has been sent
+            response.call_on_close(partial(
+                finish_streamed_request, request.method, request.path, response.status_code,
+                g.request_started, g.request_id, g.pop('log_token')))
+        else:
+            log_config.log_request(request.method, request.path, response.status_code, g.request_started)
+    return response
+
+@app.teardown_request
+def end_request_log(exc):
+    # Runs again when a streamed response's generator finishes; the token
+    # is only reset once
+    token = g.pop('log_token', None)
+    if token is not None:
+        log_config.end_request(token)
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    logger.error("Upload rejected: request body over the size limit")
+    response = jsonify({"error": f"Request body exceeds {request.max_content_length} bytes"})
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    return response, 413
 
 # Add a test endpoint to verify server is running
 @app.route('/health', methods=['GET', 'OPTIONS'])
@@ -46,14 +137,95 @@ def health_check():
         "status": "Server is running", 
         "port": 5001,
         "timestamp": datetime.now().isoformat(),
-        "mongodb_connected": db is not None
+        "mongodb_connected": db is not None,
+        "result_cache": result_cache.stats(),
+        "model_pool": mediapipe_models.value.stats() if mediapipe_models.ready else None,
+        "catalogue_cache": catalogue_cache.stats()
     }
     
     response = jsonify(response_data)
     response.headers.add('Access-Control-Allow-Origin', '*')
     return response
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    ready = registry.is_ready(READY_COMPONENTS)
+    response = jsonify({
+        "ready": ready,
+        "components": registry.status(READY_COMPONENTS)
+    })
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    return response, 200 if ready else 503
+
+def admin_denied():
+    """Error response for a request to an admin endpoint, or None when it may proceed"""
+    if not config.ADMIN_TOKEN:
+        # Without a token there is nothing to authenticate against, and the
+        # client address can't be trusted behind a proxy
+        return jsonify({"error": "Admin endpoints are disabled"}), 404
+    token = request.headers.get('X-Admin-Token', '')
+    if not hmac.compare_digest(token.encode(), config.ADMIN_TOKEN.encode()):
+        return jsonify({"error": "Forbidden"}), 403
+    return None
+
+@app.route('/admin/reload', methods=['POST'])
+def reload_models():
+    denied = admin_denied()
+    if denied:
+        return denied
+    if request.args.get('wait') == '1':
+        new_version = model_versions.reload(reason="admin request")
+        status_code = 200 if new_version is not None else 500
+    else:
+        started = model_versions.reload_async(reason="admin request")
+        status_code = 202 if started else 409
+    logger.info("Model reload requested via admin endpoint: %s", status_code)
+    return jsonify(model_versions.status()), status_code
+
+@app.route('/admin/catalogue/invalidate', methods=['POST'])
+def invalidate_catalogue():
+    denied = admin_denied()
+    if denied:
+        return denied
+    outfit_ids = (request.get_json(silent=True) or {}).get('outfit_ids')
+    if outfit_ids is not None and not isinstance(outfit_ids, list):
+        return jsonify({"error": "outfit_ids must be a list"}), 400
+    catalogue_cache.invalidate(outfit_ids)
+    logger.info("Catalogue cache invalidated: %s", outfit_ids if outfit_ids is not None else 'all')
+    return jsonify(catalogue_cache.stats()), 200
+
+@app.route('/model_version', methods=['GET'])
+def model_version():
+    response = jsonify(model_versions.status())
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    return response
+
+@app.route('/profiles', methods=['GET'])
+def list_profiles():
+    response = jsonify({
+        "default": get_pose_profile().name,
+        "profiles": {
+            name: dict(profile._asdict(), latency=profile_latency.summary(name))
+            for name, profile in POSE_PROFILES.items()
+        }
+    })
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    if not metrics.ENABLED:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    response = jsonify(result_cache.stats())
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    return response
+
 @app.route('/analyze_image', methods=['POST', 'OPTIONS'])
+@metrics.instrumented('analyze_image')
 def analyze_image_endpoint():
     # Handle preflight OPTIONS request
     if request.method == 'OPTIONS':
@@ -65,6 +237,13 @@ def analyze_image_endpoint():
         
     logger.info("Received analyze_image request")
     
+    try:
+        # Refuse oversized bodies before Werkzeug parses the form
+        check_content_length(request.content_length)
+    except UploadRejected as e:
+        logger.error("Upload rejected: %s", e)
+        return jsonify({"error": str(e)}), e.status
+
     if 'image' not in request.files:
         logger.error("No image file provided in request")
         return jsonify({"error": "No image file provided"}), 400
@@ -75,77 +254,182 @@ def analyze_image_endpoint():
         return jsonify({"error": "No file selected"}), 400
 
     try:
-        image_data = file.read()
-        if not image_data or len(image_data) == 0:
-            logger.error("Image data is empty or invalid")
-            return jsonify({"error": "Invalid or empty image data"}), 400
+        # Hashed chunk by chunk; undersized, oversized or junk images are
+        # refused from their header before anything is decoded
+        image_data, content_hash = read_upload(file.stream)
+    except UploadRejected as e:
+        logger.error("Upload rejected: %s", e)
+        return jsonify({"error": str(e)}), e.status
     except Exception as e:
-        logger.error(f"Failed to read image file: {e}")
+        logger.error("Failed to read image file: %s", e)
         return jsonify({"error": "Failed to process image"}), 400
 
-    logger.debug(f"Received image file: {file.filename}, content length: {len(image_data)} bytes")
+    logger.debug("Received image file: %s, content length: %s bytes", file.filename, len(image_data))
+
+    try:
+        profile = handlers.resolve_profile(request.args.get('profile'))
+    except ValueError as e:
+        logger.error("Invalid profile requested: %s", e)
+        return jsonify({"error": str(e)}), 400
 
-    result = analyze_image(image_data)
-    if "error" in result:
-        logger.error(f"Image analysis failed: {result['error']}")
-        return jsonify({
-            "features": {
-                "body_type": "unclassified", 
-                "skin_tone": "neutral", 
-                "face_shape": "unclassified"
-            }, 
-            "error": result["error"]
-        }), 400
+    result = handlers.run_analysis(image_data, profile, content_hash)
+    error = handlers.analysis_error(result)
+    if error is not None:
+        body, status_code, headers = error
+        response = jsonify(body)
+        response.headers.add('Access-Control-Allow-Origin', '*')
+        for name, value in headers.items():
+            response.headers.add(name, value)
+        return response, status_code
 
     features = result
-    outfits = recommend_outfits(features)
+    outfits, model_version = handlers.recommend(features)
 
     if db is not None:
-        try:
-            collection = db['outfits']
-            outfit_ids = [outfit.get('outfit_id') for outfit in outfits if 'outfit_id' in outfit]
-            if outfit_ids:
-                mongo_outfits = list(collection.find({"outfit_id": {"$in": outfit_ids}}))
-                if mongo_outfits:
-                    outfits = [
-                        {
-                            'outfit_id': outfit['outfit_id'],
-                            'top': outfit['top']['name'],
-                            'top_color': outfit['top']['color'],
-                            'bottom': outfit['bottom']['name'],
-                            'bottom_color': outfit['bottom']['color'],
-                            'occasion': outfit['occasion'],
-                            'total_price': outfit.get('total_price', 0),
-                            'top_image_url': outfit['top'].get('image_url', ''),
-                            'bottom_image_url': outfit['bottom'].get('image_url', '')
-                        }
-                        for outfit in mongo_outfits
-                    ]
-                    logger.debug(f"Fetched outfits: {outfits}")
-                else:
-                    logger.warning("No matches found in MongoDB for outfit_ids")
-            else:
-                logger.warning("No outfit_ids in predicted outfits")
-        except Exception as e:
-            logger.error(f"MongoDB query or transformation failed: {e}")
-            outfits = []
+        outfits = handlers.enrich_outfits(outfits, catalogue_cache.get_many)
 
-    response_data = {
-        "features": features,
-        "image_path": f"uploads/image_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg",
-        "outfits": outfits
-    }
+    response_data = handlers.build_response(features, outfits, model_version)
 
-    logger.info(f"Response prepared: {response_data}")
+    logger.debug("Response prepared: %s", response_data)
     
     try:
         response = jsonify(response_data)
         response.headers.add('Access-Control-Allow-Origin', '*')
         return response, 200
     except Exception as e:
-        logger.error(f"JSON serialization failed: {e}")
+        logger.error("JSON serialization failed: %s", e)
         return jsonify({"error": "Internal server error"}), 500
 
+ARCHIVE_TYPES = {
+    'application/zip': 'zip',
+    'application/x-zip-compressed': 'zip',
+    'application/x-tar': 'tar',
+    'application/gzip': 'tar',
+    'application/x-gzip': 'tar',
+}
+
+@app.route('/analyze_images', methods=['POST'])
+@metrics.instrumented('analyze_images')
+def analyze_images_endpoint():
+    logger.info("Received analyze_images request")
+
+    try:
+        profile = handlers.resolve_profile(request.args.get('profile'))
+    except ValueError as e:
+        logger.error("Invalid profile requested: %s", e)
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        check_content_length(request.content_length, limit=config.BATCH_MAX_BYTES)
+    except UploadRejected as e:
+        logger.error("Batch rejected: %s", e)
+        return jsonify({"error": str(e)}), e.status
+    # Also caps chunked bodies, and multipart parsing, at the batch limit
+    request.max_content_length = config.BATCH_MAX_BYTES + MULTIPART_SLACK
+
+    archive_kind = ARCHIVE_TYPES.get(request.mimetype)
+    if archive_kind is not None:
+        items = handlers.iter_archive(request.stream, archive_kind)
+    else:
+        try:
+            uploads = request.files.getlist('images') + request.files.getlist('image')
+        except RequestEntityTooLarge:
+            logger.error("Batch rejected: body over %s bytes", config.BATCH_MAX_BYTES)
+            return jsonify({"error": f"Batch exceeds {config.BATCH_MAX_BYTES} bytes"}), 413
+        if not uploads:
+            logger.error("No images provided in batch request")
+            return jsonify({"error": "Send multipart 'images' files or a zip/tar archive"}), 400
+        # Werkzeug closes the uploaded files once the view returns
+        items = [(upload.filename, upload.read()) for upload in uploads]
+
+    fetch = catalogue_cache.get_many if db is not None else None
+
+    def generate():
+        # Every failure ends the stream on a complete error line
+        try:
+            for line in handlers.analyze_batch(items, profile, fetch):
+                yield json.dumps(line, default=str) + "\n"
+        except (tarfile.TarError, zipfile.BadZipFile) as e:
+            logger.error("Unreadable batch archive: %s", e)
+            yield json.dumps({"error": f"Unreadable archive: {e}", "status": 400}) + "\n"
+        except UploadRejected as e:
+            logger.error("Batch rejected: %s", e)
+            yield json.dumps({"error": str(e), "status": e.status}) + "\n"
+        except RequestEntityTooLarge:
+            logger.error("Batch rejected: body over %s bytes", config.BATCH_MAX_BYTES)
+            yield json.dumps({"error": f"Batch exceeds {config.BATCH_MAX_BYTES} bytes", "status": 413}) + "\n"
+        except Exception as e:
+            logger.error("❌ Batch failed: %s", e)
+            yield json.dumps({"error": "Batch failed", "status": 500}) + "\n"
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    return response
+
+# Live camera / video: open a session, post frames to it one at a time, and
+# get a body back only when the smoothed features (and so the outfits) change
+
+@app.route('/stream/sessions', methods=['POST'])
+def open_stream_session():
+    try:
+        profile = handlers.resolve_profile(request.args.get('profile'))
+    except ValueError as e:
+        logger.error("Invalid profile requested: %s", e)
+        return jsonify({"error": str(e)}), 400
+    try:
+        session = stream_sessions.open(profile)
+    except SessionLimitError as e:
+        logger.warning("⚠️ Stream session refused: %s", e)
+        response = jsonify({"error": "Too many stream sessions, please retry"})
+        response.headers.add('Access-Control-Allow-Origin', '*')
+        response.headers.add('Retry-After', str(config.STREAM_SESSION_TTL))
+        return response, 503
+    response = jsonify(session.stats())
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    return response, 201
+
+@app.route('/stream/sessions/<session_id>/frames', methods=['POST'])
+@metrics.instrumented('stream_frame')
+def push_stream_frame(session_id):
+    session = stream_sessions.get(session_id)
+    if session is None:
+        return jsonify({"error": "Unknown or expired stream session"}), 404
+
+    try:
+        check_content_length(request.content_length)
+        # A raw image body, or a multipart 'frame' file
+        upload = request.files.get('frame')
+        frame_data, _ = read_upload(upload.stream if upload is not None else request.stream)
+    except UploadRejected as e:
+        logger.error("Frame rejected: %s", e)
+        return jsonify({"error": str(e)}), e.status
+
+    timestamp = request.args.get('timestamp', type=float)
+    update = session.push(frame_data, timestamp)
+    if update is None:
+        # Skipped, or the smoothed features did not change
+        response = Response(status=204)
+    elif "error" in update:
+        body, status_code, headers = handlers.stream_error(update)
+        response = jsonify(body)
+        response.status_code = status_code
+        for name, value in headers.items():
+            response.headers.add(name, value)
+    else:
+        fetch = catalogue_cache.get_many if db is not None else None
+        response = jsonify(handlers.stream_response(update, fetch))
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    return response
+
+@app.route('/stream/sessions/<session_id>', methods=['DELETE'])
+def close_stream_session(session_id):
+    stats = stream_sessions.close(session_id)
+    if stats is None:
+        return jsonify({"error": "Unknown or expired stream session"}), 404
+    response = jsonify(stats)
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    return response
+
 if __name__ == '__main__':
     print("=" * 50)
     print("🚀 Starting Fashion Style Analyzer Server")
@@ -153,5 +437,6 @@ if __name__ == '__main__':
     print("🔗 Health check: http://127.0.0.1:5001/health")
     print("🌐 CORS enabled for all origins")
     print("=" * 50)
-    app.run(debug=True, host='0.0.0.0', port=5001)
+    startup()
+    app.run(debug=True, host='0.0.0.0', port=5001, threaded=True)
 
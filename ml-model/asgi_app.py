@@ -0,0 +1,290 @@
+"""ASGI serving path for /analyze_image, sharing its handlers with the Flask app,
+plus the /stream WebSocket for live camera sessions.
+
+Run with: uvicorn asgi_app:app --host 0.0.0.0 --port 5001
+"""
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from fastapi import FastAPI, Request, WebSocket
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+import config
+import handlers
+import log_config
+import metrics
+from catalogue_cache import CatalogueCache
+from image_analysis import result_cache, mediapipe_models
+from readiness import registry
+from recommed_outfits import model_versions
+from upload_ingest import MultipartUpload, UploadReader, UploadRejected, check_content_length
+from video_stream import SessionLimitError, sessions as stream_sessions
+
+log_config.configure_logging()
+logger = logging.getLogger(__name__)
+
+try:
+    from pymongo import AsyncMongoClient
+except ImportError:  # pymongo < 4.9
+    AsyncMongoClient = None
+
+# MongoDB connection; enrichment awaits the async driver when it is available
+# and falls back to the blocking client on the executor otherwise
+try:
+    if AsyncMongoClient is not None:
+        client = AsyncMongoClient(config.MONGO_URI)
+    else:
+        from pymongo import MongoClient
+        client = MongoClient(config.MONGO_URI)
+    db = client[config.MONGO_DB]
+except Exception as e:
+    logger.error("Failed to connect to MongoDB: %s", e)
+    db = None
+
+catalogue_cache = CatalogueCache(
+    db['outfits'] if db is not None else None,
+    max_entries=config.CATALOGUE_CACHE_SIZE,
+    ttl_seconds=config.CATALOGUE_CACHE_TTL)
+
+handlers.register_cache_metrics(catalogue_cache)
+
+# Blocking work (analysis in thread mode, recommendation, sync MongoDB) runs
+# here; one thread per model bundle, plus headroom for the lighter steps
+executor = ThreadPoolExecutor(max_workers=config.MODEL_POOL_SIZE + 4, thread_name_prefix="asgi")
+
+async def fetch_catalogue(outfit_ids):
+    if AsyncMongoClient is not None:
+        return await catalogue_cache.get_many_async(outfit_ids)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, log_config.bind(catalogue_cache.get_many, outfit_ids))
+
+async def preload_catalogue():
+    if not config.CATALOGUE_PRELOAD or db is None:
+        return
+    try:
+        if AsyncMongoClient is not None:
+            await catalogue_cache.preload_async()
+        else:
+            await asyncio.get_running_loop().run_in_executor(executor, catalogue_cache.preload)
+    except Exception as e:
+        logger.error("Catalogue preload failed: %s", e)
+
+READY_COMPONENTS = handlers.analysis_components()
+
+@asynccontextmanager
+async def lifespan(app):
+    registry.start(READY_COMPONENTS)
+    model_versions.start_watching(config.MODEL_WATCH_INTERVAL)
+    preload = asyncio.create_task(preload_catalogue())
+    yield
+    preload.cancel()
+    executor.shutdown(wait=False)
+
+app = FastAPI(title="Fashion Style Analyzer", lifespan=lifespan)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_headers=["Content-Type", "Authorization"],
+    allow_credentials=False)
+
+@app.middleware("http")
+async def request_log_scope(request: Request, call_next):
+    started = time.perf_counter()
+    request_id, token = log_config.start_request(request.headers.get("x-request-id"))
+    try:
+        response = await call_next(request)
+    except Exception:
+        log_config.log_request(request.method, request.url.path, 500, started)
+        raise
+    else:
+        response.headers["X-Request-ID"] = request_id
+        log_config.log_request(request.method, request.url.path, response.status_code, started)
+        return response
+    finally:
+        log_config.end_request(token)
+
+@app.get("/health")
+async def health_check():
+    return {
+        "status": "Server is running",
+        "timestamp": datetime.now().isoformat(),
+        "mongodb_connected": db is not None,
+        "async_mongodb": AsyncMongoClient is not None,
+        "result_cache": result_cache.stats(),
+        "model_pool": mediapipe_models.value.stats() if mediapipe_models.ready else None,
+        "catalogue_cache": catalogue_cache.stats()
+    }
+
+@app.get("/ready")
+async def readiness_check():
+    ready = registry.is_ready(READY_COMPONENTS)
+    return JSONResponse({
+        "ready": ready,
+        "components": registry.status(READY_COMPONENTS)
+    }, status_code=200 if ready else 503)
+
+async def read_upload(request):
+    """(image bytes, md5 hex digest) from a multipart 'image' field or a raw body, checked as it streams in.
+
+    Raises UploadRejected for missing, oversized, undersized or junk uploads.
+    """
+    content_length = request.headers.get("content-length")
+    check_content_length(int(content_length) if content_length and content_length.isdigit() else None)
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        # Parsed as it arrives rather than through request.form(), which
+        # would spool the whole body before any check could run
+        reader = MultipartUpload(content_type, "image")
+    else:
+        reader = UploadReader()
+    async for chunk in request.stream():
+        reader.feed(chunk)
+    return reader.finish()
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    if not metrics.ENABLED:
+        return JSONResponse({"error": "Metrics are disabled"}, status_code=404)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.post("/analyze_image")
+@metrics.instrumented("analyze_image")
+async def analyze_image_endpoint(request: Request, profile: str = None):
+    logger.info("Received analyze_image request")
+
+    try:
+        image_data, content_hash = await read_upload(request)
+    except UploadRejected as e:
+        logger.error("Upload rejected: %s", e)
+        return JSONResponse({"error": str(e)}, status_code=e.status)
+
+    try:
+        pose_profile = handlers.resolve_profile(profile)
+    except ValueError as e:
+        logger.error("Invalid profile requested: %s", e)
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    result = await handlers.run_analysis_async(image_data, pose_profile, executor, content_hash)
+    error = handlers.analysis_error(result)
+    if error is not None:
+        body, status_code, headers = error
+        return JSONResponse(body, status_code=status_code, headers=headers)
+
+    features = result
+    loop = asyncio.get_running_loop()
+    # The first request after start-up may wait for the recommender to load
+    outfits, model_version = await loop.run_in_executor(executor, log_config.bind(handlers.recommend, features))
+
+    if db is not None:
+        outfits = await handlers.enrich_outfits_async(outfits, fetch_catalogue)
+
+    return handlers.build_response(features, outfits, model_version)
+
+async def _stream_message(update):
+    """stream_response off the event loop, with the outfits enriched through the async driver"""
+    loop = asyncio.get_running_loop()
+    message = await loop.run_in_executor(executor, log_config.bind(handlers.stream_response, update))
+    if db is not None and "outfits" in message:
+        message["outfits"] = await handlers.enrich_outfits_async(message["outfits"], fetch_catalogue)
+    return message
+
+async def _run_stream(websocket, session):
+    """Analyse the newest frame received on websocket whenever the session is free.
+
+    A receiver task keeps only the latest frame, so when analysis is slower
+    than the camera the frames in between are dropped instead of queueing
+    up in the socket buffer.
+    """
+    loop = asyncio.get_running_loop()
+    send_lock = asyncio.Lock()
+    frame_ready = asyncio.Event()
+    latest = None
+
+    async def send(message):
+        async with send_lock:
+            await websocket.send_text(json.dumps(message, default=str))
+
+    async def receive_frames():
+        nonlocal latest
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes") is None:
+                await send({"error": "Send frames as binary messages"})
+                continue
+            if latest is not None:
+                session.drop()
+            latest = (time.monotonic(), message["bytes"])
+            frame_ready.set()
+
+    receiver = asyncio.create_task(receive_frames())
+    receiver.add_done_callback(lambda _: frame_ready.set())
+    try:
+        while True:
+            await frame_ready.wait()
+            frame_ready.clear()
+            if latest is None:
+                if receiver.done():
+                    break
+                continue
+            (arrived, frame_data), latest = latest, None
+            try:
+                reader = UploadReader()
+                reader.feed(frame_data)
+                frame_data, _ = reader.finish()
+            except UploadRejected as e:
+                await send({"error": str(e), "status": e.status})
+                continue
+
+            update = await loop.run_in_executor(
+                executor, log_config.bind(session.push, frame_data, arrived))
+            if update is None:
+                continue
+            error = handlers.stream_error(update)
+            if error is not None:
+                body, status_code, _ = error
+                await send(dict(body, status=status_code))
+            else:
+                await send(await _stream_message(update))
+    finally:
+        receiver.cancel()
+        try:
+            await receiver
+        except (asyncio.CancelledError, Exception):
+            # The client went away; nothing left to answer
+            pass
+
+@app.websocket("/stream")
+async def stream_endpoint(websocket: WebSocket, profile: str = None):
+    """Live camera stream: binary image frames in, a JSON message out whenever the smoothed features change"""
+    await websocket.accept()
+    request_id, token = log_config.start_request(websocket.headers.get("x-request-id"))
+    try:
+        try:
+            session = stream_sessions.open(handlers.resolve_profile(profile))
+        except ValueError as e:
+            logger.error("Invalid profile requested: %s", e)
+            await websocket.send_json({"error": str(e)})
+            await websocket.close(code=1008)
+            return
+        except SessionLimitError as e:
+            logger.warning("⚠️ Stream session refused: %s", e)
+            # 1013: try again later
+            await websocket.close(code=1013)
+            return
+
+        await websocket.send_json(dict(session.stats(), request_id=request_id))
+        try:
+            await _run_stream(websocket, session)
+        finally:
+            stream_sessions.close(session.session_id)
+    finally:
+        log_config.end_request(token)
@@ -0,0 +1,86 @@
+"""Batched inference over the per-target outfit models"""
+import argparse
+import json
+import logging
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def rank_top_k(proba, labels, top_k):
+    """Per row of proba, the top_k (label, probability) pairs in descending order"""
+    k = min(top_k, proba.shape[1])
+    # Stable sort keeps the first class on ties, matching predict()
+    ranked = np.argsort(-proba, axis=1, kind="stable")[:, :k]
+    return [
+        [(str(labels[col]), float(proba[row, col])) for col in columns]
+        for row, columns in enumerate(ranked)
+    ]
+
+
+class BatchPredictor:
+    """Scores many feature dicts at once against every target model.
+
+    Targets whose preprocessors learned identical one-hot vocabularies share
+    a single transform, so each batch is encoded once per vocabulary rather
+    than once per target. Only the forests run per target.
+    """
+
+    def __init__(self, models, target_cols=None):
+        self.targets = [t for t in (target_cols or list(models)) if t in models]
+        self._groups = {}
+        for target in self.targets:
+            pipeline = models[target]["pipeline"]
+            encoder = models[target]["encoder"]
+            preprocessor = pipeline.named_steps["preprocessor"]
+            classifier = pipeline.named_steps["classifier"]
+            labels = np.asarray(encoder.inverse_transform(classifier.classes_))
+            signature = self._signature(preprocessor)
+            group = self._groups.setdefault(signature, (preprocessor, []))
+            group[1].append((target, classifier, labels))
+
+    @staticmethod
+    def _signature(preprocessor):
+        vocabularies = tuple(
+            tuple(tuple(categories) for categories in transformer.categories_)
+            for _, transformer, _ in preprocessor.transformers_
+            if hasattr(transformer, "categories_")
+        )
+        return tuple(preprocessor.feature_names_in_), vocabularies
+
+    def predict(self, feature_dicts, top_k=1):
+        """Return, per input, {target: [(label, probability), ...]} with the top_k labels per target"""
+        if not feature_dicts:
+            return []
+        frame = pd.DataFrame.from_records(list(feature_dicts))
+        results = [{} for _ in range(len(frame))]
+        for (feature_names, _), (preprocessor, members) in self._groups.items():
+            encoded = preprocessor.transform(frame.reindex(columns=list(feature_names)))
+            for target, classifier, labels in members:
+                ranked = rank_top_k(classifier.predict_proba(encoded), labels, top_k)
+                for row, pairs in enumerate(ranked):
+                    results[row][target] = pairs
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-score a CSV of user features into JSON lines")
+    parser.add_argument("input_csv", help="CSV with body_type, skin_tone and face_shape columns")
+    parser.add_argument("--models", default="models.pkl", help="Path to the models.pkl bundle")
+    parser.add_argument("--top-k", type=int, default=3, help="Labels to keep per target")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Rows scored per batch")
+    args = parser.parse_args(argv)
+
+    predictor = BatchPredictor(joblib.load(args.models))
+    for chunk in pd.read_csv(args.input_csv, chunksize=args.batch_size, encoding="latin1"):
+        records = chunk.to_dict("records")
+        for record, prediction in zip(records, predictor.predict(records, top_k=args.top_k)):
+            sys.stdout.write(json.dumps({"input": record, "predictions": prediction}, default=str) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""Offline latency benchmark for the analysis and recommendation hot paths.
+
+Times each stage on synthetic images at several resolutions, then measures
+end-to-end throughput through the Flask test client at several concurrency
+levels. Results are written as JSON and can be compared against a saved
+baseline:
+
+    python benchmark.py --output baseline.json
+    python benchmark.py --baseline baseline.json --output current.json
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import sys
+import threading
+import time
+from datetime import datetime
+from itertools import product
+
+# Every request must run the full analysis; set before config is imported
+os.environ.setdefault("RESULT_CACHE_SIZE", "0")
+os.environ.setdefault("MODEL_WATCH_INTERVAL", "0")
+
+import cv2
+import numpy as np
+
+import config
+from latency_stats import LatencyTracker
+
+DEFAULT_RESOLUTIONS = "480x640,720x1280,1080x1920"
+DEFAULT_CONCURRENCY = "1,2,4,8"
+
+
+def synthetic_image(width, height, seed=0):
+    """JPEG bytes of a standing figure (head, torso, arms, legs) on a noisy background"""
+    rng = np.random.default_rng(seed)
+    img = cv2.GaussianBlur(rng.integers(90, 170, (height, width, 3), dtype=np.uint8), (0, 0), 3)
+
+    skin = tuple(int(c) for c in rng.integers([70, 110, 160], [120, 160, 225]))
+    shirt = tuple(int(c) for c in rng.integers(0, 255, 3))
+    trousers = tuple(int(c) for c in rng.integers(0, 120, 3))
+    cx = width // 2
+    unit = height // 9
+
+    cv2.ellipse(img, (cx, int(unit * 1.1)), (int(unit * 0.45), int(unit * 0.6)), 0, 0, 360, skin, -1)
+    cv2.rectangle(img, (cx - unit, int(unit * 1.9)), (cx + unit, int(unit * 4.8)), shirt, -1)
+    for side in (-1, 1):
+        shoulder = (cx + side * unit, int(unit * 2.1))
+        hand = (cx + side * int(unit * 1.5), int(unit * 4.6))
+        cv2.line(img, shoulder, hand, skin, max(2, unit // 4))
+        cv2.rectangle(img, (cx + min(0, side) * unit, int(unit * 4.8)),
+                      (cx + max(0, side) * unit - side * unit // 8, int(unit * 8.5)), trousers, -1)
+
+    ok, encoded = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return encoded.tobytes()
+
+
+def parse_resolutions(text):
+    return [tuple(int(v) for v in item.lower().split("x")) for item in text.split(",") if item]
+
+
+class StageTimer:
+    """Times calls into a LatencyTracker; a disabled timer just runs them (for warm-up)"""
+
+    def __init__(self, tracker, enabled=True):
+        self.tracker = tracker
+        self.enabled = enabled
+
+    def __call__(self, label, fn, *args):
+        started = time.perf_counter()
+        result = fn(*args)
+        if self.enabled:
+            self.tracker.record(label, (time.perf_counter() - started) * 1000)
+        return result
+
+
+def bench_analysis(resolutions, iterations, warmup, profile):
+    """Per-stage latency summaries of the image analysis, keyed by resolution"""
+    from image_analysis import (AnalysisContext, analyze_skin_tone, decode_image, detect_body_ratios,
+                                detect_face_shape, get_image_hash, get_model_pool)
+
+    stages = ["get_image_hash", "decode_image", "detect_body_ratios", "analyze_skin_tone", "detect_face_shape"]
+    results = {}
+    for width, height in resolutions:
+        tracker = LatencyTracker()
+        for i in range(warmup + iterations):
+            image_data = synthetic_image(width, height, seed=i)
+            timer = StageTimer(tracker, enabled=i >= warmup)
+            with get_model_pool().checkout() as models:
+                image_hash = timer("get_image_hash", get_image_hash, image_data)
+                img = timer("decode_image", decode_image, image_data, config.DECODE_REDUCTION)
+                # A fresh context per image, so the pose and face graphs run
+                # inside the first stage that needs them, as in analyze_image
+                ctx = AnalysisContext(img, image_hash, models, profile)
+                timer("detect_body_ratios", detect_body_ratios, img, image_hash, ctx)
+                timer("analyze_skin_tone", analyze_skin_tone, img, image_hash, ctx)
+                timer("detect_face_shape", detect_face_shape, img, image_hash, ctx)
+        results[f"{width}x{height}"] = {stage: tracker.summary(stage) for stage in stages}
+        print(f"📐 {width}x{height}: " + ", ".join(
+            f"{stage} {results[f'{width}x{height}'][stage]['p50_ms']}ms" for stage in stages))
+    return results
+
+
+def benchmark_inputs(artifacts):
+    """Every combination of the dataset's feature values plus unseen ones that reach the fallbacks"""
+    df = artifacts.df
+    vocabularies = []
+    for col, default in (("body_type", "average"), ("skin_tone", "neutral"), ("face_shape", "oval")):
+        values = sorted(df[col].dropna().astype(str).str.lower().unique())[:8] if col in df.columns else [default]
+        vocabularies.append(values + ["unseen"])
+    return [
+        {"body_type": body_type, "skin_tone": skin_tone, "face_shape": face_shape,
+         "occasion": "casual", "image_hash": f"{i:08x}"}
+        for i, (body_type, skin_tone, face_shape) in enumerate(product(*vocabularies))
+    ]
+
+
+def bench_recommendation(iterations):
+    """Latency summaries of the dataset strategies and the ML predictions"""
+    from recommed_outfits import find_outfits_from_dataset, get_artifacts, get_ml_predictions, prepare_input
+
+    artifacts = get_artifacts()
+    inputs = [prepare_input(user_input) for user_input in benchmark_inputs(artifacts)]
+    tracker = LatencyTracker(window=len(inputs) * iterations)
+    timer = StageTimer(tracker)
+    for _ in range(iterations):
+        for input_data in inputs:
+            timer("find_outfits_from_dataset", find_outfits_from_dataset, input_data, artifacts)
+            if artifacts.models:
+                timer("get_ml_predictions", get_ml_predictions, input_data, artifacts)
+
+    results = {"inputs": len(inputs)}
+    for stage in ("find_outfits_from_dataset", "get_ml_predictions"):
+        results[stage] = tracker.summary(stage)
+    print(f"🎯 Recommendation over {len(inputs)} inputs: "
+          f"find_outfits_from_dataset {results['find_outfits_from_dataset'].get('p50_ms')}ms, "
+          f"get_ml_predictions {results['get_ml_predictions'].get('p50_ms')}ms")
+    return results
+
+
+def bench_throughput(concurrency_levels, requests_per_level, resolution, profile, ready_timeout=120):
+    """End-to-end /analyze_image latency and requests per second at each concurrency level"""
+    import app as server
+
+    server.startup()
+    deadline = time.time() + ready_timeout
+    while not server.registry.is_ready(server.READY_COMPONENTS) and time.time() < deadline:
+        time.sleep(0.5)
+
+    width, height = resolution
+    results = {}
+    for level in concurrency_levels:
+        # Distinct images per level so nothing is served from a cache
+        images = [synthetic_image(width, height, seed=10000 * level + i) for i in range(requests_per_level)]
+        tracker = LatencyTracker(window=requests_per_level)
+        errors = []
+        lock = threading.Lock()
+
+        def client_loop():
+            client = server.app.test_client()
+            while True:
+                with lock:
+                    if not images:
+                        return
+                    image_data = images.pop()
+                started = time.perf_counter()
+                response = client.post(f"/analyze_image?profile={profile.name}",
+                                       data={"image": (io.BytesIO(image_data), "bench.jpg")})
+                tracker.record("request", (time.perf_counter() - started) * 1000)
+                if response.status_code != 200:
+                    with lock:
+                        errors.append(response.status_code)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=client_loop) for _ in range(level)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+
+        results[str(level)] = dict(
+            tracker.summary("request"),
+            errors=len(errors),
+            requests_per_second=round(requests_per_level / wall, 2))
+        print(f"🚀 concurrency {level}: {results[str(level)]['requests_per_second']} req/s, "
+              f"p95 {results[str(level)]['p95_ms']}ms, {len(errors)} error(s)")
+    return results
+
+
+def _metrics(results, path=()):
+    """Flatten results into {path: value} for the latency and throughput figures"""
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(_metrics(value, path + (key,)))
+        elif key in ("p50_ms", "p95_ms", "requests_per_second"):
+            flat["/".join(path + (key,))] = value
+    return flat
+
+
+def compare(current, baseline, tolerance):
+    """Print current vs. baseline figures and return the names of those that regressed past tolerance"""
+    current_metrics = _metrics({k: current[k] for k in ("analysis", "recommendation", "throughput") if k in current})
+    baseline_metrics = _metrics({k: baseline[k] for k in ("analysis", "recommendation", "throughput") if k in baseline})
+    regressions = []
+    print(f"\n📊 Compared with baseline from {baseline.get('meta', {}).get('timestamp', 'unknown')}")
+    for name in sorted(set(current_metrics) & set(baseline_metrics)):
+        old, new = baseline_metrics[name], current_metrics[name]
+        if not old:
+            continue
+        change = (new - old) / old
+        # Latency regresses upwards, throughput downwards
+        worse = change < -tolerance if name.endswith("requests_per_second") else change > tolerance
+        if worse:
+            regressions.append(name)
+        print(f"{'⚠️ ' if worse else '   '}{name:<60}{old:>10}{new:>10}{change:>+9.1%}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark analysis and recommendation latency offline")
+    parser.add_argument("--resolutions", default=DEFAULT_RESOLUTIONS, help="Comma-separated WIDTHxHEIGHT list")
+    parser.add_argument("--iterations", type=int, default=5, help="Timed images per resolution")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed images per resolution")
+    parser.add_argument("--profile", default=None, help="Pose profile (default: POSE_PROFILE)")
+    parser.add_argument("--concurrency", default=DEFAULT_CONCURRENCY, help="Comma-separated client thread counts")
+    parser.add_argument("--requests", type=int, default=16, help="Requests per concurrency level")
+    parser.add_argument("--throughput-resolution", default="720x1280", help="Image size for the throughput run")
+    parser.add_argument("--skip-throughput", action="store_true", help="Only time the individual stages")
+    parser.add_argument("--output", default=None, help="Write results JSON here")
+    parser.add_argument("--baseline", default=None, help="Baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown before failing")
+    parser.add_argument("--log-level", default="WARNING", help="Log level while benchmarking")
+    args = parser.parse_args(argv)
+
+    from image_analysis import get_pose_profile
+    from recommed_outfits import get_model_version
+    logging.getLogger().setLevel(args.log_level.upper())
+    profile = get_pose_profile(args.profile)
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "profile": profile.name,
+            "decode_reduction": config.DECODE_REDUCTION,
+            "analysis_backend": config.ANALYSIS_BACKEND,
+            "model_pool_size": config.MODEL_POOL_SIZE,
+            "iterations": args.iterations,
+        },
+        "analysis": bench_analysis(parse_resolutions(args.resolutions), args.iterations, args.warmup, profile),
+        "recommendation": bench_recommendation(args.iterations),
+    }
+    results["meta"]["model_version"] = get_model_version().version
+    if not args.skip_throughput:
+        levels = [int(level) for level in args.concurrency.split(",") if level]
+        results["throughput"] = bench_throughput(
+            levels, args.requests, parse_resolutions(args.throughput_resolution)[0], profile)
+
+    # Read the baseline first in case --output points at the same file
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} figure(s) regressed by more than {args.tolerance:.0%}")
+            return 1
+        print("✅ No regressions beyond tolerance")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
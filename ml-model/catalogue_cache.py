@@ -0,0 +1,138 @@
+"""Read-through cache of MongoDB outfit documents keyed by outfit_id"""
+import logging
+
+from result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+# Only the fields the response needs are fetched from MongoDB
+OUTFIT_PROJECTION = {
+    "_id": 0,
+    "outfit_id": 1,
+    "top.name": 1,
+    "top.color": 1,
+    "top.image_url": 1,
+    "bottom.name": 1,
+    "bottom.color": 1,
+    "bottom.image_url": 1,
+    "occasion": 1,
+    "total_price": 1,
+}
+
+# Cached for ids the collection does not have, so they don't hit MongoDB every time
+_MISSING = {"__missing__": True}
+
+
+def normalize_outfit_id(outfit_id):
+    """outfit_id as the catalogue stores it: an int when it is a whole number"""
+    if isinstance(outfit_id, str) and outfit_id.strip().lstrip("-").isdigit():
+        return int(outfit_id)
+    if isinstance(outfit_id, float) and outfit_id.is_integer():
+        return int(outfit_id)
+    return outfit_id
+
+
+class CatalogueCache:
+    """Serves outfit documents from memory, fetching misses with a single $in query.
+
+    Entries expire after ttl_seconds and the cache holds at most max_entries
+    documents. preload() fills it in bulk at start-up and invalidate() drops
+    specific ids (or everything) after the catalogue changes. Returned
+    documents are the cached objects themselves, not copies, so callers must
+    not mutate them.
+    """
+
+    def __init__(self, collection, max_entries=5000, ttl_seconds=600, projection=None):
+        self.collection = collection
+        self.projection = projection or OUTFIT_PROJECTION
+        self._cache = ResultCache(max_entries=max_entries, ttl_seconds=ttl_seconds, copy_values=False)
+        self.queries = 0
+
+    def get_many(self, outfit_ids):
+        """Return {outfit_id: document} for every id found in the cache or the collection"""
+        found, misses = self._cached(outfit_ids)
+        if misses and self.collection is not None:
+            self.queries += 1
+            docs = self.collection.find({"outfit_id": {"$in": misses}}, self.projection)
+            self._fill(found, misses, docs)
+        return found
+
+    async def get_many_async(self, outfit_ids):
+        """get_many for a collection from an async driver (pymongo's AsyncMongoClient or motor)"""
+        found, misses = self._cached(outfit_ids)
+        if misses and self.collection is not None:
+            self.queries += 1
+            cursor = self.collection.find({"outfit_id": {"$in": misses}}, self.projection)
+            self._fill(found, misses, await cursor.to_list(length=None))
+        return found
+
+    def _cached(self, outfit_ids):
+        """Split outfit_ids into ({outfit_id: cached document}, [ids to fetch])"""
+        found = {}
+        misses = []
+        for outfit_id in dict.fromkeys(outfit_ids):
+            doc = self._cache.get(outfit_id)
+            if doc is None:
+                misses.append(outfit_id)
+            elif doc != _MISSING:
+                found[outfit_id] = doc
+        return found, misses
+
+    def _fill(self, found, misses, docs):
+        """Cache the fetched docs (and negative entries for absent ids), adding hits to found"""
+        fetched = {doc["outfit_id"]: doc for doc in docs}
+        for outfit_id in misses:
+            doc = fetched.get(outfit_id)
+            self._cache.set(outfit_id, doc if doc is not None else _MISSING)
+            if doc is not None:
+                found[outfit_id] = doc
+        logger.debug("Catalogue cache fetched %s/%s missing outfits from MongoDB", len(fetched), len(misses))
+
+    def preload(self, limit=None):
+        """Bulk-load the catalogue (up to the cache size) and return the number of documents cached"""
+        limit = self._preload_limit(limit)
+        if self.collection is None or limit <= 0:
+            return 0
+        cursor = self.collection.find({}, self.projection).limit(limit)
+        return self._store_preloaded(cursor)
+
+    async def preload_async(self, limit=None):
+        """preload for a collection from an async driver"""
+        limit = self._preload_limit(limit)
+        if self.collection is None or limit <= 0:
+            return 0
+        cursor = self.collection.find({}, self.projection).limit(limit)
+        return self._store_preloaded(await cursor.to_list(length=limit))
+
+    def _preload_limit(self, limit):
+        # A disabled cache (max_entries <= 0) gives a limit of 0 or less; the
+        # callers skip the query rather than pass it on, since limit(0) means no limit
+        return min(limit or self._cache.max_entries, self._cache.max_entries)
+
+    def _store_preloaded(self, docs):
+        count = 0
+        for doc in docs:
+            if "outfit_id" in doc:
+                self._cache.set(doc["outfit_id"], doc)
+                count += 1
+        self.queries += 1
+        logger.info("📚 Catalogue cache preloaded with %s outfits", count)
+        return count
+
+    def invalidate(self, outfit_ids=None):
+        """Drop the given ids, or the whole cache when outfit_ids is None.
+
+        Numeric strings (as sent by admin tools) match the integer outfit_id keys.
+        """
+        if outfit_ids is None:
+            self._cache.clear()
+            return
+        for outfit_id in outfit_ids:
+            self._cache.invalidate(normalize_outfit_id(outfit_id))
+
+    def stats(self):
+        stats = self._cache.stats()
+        stats.pop("disk_tier", None)
+        stats.pop("disk_hits", None)
+        stats["queries"] = self.queries
+        return stats
@@ -0,0 +1,245 @@
+"""Memory-mappable export of the outfit models and dataset.
+
+The per-target RandomForest pipelines are flattened into plain NumPy arrays
+(split features, thresholds, child links and normalised leaf values for all
+trees back to back), the one-hot vocabularies go into a JSON manifest and
+the dataset is stored column by column, with string columns as integer
+codes plus a vocabulary (loaded as Categoricals over those codes). Every
+array is a .npy file opened with np.load(mmap_mode='r'), so worker
+processes share one page-cache copy and loading is close to free.
+"""
+import argparse
+import json
+import logging
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from batch_predict import rank_top_k
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+FORMAT_VERSION = 1
+FOREST_ARRAYS = ("feature", "threshold", "children_left", "children_right", "value", "roots")
+
+
+def _save_array(out_dir, name, array):
+    """Write name.npy atomically via a temp file and rename"""
+    # Processes still mapping the old file keep its inode instead of having it
+    # truncated underneath them
+    path = os.path.join(out_dir, f"{name}.npy")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def _codes_dtype(n_categories):
+    """The code width pandas picks for n_categories, so loading can wrap the mapped codes without a copy"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _one_hot_layout(preprocessor):
+    """(feature_names, categories per feature) for a ColumnTransformer of OneHotEncoders"""
+    # Export-only dependency; serving from a compact artifact never imports sklearn
+    from sklearn.preprocessing import OneHotEncoder
+
+    feature_names, categories = [], []
+    for name, transformer, columns in preprocessor.transformers_:
+        if name == "remainder" and transformer == "drop":
+            continue
+        if not isinstance(transformer, OneHotEncoder) or transformer.handle_unknown != "ignore":
+            raise ValueError(f"Unsupported preprocessor step '{name}' for compact export")
+        for column, cats in zip(columns, transformer.categories_):
+            feature_names.append(column)
+            categories.append([str(c) for c in cats])
+    return feature_names, categories
+
+
+def _flatten_forest(classifier):
+    """Concatenate every tree's node arrays, offsetting child links to global node ids"""
+    parts = {name: [] for name in FOREST_ARRAYS}
+    offset = 0
+    max_depth = 0
+    for estimator in classifier.estimators_:
+        tree = estimator.tree_
+        left = tree.children_left.astype(np.int32)
+        right = tree.children_right.astype(np.int32)
+        value = tree.value[:, 0, :].astype(np.float32)
+        totals = value.sum(axis=1, keepdims=True)
+        parts["feature"].append(tree.feature.astype(np.int32))
+        parts["threshold"].append(tree.threshold.astype(np.float32))
+        parts["children_left"].append(np.where(left >= 0, left + offset, -1).astype(np.int32))
+        parts["children_right"].append(np.where(right >= 0, right + offset, -1).astype(np.int32))
+        parts["value"].append(value / np.where(totals == 0, 1, totals))
+        parts["roots"].append(np.array([offset], dtype=np.int32))
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+    return {name: np.concatenate(chunks) for name, chunks in parts.items()}, max_depth
+
+
+def export_compact(models, df, out_dir, target_cols=None):
+    """Write models (the models.pkl dict) and df as a compact artifact directory"""
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {"format_version": FORMAT_VERSION, "targets": {}, "dataset": []}
+
+    for i, target in enumerate(t for t in (target_cols or list(models)) if t in models):
+        pipeline = models[target]["pipeline"]
+        classifier = pipeline.named_steps["classifier"]
+        feature_names, categories = _one_hot_layout(pipeline.named_steps["preprocessor"])
+        arrays, max_depth = _flatten_forest(classifier)
+        labels = np.asarray(models[target]["encoder"].inverse_transform(classifier.classes_)).astype(str)
+        prefix = f"model_{i}"
+        for name, array in arrays.items():
+            _save_array(out_dir, f"{prefix}_{name}", array)
+        _save_array(out_dir, f"{prefix}_labels", labels)
+        manifest["targets"][target] = {
+            "prefix": prefix,
+            "feature_names": feature_names,
+            "categories": categories,
+            "max_depth": int(max_depth),
+            "n_trees": len(classifier.estimators_),
+        }
+
+    for i, column in enumerate(df.columns):
+        prefix = f"dataset_{i}"
+        series = df[column]
+        entry = {"name": str(column), "prefix": prefix}
+        if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+            _save_array(out_dir, prefix, series.to_numpy())
+            entry["kind"] = "numeric"
+        else:
+            codes, uniques = pd.factorize(series)
+            _save_array(out_dir, prefix, codes.astype(_codes_dtype(len(uniques))))
+            _save_array(out_dir, f"{prefix}_vocab", np.asarray(uniques).astype(str))
+            entry["kind"] = "categorical"
+        manifest["dataset"].append(entry)
+
+    # Manifest goes last and atomically: it is what readers and the model watcher key on
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    with open(f"{manifest_path}.tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+    logger.info("💾 Compact artifact written to %s (%s models, %s rows)", out_dir, len(manifest['targets']), len(df))
+    return manifest
+
+
+def is_compact_artifact(path):
+    return os.path.isfile(os.path.join(path, MANIFEST_NAME))
+
+
+class CompactForest:
+    """A flattened RandomForest pipeline evaluated with vectorised NumPy traversal"""
+
+    def __init__(self, arrays, feature_names, categories, labels, max_depth):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.children_left = arrays["children_left"]
+        self.children_right = arrays["children_right"]
+        self.value = arrays["value"]
+        self.roots = np.asarray(arrays["roots"])
+        self.feature_names = feature_names
+        self.categories = categories
+        self.labels = labels
+        self.max_depth = max_depth
+
+    @property
+    def vocabulary_signature(self):
+        return tuple(self.feature_names), tuple(tuple(c) for c in self.categories)
+
+    def encode(self, feature_dicts):
+        """One-hot encode inputs exactly like OneHotEncoder(handle_unknown='ignore')"""
+        width = sum(len(c) for c in self.categories)
+        encoded = np.zeros((len(feature_dicts), width), dtype=np.float32)
+        offset = 0
+        for name, cats in zip(self.feature_names, self.categories):
+            positions = {c: offset + j for j, c in enumerate(cats)}
+            for row, features in enumerate(feature_dicts):
+                col = positions.get(str(features.get(name)))
+                if col is not None:
+                    encoded[row, col] = 1.0
+            offset += len(cats)
+        return encoded
+
+    def predict_proba(self, encoded):
+        n = encoded.shape[0]
+        nodes = np.tile(self.roots, (n, 1))
+        rows = np.arange(n)[:, None]
+        for _ in range(self.max_depth + 1):
+            left = self.children_left[nodes]
+            active = left >= 0
+            if not active.any():
+                break
+            go_left = encoded[rows, np.maximum(self.feature[nodes], 0)] <= self.threshold[nodes]
+            nodes = np.where(active, np.where(go_left, left, self.children_right[nodes]), nodes)
+        return self.value[nodes].mean(axis=1)
+
+
+class CompactPredictor:
+    """Drop-in replacement for BatchPredictor backed by CompactForest models"""
+
+    def __init__(self, forests):
+        self.forests = forests
+        self.targets = list(forests)
+
+    def predict(self, feature_dicts, top_k=1):
+        feature_dicts = list(feature_dicts)
+        results = [{} for _ in feature_dicts]
+        encoded_by_vocabulary = {}
+        for target, forest in self.forests.items():
+            signature = forest.vocabulary_signature
+            if signature not in encoded_by_vocabulary:
+                encoded_by_vocabulary[signature] = forest.encode(feature_dicts)
+            proba = forest.predict_proba(encoded_by_vocabulary[signature])
+            for row, pairs in enumerate(rank_top_k(proba, forest.labels, top_k)):
+                results[row][target] = pairs
+        return results
+
+
+def load_compact(path, mmap_mode="r"):
+    """Open a compact artifact; returns (CompactPredictor, dataset DataFrame)"""
+    with open(os.path.join(path, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported compact artifact version {manifest.get('format_version')}")
+
+    def _load(name):
+        return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+
+    forests = {}
+    for target, spec in manifest["targets"].items():
+        arrays = {name: _load(f"{spec['prefix']}_{name}") for name in FOREST_ARRAYS}
+        forests[target] = CompactForest(
+            arrays, spec["feature_names"], spec["categories"],
+            _load(f"{spec['prefix']}_labels"), spec["max_depth"])
+
+    columns = {}
+    for entry in manifest["dataset"]:
+        data = _load(entry["prefix"])
+        if entry["kind"] == "categorical":
+            vocab = np.asarray(_load(f"{entry['prefix']}_vocab")).astype(object)
+            # Stays categorical over the mapped codes; exports from before the
+            # codes were narrowed still load, at the cost of a private copy
+            data = pd.Categorical.from_codes(np.asarray(data), categories=vocab)
+        columns[entry["name"]] = data
+    return CompactPredictor(forests), pd.DataFrame(columns, copy=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert models.pkl and dataset.pkl into a compact artifact")
+    parser.add_argument("--models", default="models.pkl")
+    parser.add_argument("--dataset", default="dataset.pkl")
+    parser.add_argument("--out", default="compact_models")
+    args = parser.parse_args(argv)
+    export_compact(joblib.load(args.models), joblib.load(args.dataset), args.out)
+    print(f"✅ Compact artifact written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
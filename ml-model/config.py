@@ -0,0 +1,119 @@
+"""Runtime configuration for the ML service, read from environment variables"""
+import os
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_bool(name, default=False):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Decode-time downscaling factor for uploads (1 = full resolution, 2/4/8 use
+# libjpeg DCT scaling so large photos are never materialised at full size)
+DECODE_REDUCTION = _env_int("DECODE_REDUCTION", 1)
+
+# When enabled, every upload is also written to DEBUG_UPLOADS_DIR for inspection
+DEBUG_SAVE_UPLOADS = _env_bool("DEBUG_SAVE_UPLOADS")
+DEBUG_UPLOADS_DIR = os.environ.get("DEBUG_UPLOADS_DIR", "debug_uploads")
+
+# analyze_image result cache: entry bound (0 disables), TTL in seconds (0 = no
+# expiry) and an optional sqlite file for a restart-surviving disk tier
+RESULT_CACHE_SIZE = _env_int("RESULT_CACHE_SIZE", 1024)
+RESULT_CACHE_TTL = _env_int("RESULT_CACHE_TTL", 3600)
+RESULT_CACHE_DB = os.environ.get("RESULT_CACHE_DB", "")
+
+# Number of MediaPipe graph bundles (one per concurrent analysis) and how long
+# a request waits for a free bundle before being rejected as busy
+MODEL_POOL_SIZE = _env_int("MODEL_POOL_SIZE", 1)
+MODEL_POOL_TIMEOUT = _env_int("MODEL_POOL_TIMEOUT", 30)
+
+# Analysis backend: "thread" runs analyze_image on the request thread, "process"
+# dispatches it to a pool of ANALYSIS_WORKERS warm worker processes (0 = one per
+# core) and waits at most ANALYSIS_TIMEOUT seconds for the result
+ANALYSIS_BACKEND = os.environ.get("ANALYSIS_BACKEND", "thread").strip().lower()
+ANALYSIS_WORKERS = _env_int("ANALYSIS_WORKERS", 0)
+ANALYSIS_TIMEOUT = _env_int("ANALYSIS_TIMEOUT", 30)
+
+# Default pose speed/accuracy profile (fast / balanced / accurate); requests can
+# override it with the ?profile= query parameter
+POSE_PROFILE = os.environ.get("POSE_PROFILE", "accurate")
+
+# Sampled debug capture of pose overlays: fraction of requests captured (0 =
+# off), output directory and the number of files kept before rotating
+DEBUG_CAPTURE_RATE = _env_float("DEBUG_CAPTURE_RATE", 0.0)
+DEBUG_CAPTURE_DIR = os.environ.get("DEBUG_CAPTURE_DIR", "debug_captures")
+DEBUG_CAPTURE_MAX_FILES = _env_int("DEBUG_CAPTURE_MAX_FILES", 200)
+
+# Directory of the memory-mappable model/dataset export; used instead of
+# models.pkl/dataset.pkl when it contains a manifest (empty string disables)
+COMPACT_MODEL_DIR = os.environ.get("COMPACT_MODEL_DIR", "compact_models")
+
+# Seconds between checks of the model artifacts for changes (0 disables the
+# watcher). The admin endpoints (POST /admin/reload, /admin/catalogue/invalidate)
+# are disabled unless ADMIN_TOKEN is set, and then require it in the
+# X-Admin-Token header
+MODEL_WATCH_INTERVAL = _env_int("MODEL_WATCH_INTERVAL", 30)
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+# In-process cache of MongoDB outfit documents: entry bound, TTL in seconds and
+# whether to bulk-preload the catalogue at start-up
+CATALOGUE_CACHE_SIZE = _env_int("CATALOGUE_CACHE_SIZE", 5000)
+CATALOGUE_CACHE_TTL = _env_int("CATALOGUE_CACHE_TTL", 600)
+CATALOGUE_PRELOAD = _env_bool("CATALOGUE_PRELOAD", True)
+
+# MongoDB connection for catalogue enrichment
+MONGO_URI = os.environ.get("MONGO_URI", "")
+MONGO_DB = os.environ.get("MONGO_DB", "")
+
+# Most images accepted by one /analyze_images request, and the most bytes its
+# body (or the images unpacked from an archive) may add up to
+BATCH_MAX_IMAGES = _env_int("BATCH_MAX_IMAGES", 200)
+BATCH_MAX_BYTES = _env_int("BATCH_MAX_BYTES", 256 * 1024 * 1024)
+
+# Hot-path stage timings and counters served on /metrics (Prometheus text format)
+METRICS_ENABLED = _env_bool("METRICS_ENABLED", True)
+
+# Bins per channel in the skin colour histograms returned with the skin
+# analysis, for calibrating the warm/cool thresholds (0 = no histograms)
+SKIN_HISTOGRAM_BINS = _env_int("SKIN_HISTOGRAM_BINS", 0)
+
+# Longest side of the pyramid level the contour-based body fallback runs on
+FALLBACK_MAX_SIDE = _env_int("FALLBACK_MAX_SIDE", 320)
+
+# Upload limits enforced while the body streams in, before any decode
+MAX_UPLOAD_BYTES = _env_int("MAX_UPLOAD_BYTES", 20 * 1024 * 1024)
+MAX_IMAGE_PIXELS = _env_int("MAX_IMAGE_PIXELS", 50_000_000)
+MIN_IMAGE_SIDE = _env_int("MIN_IMAGE_SIDE", 100)
+
+# Logging: "dev" prints every record as plain text; "json" writes one JSON
+# object per line through a background queue and keeps only a sampled
+# fraction of requests' INFO/DEBUG detail (warnings and the per-request
+# summary are always kept)
+LOG_MODE = os.environ.get("LOG_MODE", "dev").lower()
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "").upper() or ("DEBUG" if LOG_MODE == "dev" else "INFO")
+LOG_DETAIL_SAMPLE_RATE = _env_float("LOG_DETAIL_SAMPLE_RATE", 0.01)
+
+# Video / live-camera streaming sessions: open session cap (each holds its own
+# tracking-mode graphs), idle seconds before a session is closed, most frames
+# analysed per second, how far the analysis interval stretches while the
+# features hold steady, and the per-frame decay of the feature votes
+STREAM_MAX_SESSIONS = _env_int("STREAM_MAX_SESSIONS", 4)
+STREAM_SESSION_TTL = _env_int("STREAM_SESSION_TTL", 60)
+STREAM_MAX_FPS = _env_float("STREAM_MAX_FPS", 10.0)
+STREAM_MAX_BACKOFF = _env_int("STREAM_MAX_BACKOFF", 8)
+STREAM_SMOOTHING = _env_float("STREAM_SMOOTHING", 0.6)
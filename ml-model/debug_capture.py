@@ -0,0 +1,93 @@
+"""Sampled, asynchronous debug image capture with a bounded output directory"""
+import logging
+import os
+import queue
+import random
+import threading
+from collections import OrderedDict
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+
+class DebugCapture:
+    """Writes a sampled fraction of debug images from a background thread.
+
+    Callers pass a render callable instead of an image, so the copy, drawing
+    and JPEG encode happen off the request path. Captures are dropped when the
+    queue is full, and the oldest files are deleted once the directory holds
+    more than max_files captures.
+    """
+
+    def __init__(self, directory, sample_rate=0.0, max_files=200, queue_size=32):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.max_files = max_files
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._files = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._dropped_lock = threading.Lock()
+        self.dropped = 0
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0
+
+    def should_capture(self):
+        return self.enabled and random.random() < self.sample_rate
+
+    def capture(self, name, render):
+        """Queue render() to be written as <name>.jpg if this call is sampled"""
+        if not self.should_capture():
+            return False
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((name, render))
+            return True
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+            return False
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            existing = [os.path.join(self.directory, f) for f in os.listdir(self.directory) if f.endswith(".jpg")]
+            # Paths oldest first; a name written again moves to the end
+            self._files = OrderedDict.fromkeys(sorted(existing, key=os.path.getmtime))
+            self._thread = threading.Thread(target=self._run, name="debug-capture", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            name, render = self._queue.get()
+            try:
+                self._write(name, render())
+            except Exception as e:
+                logger.warning("⚠️ Debug capture %s failed: %s", name, e)
+            finally:
+                self._queue.task_done()
+
+    def _write(self, name, image):
+        path = os.path.join(self.directory, f"{name}.jpg")
+        if not cv2.imwrite(path, image):
+            logger.warning("⚠️ Could not write debug capture to %s", path)
+            return
+        self._files[path] = None
+        self._files.move_to_end(path)
+        while len(self._files) > self.max_files:
+            oldest, _ = self._files.popitem(last=False)
+            try:
+                os.remove(oldest)
+            except OSError:
+                pass
+        logger.debug("📸 Debug capture saved to %s", path)
+
+    def flush(self):
+        """Block until every queued capture has been written"""
+        if self._thread is not None:
+            self._queue.join()
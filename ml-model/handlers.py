@@ -0,0 +1,459 @@
+"""Request handling shared by the Flask app and the ASGI app"""
+import asyncio
+import io
+import logging
+import tarfile
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+import config
+import log_config
+import metrics
+import analysis_workers
+from image_analysis import analyze_image, result_cache, mediapipe_models, get_pose_profile
+from recommed_outfits import recommend_outfits, recommend_outfits_batch, recommender, get_model_version
+from latency_stats import LatencyTracker
+from upload_ingest import CHUNK_SIZE, UploadReader, UploadRejected
+
+logger = logging.getLogger(__name__)
+
+# Analysis latency per pose profile, used to pick tiers for mobile vs. desktop
+profile_latency = LatencyTracker()
+
+UNCLASSIFIED_FEATURES = {
+    "body_type": "unclassified",
+    "skin_tone": "neutral",
+    "face_shape": "unclassified"
+}
+
+def analysis_components():
+    """Readiness components the configured analysis backend depends on"""
+    # In process mode the MediaPipe graphs live in the worker processes
+    if config.ANALYSIS_BACKEND == "process":
+        return [recommender.name, analysis_workers.workers.name]
+    return [recommender.name, mediapipe_models.name]
+
+def resolve_profile(name):
+    """PoseProfile for a ?profile= value; raises ValueError for unknown names"""
+    return get_pose_profile(name)
+
+def _record_latency(profile, result):
+    for stage, seconds in (result.pop("stage_seconds", None) or {}).items():
+        metrics.stage_seconds.observe(seconds, stage=stage)
+    if "analysis_ms" in result:
+        metrics.analysis_cache_total.inc(result="hit" if result.get("cached") else "miss")
+        if not result.get("cached"):
+            profile_latency.record(profile.name, result["analysis_ms"])
+            metrics.stage_seconds.observe(result["analysis_ms"] / 1000, stage="analysis")
+    return result
+
+def run_analysis(image_data, profile, content_hash=None):
+    """Analyze an upload on the configured backend, blocking the calling thread"""
+    with metrics.analyses_in_flight.track():
+        if config.ANALYSIS_BACKEND == "process":
+            result = analysis_workers.analyze_image_in_worker(
+                image_data, profile=profile.name, content_hash=content_hash)
+        else:
+            result = analyze_image(image_data, profile=profile.name, content_hash=content_hash)
+    return _record_latency(profile, result)
+
+async def run_analysis_async(image_data, profile, executor=None, content_hash=None):
+    """Analyze an upload without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    with metrics.analyses_in_flight.track():
+        if config.ANALYSIS_BACKEND == "process":
+            pool = analysis_workers.get_executor()
+            try:
+                future = analysis_workers.submit_analysis(
+                    image_data, profile=profile.name, executor=pool, content_hash=content_hash)
+                result = await asyncio.wait_for(asyncio.wrap_future(future), config.ANALYSIS_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.error("❌ Analysis timed out after %ss", config.ANALYSIS_TIMEOUT)
+                analysis_workers.recover(pool)
+                result = {"error": "Analysis timed out", "timeout": True}
+            except BrokenProcessPool as e:
+                # Same recovery as analyze_image_in_worker: the next request gets a fresh pool
+                logger.error("❌ Analysis worker crashed: %s", e)
+                analysis_workers.recover(pool, crashed=True)
+                result = {"error": "Analysis worker crashed"}
+        else:
+            result = await loop.run_in_executor(
+                executor, log_config.bind(analyze_image, image_data, None, profile.name, content_hash))
+    return _record_latency(profile, result)
+
+def register_cache_metrics(catalogue_cache):
+    """Expose the analysis, catalogue and model pool counters on /metrics, read at scrape time"""
+    def cache_lookups():
+        samples = []
+        for name, stats in (("result", result_cache.stats()), ("catalogue", catalogue_cache.stats())):
+            samples.append(({"cache": name, "result": "hit"}, stats["hits"] + stats.get("disk_hits", 0)))
+            samples.append(({"cache": name, "result": "miss"}, stats["misses"]))
+        return samples
+
+    def model_pool():
+        if not mediapipe_models.ready:
+            return []
+        stats = mediapipe_models.value.stats()
+        return [({"state": "in_use"}, stats["in_use"]), ({"state": "available"}, stats["available"])]
+
+    metrics.Collected("fashion_cache_lookups_total",
+                      "Lookups per in-process cache by outcome", "counter", cache_lookups)
+    metrics.Collected("fashion_cache_entries", "Entries per in-process cache", "gauge", lambda: [
+        ({"cache": "result"}, result_cache.stats()["entries"]),
+        ({"cache": "catalogue"}, catalogue_cache.stats()["entries"]),
+    ])
+    metrics.Collected("fashion_model_pool_bundles",
+                      "MediaPipe model bundles by state", "gauge", model_pool)
+
+def analysis_error(result):
+    """(body, status, extra headers) for a failed analysis result, or None if it succeeded"""
+    if result.get("timeout"):
+        logger.error("Image analysis timed out: %s", result['error'])
+        return {"error": result["error"]}, 504, {}
+    if result.get("busy"):
+        # Every model bundle is in use; ask the client to back off and retry
+        return {"error": result["error"]}, 503, {"Retry-After": "1"}
+    if "error" in result:
+        logger.error("Image analysis failed: %s", result['error'])
+        return {"features": dict(UNCLASSIFIED_FEATURES), "error": result["error"]}, 400, {}
+    return None
+
+def recommend(features):
+    """Recommend outfits on one pinned model version; returns (outfits, version id)"""
+    # Pin one model version for the whole request, even if a reload lands meanwhile
+    active_version = get_model_version()
+    with metrics.stage_seconds.time(stage="recommend"):
+        outfits = recommend_outfits(features, active_version.artifacts)
+    return outfits, active_version.version
+
+def recommend_batch(features_list):
+    """recommend() for many analyses at once; returns (outfit lists, version id)"""
+    active_version = get_model_version()
+    with metrics.stage_seconds.time(stage="recommend"):
+        outfit_lists = recommend_outfits_batch(features_list, active_version.artifacts)
+    return outfit_lists, active_version.version
+
+def catalogue_outfit(doc):
+    """Response outfit built from a MongoDB catalogue document"""
+    return {
+        'outfit_id': doc['outfit_id'],
+        'top': doc['top']['name'],
+        'top_color': doc['top']['color'],
+        'bottom': doc['bottom']['name'],
+        'bottom_color': doc['bottom']['color'],
+        'occasion': doc['occasion'],
+        'total_price': doc.get('total_price', 0),
+        'top_image_url': doc['top'].get('image_url', ''),
+        'bottom_image_url': doc['bottom'].get('image_url', '')
+    }
+
+def outfit_ids(outfits):
+    return [outfit['outfit_id'] for outfit in outfits if outfit.get('outfit_id') is not None]
+
+def apply_catalogue(outfits, ids, catalogue_docs):
+    """Replace predicted outfits by their catalogue entries (in recommendation order) when any exist"""
+    mongo_outfits = [catalogue_docs[i] for i in dict.fromkeys(ids) if i in catalogue_docs]
+    if not mongo_outfits:
+        logger.warning("No matches found in MongoDB for outfit_ids")
+        return outfits
+    enriched = [catalogue_outfit(doc) for doc in mongo_outfits]
+    logger.debug("Fetched outfits: %s", enriched)
+    return enriched
+
+def enrich_outfits(outfits, fetch):
+    """Enrich outfits with catalogue documents from fetch(ids) -> {outfit_id: doc}"""
+    return enrich_outfit_lists([outfits], fetch)[0]
+
+def enrich_outfit_lists(outfit_lists, fetch):
+    """enrich_outfits for several outfit lists with a single fetch of all their ids"""
+    try:
+        ids = [outfit_ids(outfits) for outfits in outfit_lists]
+        all_ids = [i for list_ids in ids for i in list_ids]
+        if not all_ids:
+            logger.warning("No outfit_ids in predicted outfits")
+            return outfit_lists
+        with metrics.stage_seconds.time(stage="catalogue"):
+            catalogue_docs = fetch(list(dict.fromkeys(all_ids)))
+        return [
+            apply_catalogue(outfits, list_ids, catalogue_docs) if list_ids else outfits
+            for outfits, list_ids in zip(outfit_lists, ids)
+        ]
+    except Exception as e:
+        logger.error("MongoDB query or transformation failed: %s", e)
+        return [[] for _ in outfit_lists]
+
+async def enrich_outfits_async(outfits, fetch):
+    """enrich_outfits for an async fetch(ids) coroutine"""
+    try:
+        ids = outfit_ids(outfits)
+        if not ids:
+            logger.warning("No outfit_ids in predicted outfits")
+            return outfits
+        with metrics.stage_seconds.time(stage="catalogue"):
+            catalogue_docs = await fetch(ids)
+        return apply_catalogue(outfits, ids, catalogue_docs)
+    except Exception as e:
+        logger.error("MongoDB query or transformation failed: %s", e)
+        return []
+
+def build_response(features, outfits, model_version):
+    return {
+        "features": features,
+        "image_path": f"uploads/image_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg",
+        "outfits": outfits,
+        "model_version": model_version
+    }
+
+# Batch analysis (/analyze_images)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+# Zip bodies up to this size are spooled in memory, larger ones on disk
+ZIP_SPOOL_MEMORY = 8 * 1024 * 1024
+# Archive entries of any kind (directories, non-images) per image allowed
+ARCHIVE_ENTRIES_PER_IMAGE = 4
+
+_batch_executor = None
+_batch_executor_lock = threading.Lock()
+
+def get_batch_executor():
+    """Threads that run batch analyses in thread mode, one per model bundle"""
+    global _batch_executor
+    with _batch_executor_lock:
+        if _batch_executor is None:
+            _batch_executor = ThreadPoolExecutor(
+                max_workers=max(1, config.MODEL_POOL_SIZE), thread_name_prefix="batch")
+        return _batch_executor
+
+def _submit_batch_analysis(image_data, profile, content_hash=None):
+    if config.ANALYSIS_BACKEND == "process":
+        future = analysis_workers.submit_analysis(image_data, profile=profile.name, content_hash=content_hash)
+    else:
+        # Runs in the batch request's logging scope, like the single-image path
+        future = get_batch_executor().submit(
+            log_config.bind(analyze_image, image_data, None, profile.name, content_hash))
+    metrics.analyses_in_flight.inc()
+    future.add_done_callback(lambda _: metrics.analyses_in_flight.dec())
+    return future
+
+def _is_image_member(name):
+    base = name.rsplit('/', 1)[-1]
+    return (not base.startswith('.') and '__MACOSX/' not in name
+            and base.lower().endswith(IMAGE_EXTENSIONS))
+
+class _LimitedStream(io.RawIOBase):
+    """Read-through wrapper raising UploadRejected once more than max_bytes have been read"""
+
+    def __init__(self, stream, max_bytes):
+        self._stream = stream
+        self.max_bytes = max_bytes
+        self.size = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        data = self._stream.read(size)
+        self.size += len(data)
+        if self.max_bytes and self.size > self.max_bytes:
+            raise UploadRejected(f"Batch exceeds {self.max_bytes} bytes", 413)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+class _ArchiveBudget:
+    """Entry count and unpacked size limits shared by the zip and tar readers"""
+
+    def __init__(self, max_images, max_bytes):
+        self.max_images = max_images
+        self.max_entries = max(1, max_images) * ARCHIVE_ENTRIES_PER_IMAGE
+        self.max_bytes = max_bytes
+        self.entries = 0
+        self.images = 0
+        self.unpacked = 0
+
+    def admit(self, name, size):
+        """None when the image member may be read, else the UploadRejected to report for it.
+
+        Raises UploadRejected when the archive as a whole is over its limits.
+        """
+        self.images += 1
+        if self.images > self.max_images:
+            return UploadRejected(f"Batch is limited to {self.max_images} images", 413)
+        if config.MAX_UPLOAD_BYTES and size > config.MAX_UPLOAD_BYTES:
+            return UploadRejected(f"Upload exceeds {config.MAX_UPLOAD_BYTES} bytes", 413)
+        self.unpacked += size
+        if self.max_bytes and self.unpacked > self.max_bytes:
+            raise UploadRejected(f"Archive unpacks to more than {self.max_bytes} bytes", 413)
+        return None
+
+    def count_entry(self):
+        self.entries += 1
+        if self.entries > self.max_entries:
+            raise UploadRejected(f"Archive has more than {self.max_entries} entries", 413)
+
+def iter_archive(stream, kind, max_bytes=None, max_images=None):
+    """(name, bytes or UploadRejected) for each image in a zip or tar archive read from stream.
+
+    Members over MAX_UPLOAD_BYTES or past max_images (default
+    BATCH_MAX_IMAGES) come with an UploadRejected instead of being unpacked.
+    Raises UploadRejected when the body exceeds max_bytes (default
+    BATCH_MAX_BYTES), the members would unpack to more than that, or the
+    archive holds too many entries.
+    """
+    max_bytes = config.BATCH_MAX_BYTES if max_bytes is None else max_bytes
+    budget = _ArchiveBudget(config.BATCH_MAX_IMAGES if max_images is None else max_images, max_bytes)
+    stream = _LimitedStream(stream, max_bytes)
+    if kind == "zip":
+        # The zip index sits at the end of the file, so the archive is spooled
+        # first; sizes come from the index, and zipfile never inflates a
+        # member past its recorded size
+        with tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_MEMORY) as spool:
+            while chunk := stream.read(CHUNK_SIZE):
+                spool.write(chunk)
+            spool.seek(0)
+            with zipfile.ZipFile(spool) as archive:
+                for info in archive.infolist():
+                    budget.count_entry()
+                    if info.is_dir() or not _is_image_member(info.filename):
+                        continue
+                    rejected = budget.admit(info.filename, info.file_size)
+                    yield info.filename, rejected or archive.read(info)
+        return
+    # Tar members are read one at a time as the stream arrives; a rejected
+    # member's data is skipped, never buffered
+    with tarfile.open(fileobj=stream, mode="r|*") as archive:
+        for member in archive:
+            budget.count_entry()
+            if not member.isfile() or not _is_image_member(member.name):
+                continue
+            rejected = budget.admit(member.name, member.size)
+            yield member.name, rejected or archive.extractfile(member).read()
+
+def _batch_line(index, name, **fields):
+    return dict(index=index, name=name, **fields)
+
+def _finish_batch(completed, fetch):
+    """Result lines for analyses that finished together, recommended and enriched as one batch"""
+    lines = {}
+    analysed = []
+    for index, name, result in completed:
+        error = analysis_error(result)
+        if error is not None:
+            body, status_code, _ = error
+            lines[index] = _batch_line(index, name, status=status_code, **body)
+        else:
+            analysed.append((index, name, result))
+
+    if analysed:
+        outfit_lists, model_version = recommend_batch([result for _, _, result in analysed])
+        if fetch is not None:
+            outfit_lists = enrich_outfit_lists(outfit_lists, fetch)
+        for (index, name, features), outfits in zip(analysed, outfit_lists):
+            lines[index] = _batch_line(index, name, status=200, features=features,
+                                       outfits=outfits, model_version=model_version)
+    return [lines[index] for index in sorted(lines)]
+
+def analyze_batch(items, profile, fetch=None):
+    """Analyze (name, image bytes) items in parallel, yielding a result dict per item as it completes.
+
+    Items are consumed lazily, so at most a few uploads per worker are held
+    in memory. Analyses that complete together share one recommendation
+    pass and one catalogue fetch. Every item gets exactly one line, including
+    those past BATCH_MAX_IMAGES and those still waiting when the batch
+    times out. An item's bytes may be an UploadRejected (see iter_archive),
+    reported as that item's error.
+    """
+    items = iter(items)
+    if config.ANALYSIS_BACKEND == "process":
+        workers = analysis_workers.pool_size()
+    else:
+        workers = config.MODEL_POOL_SIZE
+    max_in_flight = 2 * max(1, workers)
+    pending = {}
+    count = 0
+    exhausted = False
+
+    while True:
+        while not exhausted and len(pending) < max_in_flight:
+            try:
+                name, image_data = next(items)
+            except StopIteration:
+                exhausted = True
+                break
+            index = count
+            count += 1
+            if count > config.BATCH_MAX_IMAGES:
+                # Keep going so every remaining item is answered
+                yield _batch_line(index, name, status=413,
+                                  error=f"Batch is limited to {config.BATCH_MAX_IMAGES} images")
+                continue
+            try:
+                if isinstance(image_data, UploadRejected):
+                    raise image_data
+                # Same size, dimension and header checks as a single upload
+                reader = UploadReader()
+                reader.feed(image_data)
+                image_data, content_hash = reader.finish()
+            except UploadRejected as e:
+                yield _batch_line(index, name, status=e.status, error=str(e))
+                continue
+            pending[_submit_batch_analysis(image_data, profile, content_hash)] = (index, name)
+
+        if not pending:
+            return
+
+        done, _ = wait(pending, timeout=config.ANALYSIS_TIMEOUT, return_when=FIRST_COMPLETED)
+        if not done:
+            logger.error("❌ Batch analysis made no progress in %ss", config.ANALYSIS_TIMEOUT)
+            if config.ANALYSIS_BACKEND == "process":
+                analysis_workers.recover()
+            for future, (index, name) in sorted(pending.items(), key=lambda item: item[1]):
+                future.cancel()
+                yield _batch_line(index, name, status=504, error="Analysis timed out")
+            # Items not yet started are answered too, without analysing them
+            for index, (name, _) in enumerate(items, count):
+                yield _batch_line(index, name, status=504, error="Batch timed out before this image")
+            return
+
+        completed = []
+        for future in done:
+            index, name = pending.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error("❌ Batch analysis failed for %s: %s", name, e)
+                result = {"error": str(e)}
+            completed.append((index, name, _record_latency(profile, result)))
+        yield from _finish_batch(completed, fetch)
+
+# Video streaming sessions (/stream)
+
+def stream_error(update):
+    """(body, status, extra headers) for a stream frame that failed, or None"""
+    if "error" not in update:
+        return None
+    body = {"error": update["error"], "frame": update.get("frame")}
+    if update.get("invalid"):
+        return body, 400, {}
+    if update.get("closed"):
+        return body, 404, {}
+    if update.get("busy"):
+        return body, 503, {"Retry-After": "1"}
+    return body, 500, {}
+
+def stream_response(update, fetch=None):
+    """Client message for a stream session update: the new smoothed features with their outfits"""
+    if "error" in update:
+        return update
+    outfits, model_version = recommend(update["features"])
+    if fetch is not None:
+        outfits = enrich_outfits(outfits, fetch)
+    return dict(update, outfits=outfits, model_version=model_version)
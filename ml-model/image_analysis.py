@@ -4,10 +4,17 @@ import mediapipe as mp
 import os
 import logging
 import hashlib
+import time
+from collections import namedtuple
 from datetime import datetime
+from functools import cached_property, partial
+import config
+import metrics
+from result_cache import ResultCache
+from model_pool import ModelPool, PoolExhaustedError
+from readiness import registry, ComponentLoadError
+from debug_capture import DebugCapture
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 # Suppress TensorFlow and MediaPipe warnings
@@ -20,47 +27,306 @@ mp_pose = mp.solutions.pose
 mp_face_detection = mp.solutions.face_detection
 mp_drawing = mp.solutions.drawing_utils
 
-pose = mp_pose.Pose(
-    static_image_mode=True,
-    model_complexity=2,  # Increased for better detection
-    enable_segmentation=False,
-    min_detection_confidence=0.3)  # Lowered threshold
+# Speed/accuracy tiers: pose model complexity, working height for pose
+# estimation, detection confidence for both graphs and landmark visibility
+PoseProfile = namedtuple(
+    "PoseProfile",
+    ["name", "model_complexity", "max_height", "min_detection_confidence", "min_visibility"])
 
-face_detection = mp_face_detection.FaceDetection(
-    model_selection=0,
-    min_detection_confidence=0.3)  # Lowered threshold
+POSE_PROFILES = {
+    "fast": PoseProfile("fast", 0, 480, 0.5, 0.5),
+    "balanced": PoseProfile("balanced", 1, 640, 0.4, 0.4),
+    "accurate": PoseProfile("accurate", 2, 800, 0.3, 0.3),
+}
+
+def get_pose_profile(name=None):
+    """Resolve a profile name (None = deployment default); raises ValueError for unknown names"""
+    name = (name or config.POSE_PROFILE).strip().lower()
+    if name not in POSE_PROFILES:
+        raise ValueError(f"Unknown pose profile '{name}', expected one of {sorted(POSE_PROFILES)}")
+    return POSE_PROFILES[name]
+
+class MediaPipeModels:
+    """One set of MediaPipe graphs per pose profile, used by a single thread at a time via the model pool.
+
+    Graphs for the default profile (or the given one) are built up front,
+    others on first use. With tracking=True the pose graph runs in video
+    mode, following the landmarks of the previous frame instead of
+    detecting from scratch; such a bundle belongs to one frame sequence.
+    """
+
+    def __init__(self, profile=None, tracking=False):
+        self.tracking = tracking
+        self._graphs = {}
+        self._load(profile or get_pose_profile())
+
+    def _load(self, profile):
+        pose = mp_pose.Pose(
+            static_image_mode=not self.tracking,
+            model_complexity=profile.model_complexity,
+            smooth_landmarks=self.tracking,
+            enable_segmentation=False,
+            min_detection_confidence=profile.min_detection_confidence,
+            min_tracking_confidence=profile.min_detection_confidence)
+
+        face_detection = mp_face_detection.FaceDetection(
+            model_selection=0,
+            min_detection_confidence=profile.min_detection_confidence)
+
+        self._graphs[profile.name] = (pose, face_detection)
+        return self._graphs[profile.name]
+
+    def graphs(self, profile):
+        """(pose, face_detection) graphs for profile"""
+        return self._graphs.get(profile.name) or self._load(profile)
+
+    def close(self):
+        """Release the native graph resources"""
+        for pose, face_detection in self._graphs.values():
+            pose.close()
+            face_detection.close()
+        self._graphs.clear()
+
+    @property
+    def pose(self):
+        return self.graphs(get_pose_profile())[0]
+
+    @property
+    def face_detection(self):
+        return self.graphs(get_pose_profile())[1]
+
+def _build_model_pool():
+    return ModelPool(
+        MediaPipeModels,
+        size=config.MODEL_POOL_SIZE,
+        timeout=config.MODEL_POOL_TIMEOUT)
+
+# Graphs are built on first use, or in the background once the server calls registry.start()
+mediapipe_models = registry.register("mediapipe", _build_model_pool)
+
+def get_model_pool():
+    return mediapipe_models.get()
+
+debug_capture = DebugCapture(
+    config.DEBUG_CAPTURE_DIR,
+    sample_rate=config.DEBUG_CAPTURE_RATE,
+    max_files=config.DEBUG_CAPTURE_MAX_FILES)
+
+result_cache = ResultCache(
+    max_entries=config.RESULT_CACHE_SIZE,
+    ttl_seconds=config.RESULT_CACHE_TTL,
+    db_path=config.RESULT_CACHE_DB or None)
+
+def get_content_hash(image_data):
+    """Full MD5 of the upload, used to key the result cache"""
+    return hashlib.md5(image_data).hexdigest()
+
+def result_cache_key(content_hash, reduction=None, profile=None):
+    """Result cache key for an upload analysed with this reduction and profile (resolved as analyze_image does)"""
+    reduction = supported_reduction(config.DECODE_REDUCTION if reduction is None else reduction)
+    return f"{content_hash}:{reduction}:{get_pose_profile(profile).name}"
 
 def get_image_hash(image_data):
     """Generate a unique hash for the image to ensure different results for different images"""
-    return hashlib.md5(image_data).hexdigest()[:8]
+    return get_content_hash(image_data)[:8]
+
+# cv2.imdecode flags for decode-time downscaling (libjpeg DCT scaling)
+_REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+def supported_reduction(reduction):
+    """reduction if decode_image can apply it, else 1 (full resolution)"""
+    if reduction in _REDUCED_DECODE_FLAGS:
+        return reduction
+    logger.warning("⚠️ Unsupported decode reduction %s, decoding at full resolution", reduction)
+    return 1
+
+def decode_image(image_data, reduction=1):
+    """Decode an uploaded image straight from memory, optionally downscaled by 2, 4 or 8 while decoding"""
+    flags = _REDUCED_DECODE_FLAGS[supported_reduction(reduction)]
+    buffer = np.frombuffer(image_data, dtype=np.uint8)
+    if buffer.size == 0:
+        return None
+    return cv2.imdecode(buffer, flags)
+
+def save_debug_upload(image_data, image_hash, timestamp):
+    """Write the raw upload to the debug directory (only used when DEBUG_SAVE_UPLOADS is on)"""
+    try:
+        os.makedirs(config.DEBUG_UPLOADS_DIR, exist_ok=True)
+        img_path = os.path.join(config.DEBUG_UPLOADS_DIR, f"upload_{image_hash}_{timestamp}.jpg")
+        with open(img_path, "wb") as f:
+            f.write(image_data)
+        logger.debug("📁 Debug upload saved to %s, size: %s bytes", img_path, len(image_data))
+    except OSError as e:
+        logger.warning("⚠️ Failed to save debug upload: %s", e)
+
+# Pose landmarks 0-10: nose, eyes, ears and mouth corners
+HEAD_LANDMARKS = range(11)
+# Head crop side as a multiple of the facial landmark span
+HEAD_BOX_SCALE = 3.0
+# Crops smaller than this are not worth a separate graph run
+MIN_ROI_SIDE = 64
+
+class AnalysisContext:
+    """Per-image analysis state shared by every feature extractor.
+
+    The RGB frame, the pose result and the face detections are computed lazily
+    on first use and then reused, so each MediaPipe graph runs once per image.
+    models is a MediaPipeModels bundle checked out by the caller; without one,
+    a bundle is borrowed from the model pool for each graph run. profile is the
+    PoseProfile deciding graph settings and the pose working resolution.
+    """
+
+    def __init__(self, img, image_hash, models=None, profile=None):
+        self.img = img
+        self.image_hash = image_hash
+        self.models = models
+        self.profile = profile or get_pose_profile()
+
+    def _run(self, graph_index, frame):
+        if self.models is not None:
+            return self.models.graphs(self.profile)[graph_index].process(frame)
+        with get_model_pool().checkout() as models:
+            return models.graphs(self.profile)[graph_index].process(frame)
+
+    @cached_property
+    def rgb(self):
+        return cv2.cvtColor(self.img, cv2.COLOR_BGR2RGB)
+
+    @cached_property
+    def pose_img(self):
+        """BGR image at the working resolution used for pose estimation"""
+        max_height = self.profile.max_height
+        height, width = self.img.shape[:2]
+        if height <= max_height:
+            return self.img
+        new_width = int(width * max_height / height)
+        logger.debug("Resized image to %sx%s for better processing", new_width, max_height)
+        return cv2.resize(self.img, (new_width, max_height))
+
+    @cached_property
+    def pose_results(self):
+        pose_rgb = self.rgb if self.pose_img is self.img else cv2.cvtColor(self.pose_img, cv2.COLOR_BGR2RGB)
+        return self._run(0, pose_rgb)
+
+    def level(self, max_side):
+        """Pyramid level: img downscaled so its longer side is at most max_side (cached per size)"""
+        levels = self.__dict__.setdefault("_levels", {})
+        if max_side not in levels:
+            height, width = self.img.shape[:2]
+            scale = max_side / max(height, width)
+            if scale >= 1:
+                levels[max_side] = self.img
+            else:
+                size = (max(1, int(width * scale)), max(1, int(height * scale)))
+                levels[max_side] = cv2.resize(self.img, size, interpolation=cv2.INTER_AREA)
+        return levels[max_side]
 
-def detect_body_ratios(img, image_hash):
+    def _visible_landmarks(self, indices=None):
+        """Pixel (x, y) of the visible pose landmarks in full-frame coordinates"""
+        if not self.pose_results.pose_landmarks:
+            return []
+        height, width = self.img.shape[:2]
+        landmarks = self.pose_results.pose_landmarks.landmark
+        if indices is not None:
+            landmarks = [landmarks[i] for i in indices]
+        return [(lm.x * width, lm.y * height) for lm in landmarks
+                if lm.visibility >= self.profile.min_visibility]
+
+    def _clamped_box(self, x0, y0, x1, y1):
+        height, width = self.img.shape[:2]
+        box = (max(0, int(x0)), max(0, int(y0)), min(width, int(x1)), min(height, int(y1)))
+        return box if box[2] - box[0] >= MIN_ROI_SIDE and box[3] - box[1] >= MIN_ROI_SIDE else None
+
+    @cached_property
+    def head_box(self):
+        """Full-frame (x0, y0, x1, y1) around the head located by the pose stage, or None"""
+        points = self._visible_landmarks(HEAD_LANDMARKS)
+        if len(points) < 3:
+            return None
+        xs, ys = [p[0] for p in points], [p[1] for p in points]
+        # Eye/ear/mouth landmarks span roughly the face width; widen to the whole head
+        span = max(max(xs) - min(xs), max(ys) - min(ys), 1)
+        half = span * HEAD_BOX_SCALE / 2
+        cx, cy = sum(xs) / len(xs), sum(ys) / len(ys)
+        return self._clamped_box(cx - half, cy - half, cx + half, cy + half)
+
+    @cached_property
+    def face_detections(self):
+        """Face detections in full-frame relative coordinates (empty list when none found).
+
+        The face graph runs on the head crop located by the pose stage; the
+        full frame is searched only when there is no crop or it holds no face.
+        """
+        box = self.head_box
+        if box is not None:
+            x0, y0, x1, y1 = box
+            crop = cv2.cvtColor(self.img[y0:y1, x0:x1], cv2.COLOR_BGR2RGB)
+            detections = self._run(1, crop).detections or []
+            if detections:
+                return [crop_detection_to_frame(d, box, self.img.shape) for d in detections]
+            logger.debug("No face in the head crop of %s; searching the full frame", self.image_hash)
+        return self._run(1, self.rgb).detections or []
+
+    @cached_property
+    def body_fallback_img(self):
+        """Small copy of the whole frame for the contour-based body fallback.
+
+        Deliberately not the person crop: the fallback classifies by the
+        aspect ratio of the largest contour, which a crop would change.
+        """
+        return self.level(config.FALLBACK_MAX_SIDE)
+
+def crop_detection_to_frame(detection, box, frame_shape):
+    """Copy of a face detection made on a crop, in full-frame relative coordinates"""
+    x0, y0, x1, y1 = box
+    height, width = frame_shape[:2]
+    crop_width, crop_height = x1 - x0, y1 - y0
+    mapped = type(detection)()
+    mapped.CopyFrom(detection)
+    location = mapped.location_data
+    bbox = location.relative_bounding_box
+    bbox.xmin = (x0 + bbox.xmin * crop_width) / width
+    bbox.ymin = (y0 + bbox.ymin * crop_height) / height
+    bbox.width = bbox.width * crop_width / width
+    bbox.height = bbox.height * crop_height / height
+    for keypoint in location.relative_keypoints:
+        keypoint.x = (x0 + keypoint.x * crop_width) / width
+        keypoint.y = (y0 + keypoint.y * crop_height) / height
+    return mapped
+
+def render_pose_debug(img, pose_landmarks):
+    """Copy of img with the pose landmarks drawn on it (runs on the debug capture thread)"""
+    debug_img = img.copy()
+    if pose_landmarks:
+        mp_drawing.draw_landmarks(debug_img, pose_landmarks, mp_pose.POSE_CONNECTIONS)
+    return debug_img
+
+def detect_body_ratios(img, image_hash, ctx=None):
     """Improved body type detection that works with your dataset"""
     if img is None:
         logger.error("Image not loaded")
         return {"body_type": "average", "error": "Image not loaded"}
 
-    # Resize image for better processing
-    height, width = img.shape[:2]
-    if height > 800:
-        scale = 800 / height
-        new_width = int(width * scale)
-        img = cv2.resize(img, (new_width, 800))
-        logger.debug(f"Resized image to {new_width}x800 for better processing")
+    if ctx is None:
+        ctx = AnalysisContext(img, image_hash)
 
-    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-    results = pose.process(img_rgb)
+    # Pose runs on the downscaled working image held by the context
+    img = ctx.pose_img
+    results = ctx.pose_results
     
-    # Save debug image
-    debug_img = img.copy()
+    # Sampled debug capture; drawing and encoding happen in the background
     if results.pose_landmarks:
-        mp_drawing.draw_landmarks(debug_img, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
-        cv2.imwrite(f"debug_pose_{image_hash}.jpg", debug_img)
-        logger.info(f"✅ Pose landmarks detected and saved to debug_pose_{image_hash}.jpg")
+        debug_capture.capture(f"debug_pose_{image_hash}", partial(render_pose_debug, img, results.pose_landmarks))
+        logger.info("✅ Pose landmarks detected for %s", image_hash)
     else:
         logger.warning("⚠️ No pose landmarks detected. Using fallback body type detection.")
-        cv2.imwrite(f"debug_pose_failed_{image_hash}.jpg", debug_img)
-        return detect_body_fallback(img, image_hash)
+        debug_capture.capture(f"debug_pose_failed_{image_hash}", partial(render_pose_debug, img, None))
+        return detect_body_fallback(ctx.body_fallback_img, image_hash)
 
     landmarks = results.pose_landmarks.landmark
     h, w = img.shape[:2]
@@ -75,9 +341,10 @@ def detect_body_ratios(img, image_hash):
         
         # Check if key landmarks are visible
         key_landmarks = [left_shoulder, right_shoulder, left_hip, right_hip]
-        if any(lm.visibility < 0.3 for lm in key_landmarks):
+        min_visibility = ctx.profile.min_visibility
+        if any(lm.visibility < min_visibility for lm in key_landmarks):
             logger.warning("⚠️ Key landmarks not clearly visible. Using fallback detection.")
-            return detect_body_fallback(img, image_hash)
+            return detect_body_fallback(ctx.body_fallback_img, image_hash)
 
         # Calculate basic measurements
         shoulder_width = abs(left_shoulder.x - right_shoulder.x) * w
@@ -86,7 +353,7 @@ def detect_body_ratios(img, image_hash):
         # Ensure measurements are reasonable
         if shoulder_width < 20 or hip_width < 20:
             logger.warning("⚠️ Measurements too small. Using fallback detection.")
-            return detect_body_fallback(img, image_hash)
+            return detect_body_fallback(ctx.body_fallback_img, image_hash)
 
         # Calculate shoulder to hip ratio
         shoulder_hip_ratio = shoulder_width / max(hip_width, 1)
@@ -100,15 +367,15 @@ def detect_body_ratios(img, image_hash):
         
         # Calculate arm span (if visible)
         arm_span = 0
-        if left_elbow.visibility > 0.3 and right_elbow.visibility > 0.3:
+        if left_elbow.visibility > min_visibility and right_elbow.visibility > min_visibility:
             arm_span = abs(left_elbow.x - right_elbow.x) * w
 
-        logger.debug(f"Body measurements for {image_hash}:")
-        logger.debug(f"  shoulder_width: {shoulder_width:.1f}px")
-        logger.debug(f"  hip_width: {hip_width:.1f}px")
-        logger.debug(f"  shoulder_hip_ratio: {shoulder_hip_ratio:.3f}")
-        logger.debug(f"  torso_length: {torso_length:.1f}px")
-        logger.debug(f"  arm_span: {arm_span:.1f}px")
+        logger.debug("Body measurements for %s:", image_hash)
+        logger.debug("  shoulder_width: %.1fpx", shoulder_width)
+        logger.debug("  hip_width: %.1fpx", hip_width)
+        logger.debug("  shoulder_hip_ratio: %.3f", shoulder_hip_ratio)
+        logger.debug("  torso_length: %.1fpx", torso_length)
+        logger.debug("  arm_span: %.1fpx", arm_span)
 
         # Improved body type classification
         # Use image hash for consistent variation between different images
@@ -151,7 +418,7 @@ def detect_body_ratios(img, image_hash):
         
         final_body_type = body_type_mapping.get(body_type, "average")
         
-        logger.info(f"✅ Detected body_type for {image_hash}: {final_body_type} (from {body_type})")
+        logger.info("✅ Detected body_type for %s: %s (from %s)", image_hash, final_body_type, body_type)
         
         return {
             "body_type": final_body_type,
@@ -165,8 +432,8 @@ def detect_body_ratios(img, image_hash):
         }
 
     except Exception as e:
-        logger.error(f"❌ Body measurement error: {str(e)}")
-        return detect_body_fallback(img, image_hash)
+        logger.error("❌ Body measurement error: %s", str(e))
+        return detect_body_fallback(ctx.body_fallback_img, image_hash)
 
 def detect_body_fallback(img, image_hash):
     """Fallback body detection using image analysis"""
@@ -190,7 +457,7 @@ def detect_body_fallback(img, image_hash):
             x, y, w, h = cv2.boundingRect(largest_contour)
             aspect_ratio = h / max(w, 1)
             
-            logger.debug(f"Fallback analysis: aspect_ratio={aspect_ratio:.3f}, hash_factor={hash_factor:.3f}")
+            logger.debug("Fallback analysis: aspect_ratio=%.3f, hash_factor=%.3f", aspect_ratio, hash_factor)
             
             # Use aspect ratio and hash to determine body type
             if aspect_ratio > 2.0:  # Tall and narrow
@@ -217,7 +484,7 @@ def detect_body_fallback(img, image_hash):
             else:
                 body_type = "average"
         
-        logger.info(f"✅ Fallback body_type for {image_hash}: {body_type}")
+        logger.info("✅ Fallback body_type for %s: %s", image_hash, body_type)
         
         return {
             "body_type": body_type,
@@ -226,7 +493,7 @@ def detect_body_fallback(img, image_hash):
         }
         
     except Exception as e:
-        logger.error(f"❌ Fallback detection failed: {str(e)}")
+        logger.error("❌ Fallback detection failed: %s", str(e))
         # Final fallback - use hash only
         hash_factor = int(image_hash[:2], 16) / 255.0
         body_types = ["average", "athletic", "pear", "hourglass", "rectangle"]
@@ -238,22 +505,65 @@ def detect_body_fallback(img, image_hash):
             "method": "hash_only"
         }
 
-def analyze_skin_tone(img, image_hash):
+# Colour spaces measured over the skin pixels, with their channel names
+SKIN_COLOR_SPACES = (
+    (cv2.COLOR_BGR2YCrCb, ("y", "cr", "cb")),
+    (cv2.COLOR_BGR2LAB, ("l", "a", "b")),
+    (cv2.COLOR_BGR2HSV, ("h", "s", "v")),
+)
+# OpenCV stores 8-bit hue as 0-179; every other channel spans 0-255
+_CHANNEL_RANGES = {"h": 180}
+
+def skin_statistics(face_roi, histogram_bins=0):
+    """Skin pixel count and per-channel means (optionally histograms) of a BGR face ROI.
+
+    The YCrCb skin mask is built once and the skin pixels are gathered once
+    into a single row; every colour space is then converted and averaged on
+    that row only, so the cost beyond the mask scales with the skin area
+    rather than with the ROI.
+    """
+    ycrcb = cv2.cvtColor(face_roi, cv2.COLOR_BGR2YCrCb)
+    skin_mask = cv2.inRange(ycrcb, (0, 133, 77), (255, 173, 127))
+    skin_pixels = cv2.countNonZero(skin_mask)
+    if skin_pixels == 0:
+        return {"skin_pixels": 0}
+
+    pixels = np.ascontiguousarray(face_roi).reshape(-1, 3)
+    skin_row = np.compress(skin_mask.reshape(-1) > 0, pixels, axis=0).reshape(1, -1, 3)
+
+    means = {}
+    histograms = {}
+    for conversion, channels in SKIN_COLOR_SPACES:
+        converted = cv2.cvtColor(skin_row, conversion)
+        means.update(zip(channels, cv2.mean(converted)[:3]))
+        if histogram_bins:
+            for i, name in enumerate(channels):
+                value_range = _CHANNEL_RANGES.get(name, 256)
+                hist = cv2.calcHist([converted], [i], None, [histogram_bins], [0, value_range])
+                histograms[name] = hist.ravel().astype(int).tolist()
+
+    stats = {"skin_pixels": skin_pixels, "means": means}
+    if histogram_bins:
+        stats["histograms"] = histograms
+    return stats
+
+def analyze_skin_tone(img, image_hash, ctx=None):
     """Improved skin tone analysis that works with your cool/warm dataset"""
     if img is None:
         logger.error("Image not loaded")
         return {"skin_tone": "neutral", "error": "Image not loaded"}
 
     try:
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        results = face_detection.process(img_rgb)
+        if ctx is None:
+            ctx = AnalysisContext(img, image_hash)
+        detections = ctx.face_detections
         
         skin_tone_detected = False
         skin_analysis = {}
 
-        if results.detections:
+        if detections:
             # Get the largest/most confident face detection
-            best_face = max(results.detections, 
+            best_face = max(detections, 
                           key=lambda d: d.location_data.relative_bounding_box.width * 
                                       d.location_data.relative_bounding_box.height)
             
@@ -266,31 +576,15 @@ def analyze_skin_tone(img, image_hash):
             if w > 50 and h > 50:  # Ensure face is large enough
                 face_roi = img[y:y+h, x:x+w]
                 
-                # Multiple color space analysis for better accuracy
-                # 1. YCbCr color space analysis
-                ycbcr = cv2.cvtColor(face_roi, cv2.COLOR_BGR2YCrCb)
-                y_ch, cr, cb = cv2.split(ycbcr)
-                
-                # Create skin mask using YCbCr
-                skin_mask = cv2.inRange(ycbcr, (0, 133, 77), (255, 173, 127))
-                skin_pixels = cv2.countNonZero(skin_mask)
+                # YCbCr, LAB and HSV statistics of the skin pixels in one pass
+                stats = skin_statistics(face_roi, config.SKIN_HISTOGRAM_BINS)
+                skin_pixels = stats["skin_pixels"]
                 
                 if skin_pixels > 500:  # Enough skin pixels detected
-                    # Calculate average Cr and Cb values for skin pixels
-                    cr_mean = np.mean(cr[skin_mask > 0])
-                    cb_mean = np.mean(cb[skin_mask > 0])
-                    
-                    # 2. LAB color space analysis
-                    lab = cv2.cvtColor(face_roi, cv2.COLOR_BGR2LAB)
-                    l, a, b = cv2.split(lab)
-                    a_mean = np.mean(a[skin_mask > 0])
-                    b_mean = np.mean(b[skin_mask > 0])
-                    
-                    # 3. HSV analysis
-                    hsv = cv2.cvtColor(face_roi, cv2.COLOR_BGR2HSV)
-                    h_ch, s, v = cv2.split(hsv)
-                    h_mean = np.mean(h_ch[skin_mask > 0])
-                    s_mean = np.mean(s[skin_mask > 0])
+                    means = stats["means"]
+                    cr_mean, cb_mean = means["cr"], means["cb"]
+                    a_mean, b_mean = means["a"], means["b"]
+                    h_mean, s_mean = means["h"], means["s"]
                     
                     skin_analysis = {
                         "cr_mean": cr_mean,
@@ -301,14 +595,16 @@ def analyze_skin_tone(img, image_hash):
                         "s_mean": s_mean,
                         "skin_pixels": skin_pixels
                     }
+                    if "histograms" in stats:
+                        skin_analysis["histograms"] = stats["histograms"]
                     
                     skin_tone_detected = True
                     
-                    logger.debug(f"Skin analysis for {image_hash}:")
-                    logger.debug(f"  Cr: {cr_mean:.1f}, Cb: {cb_mean:.1f}")
-                    logger.debug(f"  A: {a_mean:.1f}, B: {b_mean:.1f}")
-                    logger.debug(f"  H: {h_mean:.1f}, S: {s_mean:.1f}")
-                    logger.debug(f"  Skin pixels: {skin_pixels}")
+                    logger.debug("Skin analysis for %s:", image_hash)
+                    logger.debug("  Cr: %.1f, Cb: %.1f", cr_mean, cb_mean)
+                    logger.debug("  A: %.1f, B: %.1f", a_mean, b_mean)
+                    logger.debug("  H: %.1f, S: %.1f", h_mean, s_mean)
+                    logger.debug("  Skin pixels: %s", skin_pixels)
 
         # Determine skin tone based on analysis
         if skin_tone_detected:
@@ -357,9 +653,9 @@ def analyze_skin_tone(img, image_hash):
                 skin_tone = "neutral"
                 confidence = "medium"
                 
-            logger.info(f"✅ Skin tone analysis for {image_hash}:")
-            logger.info(f"   Warm score: {warm_score}, Cool score: {cool_score}")
-            logger.info(f"   Final result: {skin_tone} (confidence: {confidence})")
+            logger.info("✅ Skin tone analysis for %s:", image_hash)
+            logger.info("   Warm score: %s, Cool score: %s", warm_score, cool_score)
+            logger.info("   Final result: %s (confidence: %s)", skin_tone, confidence)
             
         else:
             # Fallback using image hash for consistency
@@ -374,7 +670,7 @@ def analyze_skin_tone(img, image_hash):
                 skin_tone = "neutral"
             
             confidence = "low"
-            logger.info(f"✅ Fallback skin tone for {image_hash}: {skin_tone}")
+            logger.info("✅ Fallback skin tone for %s: %s", image_hash, skin_tone)
 
         return {
             "skin_tone": skin_tone,
@@ -383,23 +679,25 @@ def analyze_skin_tone(img, image_hash):
         }
 
     except Exception as e:
-        logger.error(f"❌ Skin tone detection failed: {str(e)}")
+        logger.error("❌ Skin tone detection failed: %s", str(e))
         # Final fallback
         hash_factor = int(image_hash[2:4], 16) / 255.0
         skin_tone = "warm" if hash_factor > 0.5 else "cool"
         return {"skin_tone": skin_tone, "confidence": "low", "error": f"Detection failed: {str(e)}"}
 
-def detect_face_shape(img, image_hash):
+def detect_face_shape(img, image_hash, ctx=None):
     """Simplified face shape detection"""
     if img is None:
         logger.error("Image not loaded")
         return {"face_shape": "oval", "error": "Image not loaded"}
 
     try:
-        results = face_detection.process(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+        if ctx is None:
+            ctx = AnalysisContext(img, image_hash)
+        detections = ctx.face_detections
         
-        if results.detections:
-            face = results.detections[0]
+        if detections:
+            face = detections[0]
             bbox = face.location_data.relative_bounding_box
             
             # Calculate face aspect ratio
@@ -407,7 +705,7 @@ def detect_face_shape(img, image_hash):
             face_height = bbox.height
             aspect_ratio = face_height / max(face_width, 0.001)
             
-            logger.debug(f"Face aspect ratio for {image_hash}: {aspect_ratio:.3f}")
+            logger.debug("Face aspect ratio for %s: %.3f", image_hash, aspect_ratio)
             
             # Use hash for consistent variation
             hash_factor = int(image_hash[4:6], 16) / 255.0
@@ -426,57 +724,99 @@ def detect_face_shape(img, image_hash):
             face_shapes = ["oval", "round", "square", "heart", "oblong"]
             face_shape = face_shapes[int(hash_factor * len(face_shapes))]
         
-        logger.info(f"✅ Detected face_shape for {image_hash}: {face_shape}")
+        logger.info("✅ Detected face_shape for %s: %s", image_hash, face_shape)
         return {"face_shape": face_shape}
 
     except Exception as e:
-        logger.error(f"❌ Face shape detection failed: {str(e)}")
+        logger.error("❌ Face shape detection failed: %s", str(e))
         return {"face_shape": "oval", "error": f"Detection failed: {str(e)}"}
 
-def analyze_image(image_data):
-    """Main image analysis function with improved error handling"""
-    # Generate unique hash for this image
-    image_hash = get_image_hash(image_data)
+def analyze_frame(img, image_hash, models, profile):
+    """Features of one decoded video frame on a session's own (tracking) graphs.
+
+    Unlike analyze_image there is no cache or model pool: consecutive frames
+    must go through the same graphs for landmark tracking to work.
+    """
+    ctx = AnalysisContext(img, image_hash, models, profile)
+    body_results = detect_body_ratios(img, image_hash, ctx)
+    skin_results = analyze_skin_tone(img, image_hash, ctx)
+    face_results = detect_face_shape(img, image_hash, ctx)
+    return {
+        "body_type": body_results.get("body_type", "average"),
+        "skin_tone": skin_results.get("skin_tone", "neutral"),
+        "face_shape": face_results.get("face_shape", "oval"),
+        "confidence_scores": {
+            "body_type": body_results.get("confidence", "medium"),
+            "skin_tone": skin_results.get("confidence", "medium"),
+            "face_shape": "medium" if ctx.face_detections else "low"
+        },
+        "measurements": body_results.get("measurements", {})
+    }
+
+def analyze_image(image_data, reduction=None, profile=None, content_hash=None, use_cache=True):
+    """Main image analysis function with improved error handling.
+
+    With use_cache=False the result cache is left to the caller (the
+    process-pool backend keeps it in the serving process).
+    """
+    # Generate unique hash for this image (unless ingestion already hashed it)
+    content_hash = content_hash or get_content_hash(image_data)
+    image_hash = content_hash[:8]
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    img_path = f"temp_image_{image_hash}_{timestamp}.jpg"
+    # Normalised up front so the size check and cache key use the factor actually applied
+    reduction = supported_reduction(config.DECODE_REDUCTION if reduction is None else reduction)
+    try:
+        profile = get_pose_profile(profile)
+    except ValueError as e:
+        return {"error": str(e), "image_hash": image_hash}
     
-    logger.info(f"🔍 Starting analysis for image hash: {image_hash}")
+    # Identical uploads analysed the same way always produce the same result
+    cache_key = result_cache_key(content_hash, reduction, profile.name)
+    cached_result = result_cache.get(cache_key) if use_cache else None
+    if cached_result is not None:
+        logger.info("⚡ Cache hit for image hash: %s", image_hash)
+        cached_result["cached"] = True
+        return cached_result
+    
+    started = time.perf_counter()
+    stage_seconds = {}
+    logger.info("🔍 Starting analysis for image hash: %s", image_hash)
     
     try:
-        # Save image temporarily
-        with open(img_path, "wb") as f:
-            f.write(image_data)
-        
-        logger.debug(f"📁 Image saved to {img_path}, size: {os.path.getsize(img_path)} bytes")
+        if config.DEBUG_SAVE_UPLOADS:
+            save_debug_upload(image_data, image_hash, timestamp)
         
-        # Load and validate image
-        img = cv2.imread(img_path)
+        # Decode and validate image without touching disk
+        with metrics.timed(stage_seconds, "decode"):
+            img = decode_image(image_data, reduction)
         if img is None:
-            logger.error(f"❌ Failed to load image from {img_path}")
-            os.remove(img_path)
+            logger.error("❌ Failed to decode image %s (%s bytes)", image_hash, len(image_data))
             return {"error": "Failed to load image file"}
 
-        # Check image dimensions
+        # Check image dimensions (against the original size when decoded reduced)
         height, width = img.shape[:2]
-        logger.debug(f"📐 Image dimensions: {width}x{height}")
+        logger.debug("📐 Image dimensions: %sx%s (decode reduction %s)", width, height, reduction)
         
-        if width < 100 or height < 100:
-            logger.error(f"❌ Image too small: {width}x{height}")
-            os.remove(img_path)
+        if width * reduction < 100 or height * reduction < 100:
+            logger.error("❌ Image too small: %sx%s", width, height)
             return {"error": "Image too small for analysis"}
 
-        # Perform analysis
-        logger.info("🏃 Analyzing body structure...")
-        body_results = detect_body_ratios(img, image_hash)
-        
-        logger.info("🎨 Analyzing skin tone...")
-        skin_results = analyze_skin_tone(img, image_hash)
-        
-        logger.info("👤 Analyzing face shape...")
-        face_results = detect_face_shape(img, image_hash)
-        
-        # Clean up temporary file
-        os.remove(img_path)
+        # Perform analysis on a checked-out model bundle; the context shares
+        # detections between extractors
+        with get_model_pool().checkout() as models:
+            ctx = AnalysisContext(img, image_hash, models, profile)
+            
+            logger.info("🏃 Analyzing body structure...")
+            with metrics.timed(stage_seconds, "body"):
+                body_results = detect_body_ratios(img, image_hash, ctx)
+            
+            logger.info("🎨 Analyzing skin tone...")
+            with metrics.timed(stage_seconds, "skin"):
+                skin_results = analyze_skin_tone(img, image_hash, ctx)
+            
+            logger.info("👤 Analyzing face shape...")
+            with metrics.timed(stage_seconds, "face"):
+                face_results = detect_face_shape(img, image_hash, ctx)
         
         # Combine results
         analysis_result = {
@@ -485,6 +825,7 @@ def analyze_image(image_data):
             "face_shape": face_results.get("face_shape", "oval"),
             "image_hash": image_hash,
             "analysis_timestamp": timestamp,
+            "profile": profile.name,
             "confidence_scores": {
                 "body_type": body_results.get("confidence", "medium"),
                 "skin_tone": skin_results.get("confidence", "medium"),
@@ -506,17 +847,28 @@ def analyze_image(image_data):
         if errors:
             analysis_result["warnings"] = errors
         
-        logger.info(f"✅ Analysis complete for {image_hash}:")
-        logger.info(f"   Body Type: {analysis_result['body_type']}")
-        logger.info(f"   Skin Tone: {analysis_result['skin_tone']}")
-        logger.info(f"   Face Shape: {analysis_result['face_shape']}")
+        logger.info("✅ Analysis complete for %s:", image_hash)
+        logger.info("   Body Type: %s", analysis_result['body_type'])
+        logger.info("   Skin Tone: %s", analysis_result['skin_tone'])
+        logger.info("   Face Shape: %s", analysis_result['face_shape'])
         
+        analysis_result["analysis_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        if use_cache:
+            result_cache.set(cache_key, analysis_result)
+        if stage_seconds:
+            # Stage timings travel back to the serving process (which may not be
+            # this one) but are not cached
+            return dict(analysis_result, stage_seconds=stage_seconds)
         return analysis_result
         
+    except PoolExhaustedError as e:
+        logger.warning("⚠️ Analysis rejected for %s: %s", image_hash, e)
+        return {"error": "Server busy, please retry", "busy": True, "image_hash": image_hash}
+    except ComponentLoadError as e:
+        logger.error("❌ Analysis models unavailable for %s: %s", image_hash, e)
+        return {"error": "Analysis models unavailable", "busy": True, "image_hash": image_hash}
     except Exception as e:
-        logger.error(f"❌ Analysis failed for {image_hash}: {str(e)}")
-        if os.path.exists(img_path):
-            os.remove(img_path)
+        logger.error("❌ Analysis failed for %s: %s", image_hash, str(e))
         return {
             "body_type": "average",
             "skin_tone": "neutral", 
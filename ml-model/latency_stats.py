@@ -0,0 +1,37 @@
+"""Rolling latency statistics, grouped by a label such as the pose profile"""
+import threading
+from collections import defaultdict, deque
+
+
+class LatencyTracker:
+    """Keeps the last window samples per label and summarises them as percentiles"""
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._counts = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, label, millis):
+        with self._lock:
+            self._samples[label].append(millis)
+            self._counts[label] += 1
+
+    @staticmethod
+    def _percentile(ordered, fraction):
+        index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+        return ordered[index]
+
+    def summary(self, label):
+        with self._lock:
+            ordered = sorted(self._samples.get(label, ()))
+            count = self._counts.get(label, 0)
+        if not ordered:
+            return {"count": 0}
+        return {
+            "count": count,
+            "mean_ms": round(sum(ordered) / len(ordered), 1),
+            "p50_ms": round(self._percentile(ordered, 0.5), 1),
+            "p95_ms": round(self._percentile(ordered, 0.95), 1),
+            "max_ms": round(ordered[-1], 1),
+        }
@@ -0,0 +1,142 @@
+"""Logging set-up shared by the Flask app, the ASGI app and the analysis workers.
+
+LOG_MODE=dev (the default) prints every record as plain text on stdout.
+LOG_MODE=json is meant for production: records are queued and written as
+one JSON object per line by a background thread, so request threads never
+format messages or block on stdout. Each request logs one compact summary
+record; its INFO/DEBUG detail is kept only for the LOG_DETAIL_SAMPLE_RATE
+fraction of requests picked at random, while warnings and errors always are.
+"""
+import atexit
+import contextvars
+import functools
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+import config
+
+# Longest client-supplied X-Request-ID we accept as is
+MAX_REQUEST_ID_LENGTH = 64
+
+# (request_id, detail_sampled) for the request being handled, None outside one
+_current_request = contextvars.ContextVar("current_request", default=None)
+
+access_logger = logging.getLogger("access")
+
+_listener = None
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps records with the request id and drops the detail of unsampled requests.
+
+    background_detail decides INFO/DEBUG records logged outside any request
+    (start-up, model reloads, analysis worker processes).
+    """
+
+    def __init__(self, background_detail=True):
+        super().__init__()
+        self.background_detail = background_detail
+
+    def filter(self, record):
+        current = _current_request.get()
+        record.request_id = current[0] if current else getattr(record, "request_id", None)
+        if record.levelno >= logging.WARNING or getattr(record, "summary", False):
+            return True
+        return current[1] if current else self.background_detail
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; fields passed as extra={"fields": {...}} are merged in"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves the JSON formatting to the listener thread.
+
+    The stock prepare() runs the whole formatter in the logging thread; here
+    only the message is rendered, so arguments that change after the call
+    (a dict still being built, say) are logged as they were. Records the
+    filter dropped never reach prepare(), so unsampled detail stays lazy.
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def configure_logging(background_detail=True):
+    """Install the handlers for LOG_MODE on the root logger; safe to call more than once"""
+    global _listener
+    if config.LOG_MODE != "json":
+        logging.basicConfig(level=config.LOG_LEVEL, stream=sys.stdout)
+        return
+    if _listener is not None:
+        return
+
+    writer = logging.StreamHandler(sys.stdout)
+    writer.setFormatter(JsonFormatter())
+    handler = DeferredQueueHandler(queue.SimpleQueue())
+    handler.addFilter(RequestContextFilter(background_detail))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(config.LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(handler.queue, writer)
+    _listener.start()
+    # Flush what is still queued when the process exits
+    atexit.register(_listener.stop)
+
+
+def start_request(request_id=None):
+    """Enter a request's logging scope; returns (request_id, token for end_request)"""
+    request_id = (request_id or uuid.uuid4().hex)[:MAX_REQUEST_ID_LENGTH]
+    sampled = config.LOG_MODE != "json" or random.random() < config.LOG_DETAIL_SAMPLE_RATE
+    return request_id, _current_request.set((request_id, sampled))
+
+
+def end_request(token):
+    _current_request.reset(token)
+
+
+def log_request(method, path, status, started, request_id=None):
+    """The per-request summary record, kept whatever the detail sampling decided.
+
+    request_id is only needed when logging after the request's scope ended.
+    """
+    duration_ms = round((time.perf_counter() - started) * 1000, 1)
+    access_logger.info(
+        "%s %s %s %.1fms", method, path, status, duration_ms,
+        extra={"summary": True, "request_id": request_id,
+               "fields": {"method": method, "path": path, "status": status, "duration_ms": duration_ms}})
+
+
+def bind(fn, *args):
+    """fn(*args) as a callable that runs in the caller's logging scope, for executor threads"""
+    return functools.partial(contextvars.copy_context().run, fn, *args)
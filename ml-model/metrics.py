@@ -0,0 +1,215 @@
+"""In-process hot-path metrics rendered in the Prometheus text format.
+
+Recording is a dictionary update under a lock; with METRICS_ENABLED off
+every recording call returns immediately and timers are not started.
+"""
+import bisect
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+
+import config
+
+ENABLED = config.METRICS_ENABLED
+
+# Seconds; covers a cached lookup (~1ms) up to a slow full-resolution analysis
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_metrics = {}
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels
+    )
+    return "{" + pairs + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics[name] = self
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key):
+        return list(zip(self.labelnames, key))
+
+    def samples(self):
+        """(suffix, [(label, value), ...], value) for every sample"""
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield "", self._labels(key), value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        """Count the block as in flight while it runs"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the block in seconds"""
+        if not ENABLED:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            values = [(key, (list(counts), total)) for key, (counts, total) in self._values.items()]
+        for key, (counts, total) in values:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield "_bucket", labels + [("le", _format_value(bound))], cumulative
+            yield "_sum", labels, total
+            yield "_count", labels, cumulative
+
+
+class Collected(_Metric):
+    """Metric read from collect() at scrape time, for values other components already keep"""
+
+    def __init__(self, name, documentation, kind, collect):
+        super().__init__(name, documentation)
+        self.kind = kind
+        self._collect = collect
+
+    def samples(self):
+        for labels, value in self._collect():
+            yield "", sorted(labels.items()), value
+
+
+@contextmanager
+def timed(timings, stage):
+    """Store the block's duration in seconds as timings[stage]"""
+    if not ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = time.perf_counter() - started
+
+
+def instrumented(endpoint):
+    """Decorator timing a view and counting it as in flight, for sync and async views"""
+    def decorate(view):
+        if inspect.iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def async_wrapper(*args, **kwargs):
+                with requests_in_flight.track(endpoint=endpoint), request_seconds.time(endpoint=endpoint):
+                    return await view(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            with requests_in_flight.track(endpoint=endpoint), request_seconds.time(endpoint=endpoint):
+                return view(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in list(_metrics.values()):
+        try:
+            samples = list(metric.samples())
+        except Exception as e:
+            lines.append(f"# {metric.name} unavailable: {e}")
+            continue
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for suffix, labels, value in samples:
+            lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+stage_seconds = Histogram(
+    "fashion_stage_seconds", "Time spent in each request stage", ["stage"])
+request_seconds = Histogram(
+    "fashion_request_seconds", "End-to-end handler time per endpoint", ["endpoint"])
+requests_in_flight = Gauge(
+    "fashion_requests_in_flight", "Requests currently being handled per endpoint", ["endpoint"])
+analyses_in_flight = Gauge(
+    "fashion_analyses_in_flight", "Image analyses currently running or queued")
+recommend_strategy_total = Counter(
+    "fashion_recommend_strategy_total", "Recommendations served by each fallback strategy", ["strategy"])
+analysis_cache_total = Counter(
+    "fashion_analysis_cache_total", "Analysis result cache lookups by outcome", ["result"])
+stream_frames_total = Counter(
+    "fashion_stream_frames_total", "Streamed video frames by outcome", ["result"])
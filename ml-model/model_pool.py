@@ -0,0 +1,62 @@
+"""Pool of pre-initialised MediaPipe graphs that request threads check out"""
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class PoolExhaustedError(RuntimeError):
+    """Raised when no model bundle becomes free within the checkout timeout"""
+
+
+class ModelPool:
+    """Fixed-size pool of model bundles built by factory.
+
+    MediaPipe graphs are not safe to share between threads, so each request
+    checks out a whole bundle for the duration of its analysis. When every
+    bundle is in use, callers wait up to timeout seconds and then get a
+    PoolExhaustedError, which the server turns into back-pressure.
+    """
+
+    def __init__(self, factory, size=1, timeout=30.0):
+        self.size = max(1, size)
+        self.timeout = timeout
+        self._available = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._rejected = 0
+        # Bundles are independent, so build them concurrently
+        with ThreadPoolExecutor(max_workers=self.size) as builders:
+            for bundle in builders.map(lambda _: factory(), range(self.size)):
+                self._available.put(bundle)
+        logger.info("🧠 Model pool ready with %s bundle(s)", self.size)
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            bundle = self._available.get(timeout=timeout)
+        except queue.Empty:
+            with self._lock:
+                self._rejected += 1
+            raise PoolExhaustedError(f"No model bundle available after {timeout}s")
+        with self._lock:
+            self._in_use += 1
+        try:
+            yield bundle
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._available.put(bundle)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "in_use": self._in_use,
+                "available": self.size - self._in_use,
+                "rejected": self._rejected,
+            }
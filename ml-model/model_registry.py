@@ -0,0 +1,128 @@
+"""Versioned, hot-swappable holder for the recommender artifacts"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+ModelVersion = namedtuple("ModelVersion", ["version", "artifacts", "loaded_at", "load_seconds"])
+
+
+def fingerprint(paths):
+    """Short digest of the size and mtime of every watched path (missing paths count too)"""
+    digest = hashlib.sha1()
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        except OSError:
+            digest.update(f"{path}:missing".encode())
+    return digest.hexdigest()[:8]
+
+
+class ModelRegistry:
+    """Loads artifacts with loader() and swaps new versions in atomically.
+
+    reloader (default: loader) is used for every load after the first; it
+    should raise rather than degrade, so a broken artifact never replaces a
+    working version.
+
+    Readers call active once per request and keep using that ModelVersion, so
+    in-flight requests finish on the version they started with while a reload
+    builds the next one in the background. A failed reload leaves the active
+    version in place.
+    """
+
+    def __init__(self, loader, reloader=None, watch_paths=()):
+        self._loader = loader
+        self._reloader = reloader or loader
+        self.watch_paths = list(watch_paths)
+        self.active = None
+        self._serial = 0
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self.reloading = False
+        self.last_error = None
+
+    def _load_version(self, loader):
+        files = fingerprint(self.watch_paths)
+        started = time.perf_counter()
+        artifacts = loader()
+        self._serial += 1
+        return ModelVersion(
+            version=f"{self._serial}-{files}",
+            artifacts=artifacts,
+            loaded_at=datetime.now().isoformat(),
+            load_seconds=round(time.perf_counter() - started, 3))
+
+    def load_initial(self):
+        with self._reload_lock:
+            if self.active is None:
+                self.active = self._load_version(self._loader)
+                logger.info("📦 Model version %s active", self.active.version)
+            return self.active
+
+    def reload(self, reason="manual"):
+        """Load a new version and swap it in; returns the new ModelVersion or None on failure"""
+        with self._reload_lock:
+            self.reloading = True
+            logger.info("🔄 Reloading models (%s)...", reason)
+            try:
+                new_version = self._load_version(self._reloader)
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error("❌ Model reload failed, keeping version %s: %s", self.active and self.active.version, e)
+                return None
+            finally:
+                self.reloading = False
+            previous, self.active = self.active, new_version
+            self.last_error = None
+            logger.info("✅ Model version %s active (was %s)", new_version.version, previous and previous.version)
+            return new_version
+
+    def reload_async(self, reason="manual"):
+        """Start a background reload; returns False if one is already running"""
+        if self.reloading or self._reload_lock.locked():
+            return False
+        threading.Thread(target=self.reload, args=(reason,), name="model-reload", daemon=True).start()
+        return True
+
+    def start_watching(self, interval):
+        """Poll watch_paths every interval seconds and reload once a change has settled"""
+        if interval <= 0 or self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name="model-watch", daemon=True)
+        self._watcher.start()
+        logger.info("👀 Watching %s every %ss for new models", self.watch_paths, interval)
+
+    def _watch(self, interval):
+        seen = fingerprint(self.watch_paths)
+        pending = None
+        while True:
+            time.sleep(interval)
+            current = fingerprint(self.watch_paths)
+            if current == seen:
+                pending = None
+                continue
+            # Training writes several files; only reload once they stop changing
+            if current != pending:
+                pending = current
+                continue
+            if self.reload(reason="artifact change") is not None:
+                seen = current
+            pending = None
+
+    def status(self):
+        active = self.active
+        return {
+            "version": active.version if active else None,
+            "loaded_at": active.loaded_at if active else None,
+            "load_seconds": active.load_seconds if active else None,
+            "reloading": self.reloading,
+            "last_error": self.last_error,
+            "watching": self._watcher is not None,
+        }
@@ -0,0 +1,85 @@
+"""Precomputed lookup index over the outfit dataset"""
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_EMPTY = np.empty(0, dtype=np.intp)
+
+
+def _normalize(values):
+    return pd.Series(values, dtype=object).fillna("").astype(str).str.strip().str.lower()
+
+
+def _normalized_codes(series):
+    """(row codes, vocabulary) of a column's normalised values.
+
+    Only the distinct values are normalised: a Categorical (the compact
+    dataset) is read through its codes, never expanded to one string per row.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, categories = series.cat.codes.to_numpy(), series.cat.categories
+    else:
+        codes, categories = pd.factorize(series)
+    # Missing values (code -1, the last entry) become "" rather than
+    # astype(str)'s "nan", which a request could otherwise match
+    merged, vocabulary = pd.factorize(_normalize(list(categories) + [""]))
+    return merged[codes], np.asarray(vocabulary, dtype=object)
+
+
+class OutfitIndex:
+    """Hash lookups from normalised categorical values to row positions.
+
+    Built once when the dataset is loaded, so each matching strategy in
+    find_outfits_from_dataset is a dict lookup instead of a full-column
+    str.lower() comparison. Row positions are sorted, which keeps results in
+    dataset order exactly like boolean filtering did. Only the positions are
+    kept; the dataset itself is not copied.
+    """
+
+    CATEGORICAL_COLUMNS = ("body_type", "skin_tone", "face_shape", "occasion")
+    LOOKUP_KEYS = (("body_type", "skin_tone"), ("skin_tone",), ("body_type",))
+    GENERIC_OCCASION_PATTERN = "casual|formal|party"
+
+    def __init__(self, df):
+        self.size = len(df)
+        self.columns = set(df.columns)
+        normalized = {
+            col: _normalized_codes(df[col])
+            for col in self.CATEGORICAL_COLUMNS if col in df.columns
+        }
+        self._lookups = {}
+        for key in self.LOOKUP_KEYS:
+            if all(col in normalized for col in key):
+                self._lookups[key] = self._build_lookup(key, normalized)
+        if "occasion" in normalized:
+            codes, vocabulary = normalized["occasion"]
+            matches = pd.Series(vocabulary).str.contains(self.GENERIC_OCCASION_PATTERN).to_numpy()
+            self.generic_occasion_rows = np.flatnonzero(matches[codes])
+        else:
+            self.generic_occasion_rows = _EMPTY
+        logger.info("🗂️ Outfit index built over %s rows for keys %s", self.size, list(self._lookups))
+
+    @staticmethod
+    def _build_lookup(key, normalized):
+        frame = pd.DataFrame({col: normalized[col][0] for col in key})
+        groups = frame.groupby(list(key), sort=False).indices
+        lookup = {}
+        for codes, rows in groups.items():
+            codes = codes if isinstance(codes, tuple) else (codes,)
+            values = tuple(normalized[col][1][code] for col, code in zip(key, codes))
+            lookup[values] = rows.astype(np.intp)
+        return lookup
+
+    def has(self, *columns):
+        return all(col in self.columns for col in columns)
+
+    def lookup(self, columns, values):
+        """Sorted row positions where each of columns equals the matching value (case-insensitive)"""
+        table = self._lookups.get(tuple(columns))
+        if table is None:
+            return _EMPTY
+        key = tuple(str(v).strip().lower() for v in values)
+        return table.get(key, _EMPTY)
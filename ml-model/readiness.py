@@ -0,0 +1,102 @@
+"""Lazily loaded service components with load-state reporting for /ready"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ComponentLoadError(RuntimeError):
+    """Raised by Component.get when the component failed to load"""
+
+
+class Component:
+    """A named, expensive-to-build dependency (models, datasets, graph pools).
+
+    The loader runs at most once: either in a background thread started by
+    start(), or on the first get() from whichever thread asks first. Other
+    callers block until it finishes.
+    """
+
+    def __init__(self, name, loader):
+        self.name = name
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self.state = "pending"
+        self.value = None
+        self.error = None
+        self.load_seconds = None
+
+    def _claim(self):
+        with self._lock:
+            if self.state != "pending":
+                return False
+            self.state = "loading"
+            return True
+
+    def _load(self):
+        started = time.perf_counter()
+        logger.info("⏳ Loading component %s...", self.name)
+        try:
+            self.value = self._loader()
+            self.state = "ready"
+            logger.info("✅ Component %s ready in %.2fs", self.name, time.perf_counter() - started)
+        except Exception as e:
+            self.error = str(e)
+            self.state = "failed"
+            logger.error("❌ Component %s failed to load: %s", self.name, e)
+        finally:
+            self.load_seconds = round(time.perf_counter() - started, 3)
+            self._done.set()
+
+    def start(self):
+        """Begin loading in a background thread (no-op if already started)"""
+        if self._claim():
+            threading.Thread(target=self._load, name=f"load-{self.name}", daemon=True).start()
+
+    def get(self, timeout=None):
+        if self._claim():
+            self._load()
+        if not self._done.wait(timeout):
+            raise ComponentLoadError(f"Component {self.name} still loading after {timeout}s")
+        if self.state == "failed":
+            raise ComponentLoadError(f"Component {self.name} failed to load: {self.error}")
+        return self.value
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def status(self):
+        status = {"state": self.state, "load_seconds": self.load_seconds}
+        if self.error:
+            status["error"] = self.error
+        return status
+
+
+class ComponentRegistry:
+    def __init__(self):
+        self._components = {}
+
+    def register(self, name, loader):
+        component = Component(name, loader)
+        self._components[name] = component
+        return component
+
+    def __getitem__(self, name):
+        return self._components[name]
+
+    def start(self, names=None):
+        """Start loading the named components (all by default) concurrently in the background"""
+        for name in names or list(self._components):
+            self._components[name].start()
+
+    def is_ready(self, names=None):
+        return all(self._components[name].ready for name in names or self._components)
+
+    def status(self, names=None):
+        return {name: self._components[name].status() for name in names or self._components}
+
+
+registry = ComponentRegistry()
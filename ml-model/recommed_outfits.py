@@ -1,211 +1,423 @@
 import pandas as pd
+import numpy as np
 import joblib
 from collections import Counter
 import logging
+import os
 import random
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from outfit_index import OutfitIndex
+from batch_predict import BatchPredictor
+from readiness import registry
+from model_registry import ModelRegistry
+from compact_model import is_compact_artifact, load_compact
+import config
+import metrics
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-# Load saved models and dataset
-try:
-    models = joblib.load('models.pkl')
-    df = joblib.load('dataset.pkl')
-    target_cols = ["top", "bottom", "top_color", "bottom_color"]
-    logger.info(f"✅ Models and dataset loaded successfully. Dataset shape: {df.shape}")
-    logger.info(f"📊 Available columns: {list(df.columns)}")
-    
-    # Log unique values in key columns for debugging
-    if not df.empty:
-        logger.info(f"🎨 Unique skin tones in dataset: {df['skin_tone'].unique() if 'skin_tone' in df.columns else 'No skin_tone column'}")
-        logger.info(f"👤 Unique body types in dataset: {df['body_type'].unique() if 'body_type' in df.columns else 'No body_type column'}")
-        logger.info(f"🎯 Unique occasions in dataset: {df['occasion'].unique() if 'occasion' in df.columns else 'No occasion column'}")
+# Outfit text fields and their defaults when the dataset lacks the column
+OUTFIT_TEXT_COLUMNS = {
+    "top": "shirt",
+    "top_color": "blue",
+    "bottom": "pants",
+    "bottom_color": "black",
+    "occasion": "casual"
+}
+
+# Image URL fields and the dataset columns they may come from, in order of preference
+OUTFIT_URL_COLUMNS = {
+    "top_image_url": ("top_image_url", "top_url"),
+    "bottom_image_url": ("bottom_image_url", "bottom_url")
+}
+
+def _text_column(series, convert):
+    """convert(series) for a column of strings, without expanding Categoricals.
+
+    A Categorical (the compact dataset) with no missing values is converted
+    per category and keeps its codes, which stay on the mapped file.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        if not series.hasnans:
+            categories = convert(pd.Series(series.cat.categories, dtype=object))
+            if categories.is_unique:
+                return pd.Series(
+                    pd.Categorical.from_codes(series.cat.codes.to_numpy(), categories=categories),
+                    index=series.index, copy=False)
+        series = series.astype(object)
+    return convert(series)
+
+def _int_column(series):
+    """Whole-number column (truncated like astype(int)); missing or non-numeric values become <NA>"""
+    if pd.api.types.is_integer_dtype(series):
+        return series
+    return np.trunc(pd.to_numeric(series, errors='coerce')).astype('Int64')
+
+def _clean_url(series):
+    # The CSV wraps some URLs in stray quotes
+    return series.fillna('').astype(str).str.strip().str.strip('"')
+
+def project_outfits(df_subset):
+    """Project dataset rows onto the typed outfit columns in one columnar pass"""
+    projected = pd.DataFrame(index=df_subset.index)
+    if 'outfit_id' in df_subset.columns:
+        projected['outfit_id'] = _int_column(df_subset['outfit_id'])
+    else:
+        projected['outfit_id'] = df_subset.index.astype(int)
+    for col, default in OUTFIT_TEXT_COLUMNS.items():
+        if col in df_subset.columns:
+            projected[col] = _text_column(df_subset[col], lambda values: values.astype(str))
+        else:
+            projected[col] = default
+    if 'total_price' in df_subset.columns:
+        projected['total_price'] = _int_column(df_subset['total_price'])
+    for col, sources in OUTFIT_URL_COLUMNS.items():
+        source = next((src for src in sources if src in df_subset.columns), None)
+        if source is not None:
+            projected[col] = _text_column(df_subset[source], _clean_url)
+    return projected
+
+class RecommenderArtifacts:
+    """Models, dataset and the structures derived from them, loaded together"""
+
+    def __init__(self, models, df, target_cols, recommendation_table, ml_predictor=None):
+        self.models = models
+        self.df = df
+        self.target_cols = target_cols
+        self.recommendation_table = recommendation_table
+
+        # Lookup index and typed outfit projection over the dataset, built once
+        # so requests never rescan or re-convert columns
+        self.outfit_index = OutfitIndex(df)
+        self.outfit_frame = project_outfits(df)
+
+        # Shared batched scorer over the per-target models
+        self.ml_predictor = ml_predictor or BatchPredictor(models, target_cols)
+
+def _load_recommendation_table(path):
+    """Load the precomputed per-cell predictions built by train_models.py (empty table when missing)"""
+    try:
+        recommendation_table = joblib.load(path)
+        logger.info("📋 Recommendation table loaded with %s cells", len(recommendation_table['table']))
+        return recommendation_table
+    except Exception as e:
+        logger.warning("⚠️ No recommendation table available, using live ML inference: %s", e)
+        return {"feature_cols": [], "table": {}}
+
+def load_compact_artifacts(compact_dir, table_path='recommendation_table.pkl'):
+    """Memory-map the compact model/dataset export written by compact_model.export_compact"""
+    predictor, df = load_compact(compact_dir)
+    logger.info("✅ Compact models and dataset mapped from %s. Dataset shape: %s", compact_dir, df.shape)
+    return RecommenderArtifacts(
+        predictor.forests, df, list(predictor.targets), _load_recommendation_table(table_path), predictor)
+
+def load_artifacts(models_path='models.pkl', dataset_path='dataset.pkl', table_path='recommendation_table.pkl', strict=False):
+    """Load saved models, dataset and recommendation table concurrently (strict re-raises load errors)"""
+    if config.COMPACT_MODEL_DIR and is_compact_artifact(config.COMPACT_MODEL_DIR):
+        try:
+            return load_compact_artifacts(config.COMPACT_MODEL_DIR, table_path)
+        except Exception as e:
+            if strict:
+                # A reload must not swap in the stale pickles over a broken export
+                logger.error("❌ Failed to load compact artifact: %s", e)
+                raise
+            logger.error("❌ Failed to load compact artifact, falling back to pickles: %s", e)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        models_future = pool.submit(joblib.load, models_path)
+        df_future = pool.submit(joblib.load, dataset_path)
+        table_future = pool.submit(_load_recommendation_table, table_path)
+
+    try:
+        models = models_future.result()
+        df = df_future.result()
+        target_cols = ["top", "bottom", "top_color", "bottom_color"]
+        logger.info("✅ Models and dataset loaded successfully. Dataset shape: %s", df.shape)
+        logger.info("📊 Available columns: %s", list(df.columns))
         
-except Exception as e:
-    logger.error(f"❌ Failed to load models or dataset: {e}")
-    models = {}
-    df = pd.DataFrame()
-    target_cols = []
+        # Log unique values in key columns for debugging
+        if not df.empty:
+            logger.info("🎨 Unique skin tones in dataset: %s", df['skin_tone'].unique() if 'skin_tone' in df.columns else 'No skin_tone column')
+            logger.info("👤 Unique body types in dataset: %s", df['body_type'].unique() if 'body_type' in df.columns else 'No body_type column')
+            logger.info("🎯 Unique occasions in dataset: %s", df['occasion'].unique() if 'occasion' in df.columns else 'No occasion column')
+            
+    except Exception as e:
+        logger.error("❌ Failed to load models or dataset: %s", e)
+        if strict:
+            raise
+        models = {}
+        df = pd.DataFrame()
+        target_cols = []
+
+    return RecommenderArtifacts(models, df, target_cols, table_future.result())
+
+# Versioned artifacts: reloaded when the files below change or on an admin
+# call, swapped in atomically while in-flight requests keep their version
+model_versions = ModelRegistry(
+    load_artifacts,
+    reloader=partial(load_artifacts, strict=True),
+    watch_paths=[
+        'models.pkl',
+        'dataset.pkl',
+        'recommendation_table.pkl'
+    ] + ([os.path.join(config.COMPACT_MODEL_DIR, 'manifest.json')] if config.COMPACT_MODEL_DIR else []))
 
-def recommend_outfits(user_input):
+# First version is loaded on first use, or in the background once the server calls registry.start()
+recommender = registry.register("recommender", model_versions.load_initial)
+
+def get_model_version():
+    """The active ModelVersion; callers should fetch it once per request and reuse it"""
+    recommender.get()
+    return model_versions.active
+
+def get_artifacts():
+    return get_model_version().artifacts
+
+def recommend_outfits(user_input, artifacts=None):
     """Enhanced outfit recommendation that works with your actual dataset"""
-    logger.info(f"🎯 Starting recommendation process...")
-    logger.debug(f"📥 Received user_input: {user_input}")
+    logger.info("🎯 Starting recommendation process...")
+    logger.debug("📥 Received user_input: %s", user_input)
     
     if not user_input or not isinstance(user_input, dict):
         logger.error("❌ Invalid input to recommend_outfits")
         return []
 
-    # Prepare input data with defaults
-    input_data = {
-        "body_type": user_input.get("body_type", "average"),
-        "skin_tone": user_input.get("skin_tone", "neutral"),
-        "face_shape": user_input.get("face_shape", "oval"),
-        "occasion": user_input.get("occasion", "casual"),
-        "image_hash": user_input.get("image_hash", "default")
-    }
+    artifacts = artifacts or get_artifacts()
+    input_data = prepare_input(user_input)
     
-    logger.info(f"🔍 Processing recommendation for:")
-    logger.info(f"   Body Type: {input_data['body_type']}")
-    logger.info(f"   Skin Tone: {input_data['skin_tone']}")
-    logger.info(f"   Face Shape: {input_data['face_shape']}")
-    logger.info(f"   Image Hash: {input_data['image_hash']}")
+    logger.info("🔍 Processing recommendation for:")
+    logger.info("   Body Type: %s", input_data['body_type'])
+    logger.info("   Skin Tone: %s", input_data['skin_tone'])
+    logger.info("   Face Shape: %s", input_data['face_shape'])
+    logger.info("   Image Hash: %s", input_data['image_hash'])
 
     # Check if we have actual data to work with
-    if df.empty:
+    if artifacts.df.empty:
         logger.warning("⚠️ No dataset available. Generating synthetic recommendations.")
         return generate_synthetic_outfits(input_data)
 
     # Try to find outfits using your actual dataset
-    recommended_outfits = find_outfits_from_dataset(input_data)
+    recommended_outfits = find_outfits_from_dataset(input_data, artifacts)
     
     if not recommended_outfits:
         logger.warning("⚠️ No matches found in dataset. Generating synthetic recommendations.")
         recommended_outfits = generate_synthetic_outfits(input_data)
 
-    logger.info(f"✅ Final recommendations: {len(recommended_outfits)} outfits")
-    for i, outfit in enumerate(recommended_outfits, 1):
-        logger.info(f"   Outfit {i}: {outfit.get('top', 'N/A')} + {outfit.get('bottom', 'N/A')}")
-    
+    log_recommendations(recommended_outfits)
     return recommended_outfits
 
-def find_outfits_from_dataset(input_data):
+def prepare_input(user_input):
+    """Recommendation input with defaults for any missing features"""
+    return {
+        "body_type": user_input.get("body_type", "average"),
+        "skin_tone": user_input.get("skin_tone", "neutral"),
+        "face_shape": user_input.get("face_shape", "oval"),
+        "occasion": user_input.get("occasion", "casual"),
+        "image_hash": user_input.get("image_hash", "default")
+    }
+
+def log_recommendations(recommended_outfits):
+    logger.info("✅ Final recommendations: %s outfits", len(recommended_outfits))
+    for i, outfit in enumerate(recommended_outfits, 1):
+        logger.info("   Outfit %s: %s + %s", i, outfit.get('top', 'N/A'), outfit.get('bottom', 'N/A'))
+
+def recommend_outfits_batch(user_inputs, artifacts=None):
+    """recommend_outfits for many inputs, running their ML fallbacks as one batched prediction"""
+    artifacts = artifacts or get_artifacts()
+    results = [[] for _ in user_inputs]
+    needs_ml = []
+
+    for i, user_input in enumerate(user_inputs):
+        if not user_input or not isinstance(user_input, dict):
+            logger.error("❌ Invalid input to recommend_outfits_batch")
+            continue
+        input_data = prepare_input(user_input)
+        if artifacts.df.empty:
+            results[i] = generate_synthetic_outfits(input_data)
+            continue
+        matches = find_indexed_outfits(input_data, artifacts)
+        if matches:
+            results[i] = matches
+        else:
+            needs_ml.append((i, input_data))
+
+    use_ml = bool(artifacts.models and artifacts.target_cols)
+    if needs_ml and use_ml:
+        logger.info("🤖 Trying ML model predictions for %s input(s)...", len(needs_ml))
+    ml_outfits = get_ml_predictions_batch([d for _, d in needs_ml], artifacts) if needs_ml and use_ml else [[] for _ in needs_ml]
+    for (i, input_data), predicted in zip(needs_ml, ml_outfits):
+        if predicted:
+            metrics.recommend_strategy_total.inc(strategy="ml")
+        results[i] = (predicted
+                      or random_dataset_outfits(input_data, artifacts)
+                      or generate_synthetic_outfits(input_data))
+
+    logger.info("✅ Batch recommendations for %s inputs (%s via ML or fallback)", len(user_inputs), len(needs_ml))
+    return results
+
+def find_outfits_from_dataset(input_data, artifacts=None):
     """Find outfits from your actual dataset with multiple fallback strategies"""
+    artifacts = artifacts or get_artifacts()
+    
+    matches = find_indexed_outfits(input_data, artifacts)
+    if matches:
+        return matches
+    
+    # Strategy 5: Use ML models if available
+    if artifacts.models and artifacts.target_cols:
+        logger.info("🤖 Trying ML model predictions...")
+        ml_outfits = get_ml_predictions(input_data, artifacts)
+        if ml_outfits:
+            metrics.recommend_strategy_total.inc(strategy="ml")
+            return ml_outfits
+    
+    # Strategy 6: Random selection from dataset
+    random_selection = random_dataset_outfits(input_data, artifacts)
+    if random_selection:
+        return random_selection
+    
+    logger.warning("❌ No matches found in dataset")
+    return []
+
+def find_indexed_outfits(input_data, artifacts):
+    """Strategies 1-4: dataset rows matching the input's features, or [] when none do"""
+    outfit_index = artifacts.outfit_index
+    outfit_frame = artifacts.outfit_frame
     
     body_type = input_data["body_type"]
     skin_tone = input_data["skin_tone"]
     face_shape = input_data["face_shape"]
     image_hash = input_data["image_hash"]
     
-    logger.info(f"🔍 Searching dataset for matches...")
+    logger.info("🔍 Searching dataset for matches...")
     
     # Strategy 1: Try exact match on body_type and skin_tone
-    if 'body_type' in df.columns and 'skin_tone' in df.columns:
-        exact_matches = df[
-            (df['body_type'].str.lower() == body_type.lower()) & 
-            (df['skin_tone'].str.lower() == skin_tone.lower())
-        ]
+    if outfit_index.has('body_type', 'skin_tone'):
+        exact_matches = outfit_index.lookup(('body_type', 'skin_tone'), (body_type, skin_tone))
         
-        if not exact_matches.empty:
-            logger.info(f"✅ Found {len(exact_matches)} exact matches (body_type + skin_tone)")
-            return format_outfits(exact_matches.head(3), image_hash)
+        if len(exact_matches):
+            logger.info("✅ Found %s exact matches (body_type + skin_tone)", len(exact_matches))
+            metrics.recommend_strategy_total.inc(strategy="body_type_skin_tone")
+            return format_outfits(outfit_frame.iloc[exact_matches[:3]], image_hash)
     
     # Strategy 2: Try skin_tone only (since you mentioned you have cool/warm data)
-    if 'skin_tone' in df.columns:
-        skin_matches = df[df['skin_tone'].str.lower() == skin_tone.lower()]
+    if outfit_index.has('skin_tone'):
+        skin_matches = outfit_index.lookup(('skin_tone',), (skin_tone,))
         
-        if not skin_matches.empty:
-            logger.info(f"✅ Found {len(skin_matches)} skin tone matches")
-            return format_outfits(skin_matches.head(3), image_hash)
+        if len(skin_matches):
+            logger.info("✅ Found %s skin tone matches", len(skin_matches))
+            metrics.recommend_strategy_total.inc(strategy="skin_tone")
+            return format_outfits(outfit_frame.iloc[skin_matches[:3]], image_hash)
     
     # Strategy 3: Try body_type only
-    if 'body_type' in df.columns:
-        body_matches = df[df['body_type'].str.lower() == body_type.lower()]
+    if outfit_index.has('body_type'):
+        body_matches = outfit_index.lookup(('body_type',), (body_type,))
         
-        if not body_matches.empty:
-            logger.info(f"✅ Found {len(body_matches)} body type matches")
-            return format_outfits(body_matches.head(3), image_hash)
+        if len(body_matches):
+            logger.info("✅ Found %s body type matches", len(body_matches))
+            metrics.recommend_strategy_total.inc(strategy="body_type")
+            return format_outfits(outfit_frame.iloc[body_matches[:3]], image_hash)
     
     # Strategy 4: Try occasion-based matching
-    if 'occasion' in df.columns:
-        occasion_matches = df[df['occasion'].str.lower().str.contains('casual|formal|party', na=False)]
+    if outfit_index.has('occasion'):
+        occasion_matches = outfit_index.generic_occasion_rows
         
-        if not occasion_matches.empty:
-            logger.info(f"✅ Found {len(occasion_matches)} occasion-based matches")
-            return format_outfits(occasion_matches.head(3), image_hash)
+        if len(occasion_matches):
+            logger.info("✅ Found %s occasion-based matches", len(occasion_matches))
+            metrics.recommend_strategy_total.inc(strategy="occasion")
+            return format_outfits(outfit_frame.iloc[occasion_matches[:3]], image_hash)
     
-    # Strategy 5: Use ML models if available
-    if models and target_cols:
-        logger.info("🤖 Trying ML model predictions...")
-        ml_outfits = get_ml_predictions(input_data)
-        if ml_outfits:
-            return ml_outfits
-    
-    # Strategy 6: Random selection from dataset
-    if not df.empty:
-        logger.info("🎲 Using random selection from dataset")
-        random_selection = df.sample(n=min(3, len(df)))
-        return format_outfits(random_selection, image_hash)
-    
-    logger.warning("❌ No matches found in dataset")
     return []
 
-def format_outfits(df_subset, image_hash):
-    """Format dataset rows into outfit format"""
-    outfits = []
-    
-    for idx, row in df_subset.iterrows():
+def random_dataset_outfits(input_data, artifacts):
+    """Strategy 6: a random selection from the dataset"""
+    outfit_frame = artifacts.outfit_frame
+    if outfit_frame.empty:
+        return []
+    logger.info("🎲 Using random selection from dataset")
+    metrics.recommend_strategy_total.inc(strategy="random")
+    random_selection = outfit_frame.sample(n=min(3, len(outfit_frame)))
+    return format_outfits(random_selection, input_data["image_hash"])
+
+def format_outfits(outfit_rows, image_hash):
+    """Outfit dicts for rows of the pre-projected outfit frame (artifacts.outfit_frame)"""
+    if outfit_rows.empty:
+        return []
+
+    if 'total_price' not in outfit_rows.columns or outfit_rows['total_price'].hasnans:
         # Use hash to add some variation to prices
         hash_factor = int(image_hash[:2], 16) if image_hash != "default" else 50
-        base_price = hash_factor % 100 + 50  # Price between 50-150
-        
-        outfit = {
-            "outfit_id": int(row.get('outfit_id', idx)),
-            "top": str(row.get('top', 'shirt')),
-            "top_color": str(row.get('top_color', 'blue')),
-            "bottom": str(row.get('bottom', 'pants')),
-            "bottom_color": str(row.get('bottom_color', 'black')),
-            "occasion": str(row.get('occasion', 'casual')),
-            "total_price": int(row.get('total_price', base_price))
-        }
-        
-        # Add image URLs if available
-        if 'top_image_url' in row:
-            outfit['top_image_url'] = str(row['top_image_url'])
-        if 'bottom_image_url' in row:
-            outfit['bottom_image_url'] = str(row['bottom_image_url'])
-            
-        outfits.append(outfit)
-    
-    return outfits
+        price = hash_factor % 100 + 50  # Price between 50-150
+        if 'total_price' in outfit_rows.columns:
+            # Only rows whose dataset price is missing
+            price = outfit_rows['total_price'].fillna(price)
+        outfit_rows = outfit_rows.assign(total_price=price)
+
+    # Missing outfit ids (<NA>) come out as None
+    return outfit_rows.to_dict('records')
 
-def get_ml_predictions(input_data):
+def get_ml_predictions(input_data, artifacts=None):
     """Use ML models to predict outfit components"""
+    return get_ml_predictions_batch([input_data], artifacts)[0]
+
+def lookup_ml_predictions(inputs, artifacts=None):
+    """Ranked per-target predictions for each input, from the precomputed table where possible"""
+    artifacts = artifacts or get_artifacts()
+    feature_cols = artifacts.recommendation_table["feature_cols"]
+    table = artifacts.recommendation_table["table"]
+    predictions = [None] * len(inputs)
+    unseen = []
+    for i, input_data in enumerate(inputs):
+        cell = table.get(tuple(input_data.get(col) for col in feature_cols)) if feature_cols else None
+        if cell is not None:
+            predictions[i] = cell
+        else:
+            unseen.append(i)
+    
+    if unseen:
+        logger.debug("🤖 Running live inference for %s unseen feature combination(s)", len(unseen))
+        for i, predicted in zip(unseen, artifacts.ml_predictor.predict([inputs[i] for i in unseen], top_k=1)):
+            predictions[i] = predicted
+    return predictions
+
+def get_ml_predictions_batch(inputs, artifacts=None):
+    """Predict one ML-based outfit per input dict in a single batched pass (empty list where unavailable)"""
+    outfits = [[] for _ in inputs]
     try:
-        predictions = {}
+        predictions = lookup_ml_predictions(inputs, artifacts)
         
-        # Make predictions for each target
-        for target in target_cols:
-            if target not in models:
+        for i, (input_data, predicted) in enumerate(zip(inputs, predictions)):
+            if len(predicted) < 4:  # We need all predictions
                 continue
-                
-            model_data = models[target]
-            pipeline = model_data["pipeline"]
-            encoder = model_data["encoder"]
             
-            # Make prediction
-            pred_encoded = pipeline.predict(pd.DataFrame([input_data]))[0]
-            pred_label = encoder.inverse_transform([pred_encoded])[0]
-            predictions[target] = pred_label
+            labels = {target: ranked[0][0] for target, ranked in predicted.items()}
+            logger.debug("🤖 ML predicted: %s", labels)
             
-            logger.debug(f"🤖 ML predicted {target}: {pred_label}")
-        
-        if len(predictions) >= 4:  # We have all predictions
             # Create outfit from predictions
-            hash_factor = int(input_data.get('image_hash', 'default')[:2], 16) if input_data.get('image_hash') != 'default' else 50
+            hash_factor = int(input_data.get('image_hash', 'default')[:2], 16) if input_data.get('image_hash', 'default') != 'default' else 50
             
-            outfit = {
+            outfits[i] = [{
                 "outfit_id": 9000 + (hash_factor % 100),
-                "top": predictions.get("top", "shirt"),
-                "top_color": predictions.get("top_color", "blue"),
-                "bottom": predictions.get("bottom", "pants"),
-                "bottom_color": predictions.get("bottom_color", "black"),
+                "top": labels.get("top", "shirt"),
+                "top_color": labels.get("top_color", "blue"),
+                "bottom": labels.get("bottom", "pants"),
+                "bottom_color": labels.get("bottom_color", "black"),
                 "occasion": input_data.get("occasion", "casual"),
                 "total_price": hash_factor % 100 + 75
-            }
-            
-            logger.info("✅ Generated ML-based outfit")
-            return [outfit]
+            }]
+        
+        logger.info("✅ Generated ML-based outfits for %s/%s inputs", sum(1 for o in outfits if o), len(inputs))
             
     except Exception as e:
-        logger.error(f"❌ ML prediction failed: {str(e)}")
+        logger.error("❌ ML prediction failed: %s", str(e))
     
-    return []
+    return outfits
 
 def generate_synthetic_outfits(input_data):
     """Generate synthetic outfits when dataset is not available"""
     logger.info("🎨 Generating synthetic outfits...")
+    metrics.recommend_strategy_total.inc(strategy="synthetic")
     
     body_type = input_data["body_type"]
     skin_tone = input_data["skin_tone"]
@@ -281,5 +493,5 @@ def generate_synthetic_outfits(input_data):
         
         outfits.append(outfit)
     
-    logger.info(f"✅ Generated {len(outfits)} synthetic outfits")
+    logger.info("✅ Generated %s synthetic outfits", len(outfits))
     return outfits
@@ -0,0 +1,141 @@
+"""Bounded LRU/TTL cache, used for analyze_image results and catalogue documents"""
+import copy
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """Bounded LRU cache with TTL, e.g. keyed on the full content hash of an upload.
+
+    An optional sqlite file acts as a second tier that survives restarts;
+    entries found there are promoted back into memory. Values are
+    deep-copied in and out unless copy_values is False, in which case
+    callers share the stored objects and must not mutate them.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600, db_path=None, copy_values=True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._copy = copy.deepcopy if copy_values else (lambda value: value)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._db = None
+        if db_path:
+            self._open_db(db_path)
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def _open_db(self, db_path):
+        try:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.commit()
+            logger.info("💾 Result cache disk tier opened at %s", db_path)
+        except sqlite3.Error as e:
+            logger.error("❌ Failed to open result cache database %s: %s", db_path, e)
+            self._db = None
+
+    def _expired(self, created):
+        return self.ttl_seconds > 0 and time.time() - created > self.ttl_seconds
+
+    def _load_from_disk(self, key):
+        row = self._db.execute("SELECT value, created FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, created = row
+        if self._expired(created):
+            self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+            self._db.commit()
+            return None
+        return json.loads(value), created
+
+    def _store(self, key, value, created):
+        self._entries[key] = (value, created)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        """Return the cached result for key (a copy unless copy_values is off), or None on a miss"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[1]):
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return self._copy(entry[0])
+            if self._db is not None:
+                try:
+                    loaded = self._load_from_disk(key)
+                except (sqlite3.Error, ValueError) as e:
+                    logger.warning("⚠️ Result cache disk lookup failed: %s", e)
+                    loaded = None
+                if loaded is not None:
+                    self._store(key, loaded[0], loaded[1])
+                    self._disk_hits += 1
+                    return self._copy(loaded[0])
+            self._misses += 1
+            return None
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        created = time.time()
+        with self._lock:
+            self._store(key, self._copy(value), created)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO results (key, value, created) VALUES (?, ?, ?)",
+                        (key, json.dumps(value), created),
+                    )
+                    self._db.commit()
+                except (sqlite3.Error, TypeError, ValueError) as e:
+                    logger.warning("⚠️ Result cache disk write failed: %s", e)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._disk_hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "disk_tier": self._db is not None,
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_rate": round((self._hits + self._disk_hits) / lookups, 4) if lookups else 0.0,
+            }
@@ -17,7 +17,7 @@ fi
 
 # Install required packages
 echo "📦 Installing required packages..."
-pip install flask flask-cors pymongo opencv-python mediapipe numpy pandas joblib
+pip install flask flask-cors pymongo opencv-python mediapipe numpy pandas joblib fastapi uvicorn python-multipart websockets
 
 # Check if MongoDB is running
 echo "🔍 Checking MongoDB connection..."
@@ -32,6 +32,11 @@ except:
     exit(1)
 "
 
-# Start the Flask server
-echo "🌟 Starting Flask server on port 5001..."
-python app.py
+# Start the server; SERVER_MODE=asgi serves the async app with uvicorn
+if [ "$SERVER_MODE" = "asgi" ]; then
+    echo "🌟 Starting ASGI server on port 5001..."
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5001
+else
+    echo "🌟 Starting Flask server on port 5001..."
+    python app.py
+fi
@@ -0,0 +1,46 @@
+import os
+import sys
+from itertools import product
+
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import LabelEncoder, OneHotEncoder
+
+# The service modules live flat in ml-model/, next to this directory
+ML_MODEL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ML_MODEL_DIR)
+
+FEATURE_COLS = ["body_type", "skin_tone", "face_shape"]
+TARGET_COLS = ["top", "bottom", "top_color", "bottom_color"]
+
+
+@pytest.fixture(scope="session")
+def outfit_df():
+    """The outfit dataset shipped with the repo"""
+    return pd.read_csv(os.path.join(ML_MODEL_DIR, "expanded_outfit_dataset_with_id(in).csv"), encoding="latin1")
+
+
+@pytest.fixture(scope="session")
+def outfit_models(outfit_df):
+    """{target: {"pipeline", "encoder"}} fitted the way train_models.py fits them"""
+    models = {}
+    for target in TARGET_COLS:
+        encoder = LabelEncoder()
+        y = encoder.fit_transform(outfit_df[target])
+        pipeline = Pipeline([
+            ("preprocessor", ColumnTransformer([("cat", OneHotEncoder(handle_unknown="ignore"), FEATURE_COLS)])),
+            ("classifier", RandomForestClassifier(n_estimators=50, random_state=42)),
+        ])
+        pipeline.fit(outfit_df[FEATURE_COLS], y)
+        models[target] = {"pipeline": pipeline, "encoder": encoder}
+    return models
+
+
+@pytest.fixture(scope="session")
+def feature_inputs(outfit_df):
+    """Every combination of known feature values, plus values the encoders never saw"""
+    values = [list(outfit_df[col].unique()) + ["unseen"] for col in FEATURE_COLS]
+    return [dict(zip(FEATURE_COLS, combo)) for combo in product(*values)]
@@ -0,0 +1,55 @@
+from concurrent.futures import Future
+
+import pytest
+
+import analysis_workers
+from result_cache import ResultCache
+
+
+class StubExecutor:
+    """Hands out the Futures of submitted tasks without running them"""
+
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        self.futures.append(future)
+        return future
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ResultCache()
+    monkeypatch.setattr(analysis_workers, "result_cache", cache)
+    return cache
+
+
+def test_results_are_cached_in_the_serving_process(cache):
+    executor = StubExecutor()
+    future = analysis_workers.submit_analysis(b"upload", executor=executor, content_hash="abc123")
+    executor.futures[0].set_result({"body_type": "pear", "stage_seconds": {"decode": 0.01}})
+
+    assert future.result(timeout=1) == {"body_type": "pear", "stage_seconds": {"decode": 0.01}}
+    assert cache.stats()["entries"] == 1
+
+    again = analysis_workers.submit_analysis(b"upload", executor=executor, content_hash="abc123")
+    assert again.done() and len(executor.futures) == 1
+    assert again.result() == {"body_type": "pear", "cached": True}
+
+
+def test_errors_are_not_cached(cache):
+    executor = StubExecutor()
+    future = analysis_workers.submit_analysis(b"upload", executor=executor, content_hash="abc123")
+    executor.futures[0].set_result({"error": "Failed to load image file"})
+
+    assert future.result(timeout=1) == {"error": "Failed to load image file"}
+    assert cache.stats()["entries"] == 0
+
+
+def test_cancelling_cancels_the_queued_task(cache):
+    executor = StubExecutor()
+    future = analysis_workers.submit_analysis(b"upload", executor=executor, content_hash="abc123")
+
+    assert future.cancel()
+    assert executor.futures[0].cancelled()
@@ -0,0 +1,26 @@
+import pytest
+
+import app as server
+import config
+from catalogue_cache import CatalogueCache
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(server, "catalogue_cache", CatalogueCache(None))
+    return server.app.test_client()
+
+
+def test_admin_endpoints_are_disabled_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "")
+    response = client.post("/admin/catalogue/invalidate", environ_base={"REMOTE_ADDR": "127.0.0.1"})
+    assert response.status_code == 404
+    assert client.post("/admin/reload").status_code == 404
+
+
+def test_admin_endpoints_require_the_token(client, monkeypatch):
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "s3cret")
+    assert client.post("/admin/catalogue/invalidate").status_code == 403
+    assert client.post("/admin/catalogue/invalidate", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    response = client.post("/admin/catalogue/invalidate", headers={"X-Admin-Token": "s3cret"})
+    assert response.status_code == 200
@@ -0,0 +1,92 @@
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+import config
+from handlers import ARCHIVE_ENTRIES_PER_IMAGE, iter_archive
+from upload_ingest import UploadRejected
+
+
+def zip_archive(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def tar_archive(members):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+ARCHIVES = {"zip": zip_archive, "tar": tar_archive}
+
+
+@pytest.fixture(autouse=True)
+def limits(monkeypatch):
+    monkeypatch.setattr(config, "MAX_UPLOAD_BYTES", 1000)
+    monkeypatch.setattr(config, "BATCH_MAX_IMAGES", 3)
+    monkeypatch.setattr(config, "BATCH_MAX_BYTES", 100_000)
+
+
+def read(kind, members, **limits):
+    return list(iter_archive(io.BytesIO(ARCHIVES[kind](members)), kind, **limits))
+
+
+@pytest.mark.parametrize("kind", ARCHIVES)
+def test_only_image_members_are_read(kind):
+    items = read(kind, [("a.jpg", b"a"), ("notes.txt", b"t"), ("dir/b.PNG", b"b"),
+                        ("__MACOSX/._a.jpg", b"x"), (".hidden.jpg", b"h")])
+    assert items == [("a.jpg", b"a"), ("dir/b.PNG", b"b")]
+
+
+@pytest.mark.parametrize("kind", ARCHIVES)
+def test_images_past_the_limit_are_rejected_individually(kind):
+    items = read(kind, [(f"{i}.jpg", b"x") for i in range(4)])
+    assert [data for _, data in items[:3]] == [b"x"] * 3
+    name, rejected = items[3]
+    assert name == "3.jpg"
+    assert isinstance(rejected, UploadRejected) and rejected.status == 413
+
+
+@pytest.mark.parametrize("kind", ARCHIVES)
+def test_member_size_limit_is_inclusive(kind):
+    items = read(kind, [("exact.jpg", b"x" * 1000), ("over.jpg", b"x" * 1001)])
+    assert items[0][1] == b"x" * 1000
+    assert isinstance(items[1][1], UploadRejected) and items[1][1].status == 413
+
+
+@pytest.mark.parametrize("kind", ARCHIVES)
+def test_unpacked_size_limit(kind):
+    members = [(f"{i}.jpg", b"\x00" * 1000) for i in range(3)]
+    assert len(read(kind, members, max_bytes=3000)) == 3
+    # Highly compressible members stay under the body limit but not the unpacked one
+    with pytest.raises(UploadRejected, match="unpacks"):
+        read(kind, members, max_bytes=2999)
+
+
+@pytest.mark.parametrize("kind", ARCHIVES)
+def test_body_size_limit(kind):
+    # Random bytes don't compress, so the body outgrows the unpacked size
+    body = ARCHIVES[kind]([("a.jpg", os.urandom(800))])
+    assert len(list(iter_archive(io.BytesIO(body), kind, max_bytes=len(body)))) == 1
+    with pytest.raises(UploadRejected, match="Batch exceeds") as e:
+        list(iter_archive(io.BytesIO(body), kind, max_bytes=len(body) - 1))
+    assert e.value.status == 413
+
+
+@pytest.mark.parametrize("kind", ARCHIVES)
+def test_entry_count_limit(kind):
+    max_entries = config.BATCH_MAX_IMAGES * ARCHIVE_ENTRIES_PER_IMAGE
+    assert read(kind, [(f"{i}.txt", b"") for i in range(max_entries)]) == []
+    with pytest.raises(UploadRejected, match="entries"):
+        read(kind, [(f"{i}.txt", b"") for i in range(max_entries + 1)])
@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+from batch_predict import BatchPredictor
+from conftest import FEATURE_COLS
+
+
+def sklearn_proba(model, inputs):
+    return model["pipeline"].predict_proba(pd.DataFrame(inputs)[FEATURE_COLS])
+
+
+def sklearn_labels(model, inputs):
+    return list(model["encoder"].inverse_transform(model["pipeline"].predict(pd.DataFrame(inputs)[FEATURE_COLS])))
+
+
+def test_batch_predictor_matches_sklearn(outfit_models, feature_inputs):
+    results = BatchPredictor(outfit_models).predict(feature_inputs, top_k=3)
+    assert len(results) == len(feature_inputs)
+    for target, model in outfit_models.items():
+        proba = sklearn_proba(model, feature_inputs)
+        assert [row[target][0][0] for row in results] == sklearn_labels(model, feature_inputs)
+        for row, expected in zip(results, proba):
+            assert [p for _, p in row[target]] == pytest.approx(sorted(expected, reverse=True)[:3])
+
+
+def test_single_input_matches_batch(outfit_models, feature_inputs):
+    predictor = BatchPredictor(outfit_models)
+    batch = predictor.predict(feature_inputs[:5], top_k=2)
+    assert [predictor.predict([features], top_k=2)[0] for features in feature_inputs[:5]] == batch
+
+
+def test_target_subset(outfit_models, feature_inputs):
+    results = BatchPredictor(outfit_models, ["top", "missing"]).predict(feature_inputs[:1])
+    assert list(results[0]) == ["top"]
+
+
+def test_empty_batch():
+    assert BatchPredictor({}).predict([]) == []
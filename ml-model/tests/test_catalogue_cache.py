@@ -0,0 +1,92 @@
+import time
+
+import mongomock
+import pytest
+
+from catalogue_cache import CatalogueCache
+
+
+def outfit(outfit_id, top="shirt"):
+    return {
+        "outfit_id": outfit_id,
+        "top": {"name": top, "color": "white", "image_url": "top.jpg", "fabric": "cotton"},
+        "bottom": {"name": "jeans", "color": "blue", "image_url": "bottom.jpg"},
+        "occasion": "casual",
+        "total_price": 50,
+        "reviews": ["not part of the projection"],
+    }
+
+
+@pytest.fixture
+def collection():
+    collection = mongomock.MongoClient()["fashion"]["outfits"]
+    collection.insert_many([outfit(i) for i in range(1, 6)])
+    return collection
+
+
+def test_misses_are_fetched_once_with_projection(collection):
+    cache = CatalogueCache(collection)
+
+    docs = cache.get_many([1, 2, 99])
+    assert sorted(docs) == [1, 2]
+    assert "reviews" not in docs[1] and "_id" not in docs[1]
+    assert "fabric" not in docs[1]["top"]
+    assert cache.queries == 1
+
+    # Hits, including the cached miss for 99, never reach the collection again
+    assert sorted(cache.get_many([2, 1, 99])) == [1, 2]
+    assert cache.queries == 1
+    assert cache.get_many([3])[3]["top"]["name"] == "shirt"
+    assert cache.queries == 2
+
+
+def test_hits_share_the_cached_document(collection):
+    cache = CatalogueCache(collection)
+    first = cache.get_many([1])[1]
+    assert cache.get_many([1])[1] is first
+
+
+def test_preload_is_bounded_by_cache_size(collection):
+    cache = CatalogueCache(collection, max_entries=3)
+    assert cache.preload() == 3
+    assert cache.stats()["entries"] == 3
+
+
+def test_preload_is_skipped_when_the_cache_is_disabled(collection):
+    cache = CatalogueCache(collection, max_entries=0)
+    assert cache.preload() == 0
+    assert cache.queries == 0
+
+
+def test_invalidate_accepts_ids_as_sent_in_json(collection):
+    cache = CatalogueCache(collection)
+    cache.preload()
+    collection.update_one({"outfit_id": 2}, {"$set": {"top.name": "blazer"}})
+    collection.update_one({"outfit_id": 3}, {"$set": {"top.name": "hoodie"}})
+
+    cache.invalidate(["2", 3.0])
+    docs = cache.get_many([2, 3, 4])
+    assert docs[2]["top"]["name"] == "blazer"
+    assert docs[3]["top"]["name"] == "hoodie"
+    assert docs[4]["top"]["name"] == "shirt"
+
+
+def test_invalidate_everything(collection):
+    cache = CatalogueCache(collection)
+    cache.preload()
+    cache.invalidate()
+    assert cache.stats()["entries"] == 0
+
+
+def test_expired_entries_are_refetched(collection):
+    cache = CatalogueCache(collection, ttl_seconds=0.001)
+    cache.get_many([1])
+    time.sleep(0.01)
+    cache.get_many([1])
+    assert cache.queries == 2
+
+
+def test_without_collection_nothing_is_found():
+    cache = CatalogueCache(None)
+    assert cache.get_many([1]) == {}
+    assert cache.preload() == 0
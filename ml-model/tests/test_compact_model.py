@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch_predict import BatchPredictor
+from compact_model import export_compact, load_compact
+from conftest import FEATURE_COLS
+from recommed_outfits import project_outfits
+
+
+@pytest.fixture(scope="module")
+def compact_dir(outfit_models, outfit_df, tmp_path_factory):
+    out_dir = str(tmp_path_factory.mktemp("compact"))
+    export_compact(outfit_models, outfit_df, out_dir)
+    return out_dir
+
+
+def test_compact_forest_probabilities_match_sklearn(outfit_models, feature_inputs, compact_dir):
+    predictor, _ = load_compact(compact_dir)
+    for target, model in outfit_models.items():
+        forest = predictor.forests[target]
+        proba = forest.predict_proba(forest.encode(feature_inputs))
+        expected = model["pipeline"].predict_proba(pd.DataFrame(feature_inputs)[FEATURE_COLS])
+        np.testing.assert_allclose(proba, expected, atol=1e-6)
+
+
+def test_compact_predictor_matches_batch_predictor(outfit_models, feature_inputs, compact_dir):
+    predictor, _ = load_compact(compact_dir)
+    expected = BatchPredictor(outfit_models).predict(feature_inputs, top_k=2)
+    results = predictor.predict(feature_inputs, top_k=2)
+    for row, expected_row in zip(results, expected):
+        assert set(row) == set(expected_row)
+        for target, pairs in row.items():
+            assert [label for label, _ in pairs] == [label for label, _ in expected_row[target]]
+            assert [p for _, p in pairs] == pytest.approx([p for _, p in expected_row[target]], abs=1e-6)
+
+
+def test_compact_dataset_round_trips(outfit_df, compact_dir):
+    _, df = load_compact(compact_dir)
+    assert list(df.columns) == list(outfit_df.columns)
+    for col in outfit_df.columns:
+        assert df[col].tolist() == outfit_df[col].tolist(), col
+
+
+def mapped_backing(series):
+    values = series.array
+    return values.codes if isinstance(values, pd.Categorical) else series.to_numpy()
+
+
+def test_dataset_columns_stay_on_the_mapped_files(compact_dir):
+    _, df = load_compact(compact_dir)
+    for col in df.columns:
+        # Read-only means the array is the mmapped file, not a private copy
+        assert not mapped_backing(df[col]).flags.writeable, col
+
+
+def test_outfit_projection_stays_on_the_mapped_files(outfit_df, compact_dir):
+    _, df = load_compact(compact_dir)
+    projected = project_outfits(df)
+    for col in projected.columns:
+        assert not mapped_backing(projected[col]).flags.writeable, col
+    assert projected.to_dict("records") == project_outfits(outfit_df).to_dict("records")
@@ -0,0 +1,44 @@
+from video_stream import FeatureSmoother
+
+
+def frame(body_type="pear", skin_tone="warm", face_shape="oval", confidence="high"):
+    return {
+        "body_type": body_type, "skin_tone": skin_tone, "face_shape": face_shape,
+        "confidence_scores": {"body_type": confidence, "skin_tone": confidence, "face_shape": confidence},
+    }
+
+
+def test_first_frame_sets_every_feature():
+    assert FeatureSmoother(0.8).update(frame()) == {"body_type": "pear", "skin_tone": "warm", "face_shape": "oval"}
+
+
+def test_single_outlier_does_not_flip():
+    smoother = FeatureSmoother(0.8)
+    for _ in range(3):
+        smoother.update(frame())
+    assert smoother.update(frame(body_type="apple"))["body_type"] == "pear"
+
+
+def test_sustained_change_takes_over():
+    smoother = FeatureSmoother(0.8)
+    for _ in range(3):
+        smoother.update(frame())
+    results = [smoother.update(frame(body_type="apple"))["body_type"] for _ in range(5)]
+    assert results[0] == "pear" and results[-1] == "apple"
+
+
+def test_low_confidence_frames_count_for_less():
+    smoother = FeatureSmoother(1.0)
+    smoother.update(frame(body_type="pear", confidence="high"))
+    # Without decay: two low-confidence votes (0.8) still trail one high one (1.0)
+    smoother.update(frame(body_type="apple", confidence="low"))
+    assert smoother.update(frame(body_type="apple", confidence="low"))["body_type"] == "pear"
+    assert smoother.update(frame(body_type="apple", confidence="low"))["body_type"] == "apple"
+
+
+def test_decayed_votes_are_forgotten():
+    smoother = FeatureSmoother(0.1)
+    smoother.update(frame(body_type="apple"))
+    for _ in range(3):
+        smoother.update(frame())
+    assert "apple" not in smoother.votes["body_type"]
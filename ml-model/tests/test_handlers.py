@@ -0,0 +1,18 @@
+import config
+import handlers
+import log_config
+from image_analysis import get_pose_profile
+
+
+def test_batch_analyses_run_in_the_request_logging_scope(monkeypatch):
+    monkeypatch.setattr(config, "ANALYSIS_BACKEND", "thread")
+    monkeypatch.setattr(handlers, "analyze_image", lambda *args: {"scope": log_config._current_request.get()})
+
+    request_id, token = log_config.start_request("batch-1")
+    try:
+        future = handlers._submit_batch_analysis(b"upload", get_pose_profile())
+        scope = future.result(timeout=5)["scope"]
+    finally:
+        log_config.end_request(token)
+
+    assert scope[0] == request_id == "batch-1"
@@ -0,0 +1,106 @@
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+from mediapipe.framework.formats import detection_pb2, landmark_pb2
+
+from image_analysis import SKIN_COLOR_SPACES, AnalysisContext, crop_detection_to_frame, skin_statistics
+
+
+@pytest.fixture
+def face_roi():
+    """Synthetic BGR ROI: a noisy skin-coloured block on random background"""
+    rng = np.random.default_rng(0)
+    roi = rng.integers(0, 256, size=(120, 90, 3), dtype=np.uint8)
+    skin = np.array([120, 150, 200]) + rng.integers(-15, 16, size=(60, 50, 3))
+    roi[30:90, 20:70] = skin.astype(np.uint8)
+    return roi
+
+
+def test_skin_statistics_matches_masked_full_roi(face_roi):
+    # The formulation the fused pass replaced: convert the whole ROI, then
+    # average each channel under the YCrCb skin mask
+    skin_mask = cv2.inRange(cv2.cvtColor(face_roi, cv2.COLOR_BGR2YCrCb), (0, 133, 77), (255, 173, 127))
+    stats = skin_statistics(face_roi, histogram_bins=16)
+
+    assert stats["skin_pixels"] == cv2.countNonZero(skin_mask) > 0
+    for conversion, channels in SKIN_COLOR_SPACES:
+        converted = cv2.cvtColor(face_roi, conversion)
+        for i, name in enumerate(channels):
+            values = converted[:, :, i][skin_mask > 0]
+            assert stats["means"][name] == pytest.approx(np.mean(values), abs=1e-9)
+            value_range = 180 if name == "h" else 256
+            expected, _ = np.histogram(values, bins=16, range=(0, value_range))
+            assert stats["histograms"][name] == expected.tolist()
+
+
+def test_skin_statistics_without_skin():
+    blue = np.zeros((64, 64, 3), dtype=np.uint8)
+    blue[:, :, 0] = 255
+    assert skin_statistics(blue) == {"skin_pixels": 0}
+
+
+def detection(xmin, ymin, width, height, keypoints=()):
+    result = detection_pb2.Detection()
+    bbox = result.location_data.relative_bounding_box
+    bbox.xmin, bbox.ymin, bbox.width, bbox.height = xmin, ymin, width, height
+    for x, y in keypoints:
+        keypoint = result.location_data.relative_keypoints.add()
+        keypoint.x, keypoint.y = x, y
+    return result
+
+
+def relative_box(detection):
+    bbox = detection.location_data.relative_bounding_box
+    return pytest.approx((bbox.xmin, bbox.ymin, bbox.width, bbox.height))
+
+
+def test_crop_detection_maps_to_frame_and_leaves_source():
+    source = detection(0.25, 0.5, 0.5, 0.25, keypoints=[(0.5, 0.5)])
+    original = detection_pb2.Detection()
+    original.CopyFrom(source)
+
+    # 200x200 crop at (100, 50) of an 800x400 frame
+    mapped = crop_detection_to_frame(source, (100, 50, 300, 250), (400, 800, 3))
+
+    assert relative_box(mapped) == (0.1875, 0.375, 0.125, 0.125)
+    keypoint = mapped.location_data.relative_keypoints[0]
+    assert (keypoint.x, keypoint.y) == pytest.approx((0.25, 0.375))
+    assert source == original
+
+
+class StubGraph:
+    def __init__(self, result):
+        self.result = result
+        self.frames = []
+
+    def process(self, frame):
+        self.frames.append(frame)
+        return self.result
+
+
+def test_face_detections_in_head_crop_map_to_frame():
+    # Head landmarks centred on (200, 105) of a 400x600 frame, spanning 40px
+    landmarks = landmark_pb2.NormalizedLandmarkList()
+    points = [(0.45, 0.15)] * 5 + [(0.55, 0.2)] * 5 + [(0.5, 0.175)] + [(0.5, 0.6)] * 22
+    for x, y in points:
+        landmarks.landmark.add(x=x, y=y, visibility=1.0)
+    face = detection(0.25, 0.25, 0.5, 0.5)
+    original = detection_pb2.Detection()
+    original.CopyFrom(face)
+    pose_graph = StubGraph(SimpleNamespace(pose_landmarks=landmarks))
+    face_graph = StubGraph(SimpleNamespace(detections=[face]))
+    models = SimpleNamespace(graphs=lambda profile: (pose_graph, face_graph))
+
+    ctx = AnalysisContext(np.zeros((600, 400, 3), dtype=np.uint8), "test", models)
+
+    # Widened to HEAD_BOX_SCALE times the landmark span
+    x0, y0, x1, y1 = ctx.head_box
+    assert (x0, y0, x1, y1) == pytest.approx((140, 45, 260, 165), abs=1)
+    [mapped] = ctx.face_detections
+    width, height = x1 - x0, y1 - y0
+    assert face_graph.frames[0].shape[:2] == (height, width)
+    assert relative_box(mapped) == (
+        (x0 + 0.25 * width) / 400, (y0 + 0.25 * height) / 600, 0.5 * width / 400, 0.5 * height / 600)
+    assert face == original
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from outfit_index import OutfitIndex
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        "body_type": ["Pear ", "apple", "pear", None, "PEAR"],
+        "skin_tone": ["warm", "cool", "Warm", "warm", "cool"],
+        "face_shape": ["oval"] * 5,
+        "occasion": ["Casual", "gym", "formal dinner", np.nan, "Party"],
+    })
+
+
+def test_lookups_are_normalised_and_in_dataset_order(df):
+    index = OutfitIndex(df)
+    assert index.lookup(("body_type",), ("PEAR",)).tolist() == [0, 2, 4]
+    assert index.lookup(("body_type", "skin_tone"), ("pear", " warm ")).tolist() == [0, 2]
+    assert index.lookup(("skin_tone",), ("hot",)).tolist() == []
+
+
+def test_missing_values_do_not_match_nan(df):
+    index = OutfitIndex(df)
+    assert index.lookup(("body_type",), ("nan",)).tolist() == []
+    assert index.lookup(("body_type",), ("",)).tolist() == [3]
+
+
+def test_generic_occasion_rows(df):
+    assert OutfitIndex(df).generic_occasion_rows.tolist() == [0, 2, 4]
+
+
+def test_unindexed_columns(df):
+    index = OutfitIndex(df.drop(columns=["skin_tone", "occasion"]))
+    assert not index.has("skin_tone")
+    assert index.lookup(("body_type", "skin_tone"), ("pear", "warm")).tolist() == []
+    assert index.generic_occasion_rows.tolist() == []
+
+
+def test_categorical_columns_index_like_strings(df):
+    categorical = df.astype({col: "category" for col in df.columns})
+    plain, compact = OutfitIndex(df), OutfitIndex(categorical)
+    for key, values in ((("body_type", "skin_tone"), ("pear", "warm")), (("body_type",), ("",))):
+        assert compact.lookup(key, values).tolist() == plain.lookup(key, values).tolist()
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from recommed_outfits import format_outfits, project_outfits
+
+
+def outfits_df(**columns):
+    data = {
+        "outfit_id": [1, 2, 3],
+        "top": ["polo", "tee", "shirt"],
+        "total_price": [120, 80, 95],
+    }
+    data.update(columns)
+    return pd.DataFrame(data)
+
+
+def test_missing_price_gets_the_hash_price():
+    projected = project_outfits(outfits_df(total_price=[120, np.nan, 95.9]))
+    outfits = format_outfits(projected, "0a1b2c3d")
+
+    assert [outfit["total_price"] for outfit in outfits] == [120, 0x0a % 100 + 50, 95]
+    assert [outfit["outfit_id"] for outfit in outfits] == [1, 2, 3]
+
+
+def test_unparseable_ids_come_out_as_none():
+    projected = project_outfits(outfits_df(outfit_id=["1", "n/a", None]))
+    outfits = format_outfits(projected, "default")
+
+    assert [outfit["outfit_id"] for outfit in outfits] == [1, None, None]
+    assert [outfit["total_price"] for outfit in outfits] == [120, 80, 95]
+
+
+def test_integer_columns_are_kept_as_they_are():
+    df = outfits_df()
+    projected = project_outfits(df)
+
+    assert projected["outfit_id"].dtype == df["outfit_id"].dtype
+    assert format_outfits(projected, "default")[0] == {
+        "outfit_id": 1, "top": "polo", "top_color": "blue", "bottom": "pants",
+        "bottom_color": "black", "occasion": "casual", "total_price": 120,
+    }
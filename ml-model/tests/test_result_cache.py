@@ -0,0 +1,63 @@
+import time
+
+from result_cache import ResultCache
+
+
+def test_lru_eviction():
+    cache = ResultCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_ttl_expiry():
+    cache = ResultCache(ttl_seconds=0.001)
+    cache.set("a", 1)
+    time.sleep(0.01)
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_values_are_copied_by_default():
+    cache = ResultCache()
+    value = {"features": {"body_type": "pear"}}
+    cache.set("a", value)
+    value["features"]["body_type"] = "apple"
+    hit = cache.get("a")
+    hit["cached"] = True
+    assert cache.get("a") == {"features": {"body_type": "pear"}}
+
+
+def test_values_are_shared_without_copying():
+    cache = ResultCache(copy_values=False)
+    value = {"outfit_id": 1}
+    cache.set("a", value)
+    assert cache.get("a") is value
+
+
+def test_disabled_cache():
+    cache = ResultCache(max_entries=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "results.db")
+    ResultCache(db_path=path).set("a", {"body_type": "pear"})
+    cache = ResultCache(db_path=path)
+    assert cache.get("a") == {"body_type": "pear"}
+    assert cache.stats()["disk_hits"] == 1
+    cache.invalidate("a")
+    assert ResultCache(db_path=path).get("a") is None
+
+
+def test_hit_rate():
+    cache = ResultCache()
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
@@ -0,0 +1,27 @@
+import threading
+
+from video_stream import StreamSession
+
+
+def test_concurrent_frames_are_all_counted():
+    session = StreamSession()
+    session.close()
+    numbers = []
+
+    def pusher():
+        for _ in range(500):
+            # A closed session answers with the frame's number (None when
+            # another push holds the session at that moment)
+            update = session.push(b"frame")
+            if update is not None:
+                numbers.append(update["frame"])
+            session.drop()
+
+    threads = [threading.Thread(target=pusher) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert session.frames == 8 * 500 * 2
+    assert len(set(numbers)) == len(numbers)
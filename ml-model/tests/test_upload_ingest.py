@@ -0,0 +1,169 @@
+import io
+import struct
+
+import pytest
+
+import config
+from upload_ingest import (
+    HEADER_SCAN_LIMIT, INCOMPLETE, MULTIPART_SLACK, UNKNOWN, MultipartUpload, UploadReader,
+    UploadRejected, check_content_length, parse_image_header, read_upload)
+
+
+def jpeg(width, height, body=b"\x00" * 64, app_segment=b"JFIF\x00" + b"\x00" * 9):
+    """Minimal JPEG: SOI, an APP0 segment, a baseline frame header, then body"""
+    app0 = b"\xff\xe0" + struct.pack(">H", len(app_segment) + 2) + app_segment
+    sof0 = b"\xff\xc0" + struct.pack(">HBHHB", 11, 8, height, width, 1) + b"\x01\x11\x00"
+    return b"\xff\xd8" + app0 + sof0 + body
+
+
+def png(width, height, body=b"\x00" * 64):
+    ihdr = struct.pack(">II", width, height) + b"\x08\x02\x00\x00\x00"
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + ihdr + b"\x00" * 4 + body
+
+
+@pytest.fixture(autouse=True)
+def limits(monkeypatch):
+    monkeypatch.setattr(config, "MAX_UPLOAD_BYTES", 1000)
+    monkeypatch.setattr(config, "MIN_IMAGE_SIDE", 100)
+    monkeypatch.setattr(config, "MAX_IMAGE_PIXELS", 10_000)
+
+
+@pytest.mark.parametrize("data, expected", [
+    (jpeg(640, 480), ("jpeg", 640, 480)),
+    (png(320, 200), ("png", 320, 200)),
+    (b"GIF89a" + b"\x00" * 32, UNKNOWN),
+    (b"\xff\xd8\xff\xda" + b"\x00" * 32, UNKNOWN),
+    (b"", INCOMPLETE),
+    (b"\xff", INCOMPLETE),
+])
+def test_parse_image_header(data, expected):
+    assert parse_image_header(data) == expected
+
+
+@pytest.mark.parametrize("image", [jpeg(640, 480), png(640, 480)])
+def test_header_is_incomplete_until_the_size_fields_arrive(image):
+    complete = parse_image_header(image)
+    first_complete = next(n for n in range(len(image) + 1) if parse_image_header(image[:n]) != INCOMPLETE)
+    assert parse_image_header(image[:first_complete]) == complete
+    assert all(parse_image_header(image[:n]) == INCOMPLETE for n in range(first_complete))
+
+
+def test_frame_header_past_the_scan_limit_is_unknown():
+    # An oversized EXIF block pushes the frame header out of reach
+    big_app = b"\xff\xe1\xff\xff" + b"\x00" * 0xFFFD
+    data = b"\xff\xd8" + big_app * (HEADER_SCAN_LIMIT // len(big_app) + 1) + jpeg(640, 480)[2:]
+    assert parse_image_header(data) == INCOMPLETE
+    reader = UploadReader(max_bytes=0)
+    reader.feed(data[:HEADER_SCAN_LIMIT])
+    assert reader.header == UNKNOWN
+
+
+@pytest.mark.parametrize("side, rejected", [(99, True), (100, False)])
+def test_min_side_boundary(side, rejected):
+    reader = UploadReader()
+    if rejected:
+        with pytest.raises(UploadRejected) as e:
+            reader.feed(jpeg(side, 100))
+        assert e.value.status == 400
+    else:
+        reader.feed(jpeg(side, 100))
+
+
+@pytest.mark.parametrize("height, rejected", [(100, False), (101, True)])
+def test_max_pixels_boundary(height, rejected):
+    reader = UploadReader()
+    if rejected:
+        with pytest.raises(UploadRejected) as e:
+            reader.feed(png(100, height))
+        assert e.value.status == 413
+    else:
+        reader.feed(png(100, height))
+
+
+def test_byte_limit_is_inclusive():
+    image = jpeg(100, 100)
+    exact = image + b"\x00" * (config.MAX_UPLOAD_BYTES - len(image))
+    data, digest = read_upload(io.BytesIO(exact), chunk_size=7)
+    assert data == exact and len(digest) == 32
+    with pytest.raises(UploadRejected) as e:
+        read_upload(io.BytesIO(exact + b"\x00"), chunk_size=7)
+    assert e.value.status == 413
+
+
+def test_header_split_across_chunks_is_checked():
+    reader = UploadReader()
+    data = jpeg(50, 50)
+    with pytest.raises(UploadRejected):
+        for i in range(len(data)):
+            reader.feed(data[i:i + 1])
+    assert reader.size < len(data)
+
+
+def test_empty_upload_is_rejected():
+    with pytest.raises(UploadRejected) as e:
+        read_upload(io.BytesIO(b""))
+    assert e.value.status == 400
+
+
+def test_unknown_format_is_left_to_the_decoder():
+    data, _ = read_upload(io.BytesIO(b"GIF89a" + b"\x00" * 32))
+    assert data.startswith(b"GIF89a")
+
+
+@pytest.mark.parametrize("length, rejected", [
+    (None, False), (0, False), (1000 + MULTIPART_SLACK, False), (1001 + MULTIPART_SLACK, True)])
+def test_check_content_length(length, rejected):
+    if rejected:
+        with pytest.raises(UploadRejected) as e:
+            check_content_length(length)
+        assert e.value.status == 413
+    else:
+        check_content_length(length)
+
+
+def multipart(parts, boundary=b"BOUNDARY"):
+    body = b""
+    for name, filename, data in parts:
+        disposition = b'form-data; name="%s"' % name
+        if filename is not None:
+            disposition += b'; filename="%s"' % filename
+        body += b"--" + boundary + b"\r\nContent-Disposition: " + disposition + b"\r\n\r\n" + data + b"\r\n"
+    return body + b"--" + boundary + b"--\r\n", "multipart/form-data; boundary=" + boundary.decode()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 13, 4096])
+def test_multipart_image_part_is_extracted(chunk_size):
+    image = jpeg(100, 100)
+    body, content_type = multipart([(b"note", None, b"hello"), (b"image", b"a.jpg", image)])
+    upload = MultipartUpload(content_type)
+    for i in range(0, len(body), chunk_size):
+        upload.feed(body[i:i + chunk_size])
+    data, _ = upload.finish()
+    assert data == image
+    assert upload.filename == "a.jpg"
+
+
+@pytest.mark.parametrize("parts, message", [
+    ([(b"note", None, b"hello")], "No image file provided"),
+    ([(b"image", b"", jpeg(100, 100))], "No file selected"),
+])
+def test_multipart_missing_file(parts, message):
+    body, content_type = multipart(parts)
+    upload = MultipartUpload(content_type)
+    upload.feed(body)
+    with pytest.raises(UploadRejected, match=message):
+        upload.finish()
+
+
+def test_multipart_body_is_capped_outside_the_image_part():
+    body, content_type = multipart([(b"note", None, b"x" * (1000 + MULTIPART_SLACK)),
+                                    (b"image", b"a.jpg", jpeg(100, 100))])
+    upload = MultipartUpload(content_type)
+    with pytest.raises(UploadRejected) as e:
+        upload.feed(body)
+    assert e.value.status == 413
+
+
+def test_multipart_without_boundary():
+    with pytest.raises(UploadRejected):
+        MultipartUpload("multipart/form-data")
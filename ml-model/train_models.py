@@ -5,39 +5,38 @@ from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
 from sklearn.compose import ColumnTransformer
 import joblib
-
-# Load dataset
-df = pd.read_csv("expanded_outfit_dataset_with_id(in).csv", encoding="latin1")
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from batch_predict import BatchPredictor
+from compact_model import export_compact
 
 # Updated feature columns
 feature_cols = ["body_type", "skin_tone", "face_shape"]
 target_cols = ["top", "bottom", "top_color", "bottom_color"]
 
-# Save feature columns
-joblib.dump(feature_cols, 'feature_columns.pkl')
-
-# Train and save models
-for target in target_cols:
-    print(f"\n🔧 Training model for: {target}")
+def train_target(df, target, n_jobs=1, random_state=42):
+    """Fit one target model; returns its pipeline, encoder and report, or a skip reason"""
+    started = time.perf_counter()
 
     label_counts = df[target].value_counts()
     valid_labels = label_counts[label_counts >= 2].index
     filtered_df = df[df[target].isin(valid_labels)]
 
     if filtered_df.empty:
-        print(f"⚠️ Skipping {target}: Not enough data.")
-        continue
+        return {"target": target, "skipped": "Not enough data"}
 
     X = filtered_df[feature_cols]
     y = filtered_df[target]
 
     try:
         X_train, X_test, y_train_raw, y_test_raw = train_test_split(
-            X, y, test_size=0.2, random_state=42, stratify=y
+            X, y, test_size=0.2, random_state=random_state, stratify=y
         )
     except ValueError as e:
-        print(f"❌ Skipping {target}: {e}")
-        continue
+        return {"target": target, "skipped": str(e)}
 
     le = LabelEncoder()
     y_train = le.fit_transform(y_train_raw)
@@ -49,23 +48,101 @@ for target in target_cols:
 
     pipeline = Pipeline([
         ('preprocessor', preprocessor),
-        ('classifier', RandomForestClassifier(n_estimators=200, random_state=42))
+        ('classifier', RandomForestClassifier(n_estimators=200, random_state=random_state, n_jobs=n_jobs))
     ])
 
     pipeline.fit(X_train, y_train)
     accuracy = pipeline.score(X_test, y_test)
-    print(f"✅ Accuracy for {target}: {accuracy:.2f}")
 
-    joblib.dump(pipeline, f"{target}_model.pkl")
-    joblib.dump(le, f"{target}_encoder.pkl")
+    # Serving runs one request at a time per model; don't fan out on predict
+    pipeline.named_steps['classifier'].n_jobs = None
+
+    return {
+        "target": target,
+        "pipeline": pipeline,
+        "encoder": le,
+        "accuracy": accuracy,
+        "rows": len(filtered_df),
+        "classes": len(le.classes_),
+        "seconds": time.perf_counter() - started
+    }
+
+def train_all(df, cores=None, random_state=42):
+    """Train every target concurrently within a budget of cores CPU cores"""
+    cores = max(1, cores or os.cpu_count() or 1)
+    workers = min(len(target_cols), cores)
+    # Cores left over after one process per target go to each forest's n_jobs
+    n_jobs = max(1, cores // workers)
+    print(f"🔧 Training {len(target_cols)} targets on {workers} process(es) x {n_jobs} job(s)")
+
+    if workers == 1:
+        return [train_target(df, target, n_jobs, random_state) for target in target_cols]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(train_target, df, target, n_jobs, random_state) for target in target_cols]
+        return [future.result() for future in futures]
+
+def print_report(results, total_seconds):
+    print("\n📊 Training report")
+    print(f"{'target':<14}{'rows':>7}{'classes':>9}{'accuracy':>10}{'fit (s)':>9}")
+    for result in results:
+        if "skipped" in result:
+            print(f"{result['target']:<14}  ⚠️ skipped: {result['skipped']}")
+            continue
+        print(f"{result['target']:<14}{result['rows']:>7}{result['classes']:>9}"
+              f"{result['accuracy']:>10.2f}{result['seconds']:>9.2f}")
+    print(f"⏱️ Total training time: {total_seconds:.2f}s")
+
+def build_recommendation_table(models, df):
+    """Ranked predictions for every combination of feature values, so serving is a dictionary lookup"""
+    vocabularies = [sorted(df[col].dropna().astype(str).unique()) for col in feature_cols]
+    cells = [dict(zip(feature_cols, values)) for values in product(*vocabularies)]
+    predictions = BatchPredictor(models, target_cols).predict(cells, top_k=3)
+    return {
+        "feature_cols": feature_cols,
+        "target_cols": target_cols,
+        "table": {
+            tuple(cell[col] for col in feature_cols): ranked
+            for cell, ranked in zip(cells, predictions)
+        }
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the outfit recommendation models")
+    parser.add_argument("--data", default="expanded_outfit_dataset_with_id(in).csv", help="Outfit dataset CSV")
+    parser.add_argument("--cores", type=int, default=None, help="CPU core budget (default: all cores)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for splits and forests")
+    parser.add_argument("--out-dir", default=".", help="Directory to write the artifacts to")
+    args = parser.parse_args(argv)
+
+    # Load dataset
+    df = pd.read_csv(args.data, encoding="latin1")
+
+    # Save feature columns
+    os.makedirs(args.out_dir, exist_ok=True)
+    joblib.dump(feature_cols, os.path.join(args.out_dir, 'feature_columns.pkl'))
 
-# Save models dictionary and dataset
-models = {}
-for target in target_cols:
-    models[target] = {
-        "pipeline": joblib.load(f"{target}_model.pkl"),
-        "encoder": joblib.load(f"{target}_encoder.pkl")
+    # Train models and keep them in memory
+    started = time.perf_counter()
+    results = train_all(df, args.cores, args.seed)
+    print_report(results, time.perf_counter() - started)
+
+    models = {
+        result["target"]: {"pipeline": result["pipeline"], "encoder": result["encoder"]}
+        for result in results if "skipped" not in result
     }
-joblib.dump(models, 'models.pkl')
-joblib.dump(df, 'dataset.pkl')
-print("\n🎉 All models and dataset saved successfully.")
\ No newline at end of file
+
+    # Save models dictionary and dataset
+    joblib.dump(models, os.path.join(args.out_dir, 'models.pkl'))
+    joblib.dump(df, os.path.join(args.out_dir, 'dataset.pkl'))
+
+    # Flat, memory-mappable copy of the models and dataset for serving
+    export_compact(models, df, os.path.join(args.out_dir, 'compact_models'), target_cols)
+
+    recommendation_table = build_recommendation_table(models, df)
+    joblib.dump(recommendation_table, os.path.join(args.out_dir, 'recommendation_table.pkl'))
+    print(f"📋 Recommendation table saved with {len(recommendation_table['table'])} cells.")
+
+    print("\n🎉 All models and dataset saved successfully.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""Streaming upload ingestion: incremental hashing, size limits and header checks before decode"""
+import hashlib
+import logging
+import struct
+
+import config
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    try:
+        from multipart.multipart import MultipartParser, parse_options_header
+    except ImportError:  # only the ASGI app parses multipart bodies itself
+        MultipartParser = parse_options_header = None
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+# Give up looking for the JPEG frame header after this many bytes (EXIF
+# thumbnails can push it well past the first segment)
+HEADER_SCAN_LIMIT = 512 * 1024
+
+# Room for multipart boundaries and part headers around the file itself
+MULTIPART_SLACK = 64 * 1024
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Start-of-frame markers carrying the image size (all but DHT, JPG and DAC)
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# Markers without a length field
+JPEG_STANDALONE_MARKERS = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8, 0xD9}
+
+# parse_image_header results besides (format, width, height)
+INCOMPLETE = "incomplete"
+UNKNOWN = None
+
+
+class UploadRejected(Exception):
+    """An upload refused before analysis; status is the HTTP status to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _parse_jpeg(data):
+    i = 2
+    while True:
+        # Markers are 0xFF followed by a code; extra 0xFF bytes are fill
+        while i < len(data) and data[i] == 0xFF:
+            i += 1
+        if i >= len(data):
+            return INCOMPLETE
+        if data[i - 1] != 0xFF:
+            return UNKNOWN
+        marker = data[i]
+        i += 1
+        if marker in JPEG_STANDALONE_MARKERS:
+            continue
+        if i + 2 > len(data):
+            return INCOMPLETE
+        (length,) = struct.unpack(">H", data[i:i + 2])
+        if marker in JPEG_SOF_MARKERS:
+            if i + 7 > len(data):
+                return INCOMPLETE
+            height, width = struct.unpack(">HH", data[i + 3:i + 7])
+            return "jpeg", width, height
+        if marker == 0xDA:
+            # Scan data started without a frame header
+            return UNKNOWN
+        i += length
+
+
+def parse_image_header(data):
+    """(format, width, height) from the leading bytes of a JPEG or PNG.
+
+    Returns INCOMPLETE when more bytes are needed and UNKNOWN (None) for
+    other formats, which are left for the decoder to judge.
+    """
+    data = bytes(data[:HEADER_SCAN_LIMIT])
+    if data[:2] == b"\xff\xd8":
+        return _parse_jpeg(data)
+    if data[:8] == PNG_SIGNATURE[:len(data[:8])]:
+        if len(data) < 24:
+            return INCOMPLETE
+        if data[12:16] != b"IHDR":
+            return UNKNOWN
+        width, height = struct.unpack(">II", data[16:24])
+        return "png", width, height
+    if len(data) < 2:
+        return INCOMPLETE
+    return UNKNOWN
+
+
+def check_dimensions(image_format, width, height):
+    """Raise UploadRejected for images too small to analyse or too large to decode safely"""
+    if min(width, height) < config.MIN_IMAGE_SIDE:
+        raise UploadRejected(f"Image too small for analysis ({width}x{height})", 400)
+    if width * height > config.MAX_IMAGE_PIXELS:
+        raise UploadRejected(
+            f"Image too large ({width}x{height}, limit {config.MAX_IMAGE_PIXELS} pixels)", 413)
+
+
+def check_content_length(content_length, slack=MULTIPART_SLACK, limit=None):
+    """Refuse a request whose declared body is larger than any acceptable upload (limit, default MAX_UPLOAD_BYTES)"""
+    limit = config.MAX_UPLOAD_BYTES if limit is None else limit
+    if content_length and limit and content_length > limit + slack:
+        raise UploadRejected(f"Upload exceeds {limit} bytes", 413)
+
+
+class UploadReader:
+    """Accumulates an upload chunk by chunk, hashing as it goes.
+
+    The byte limit is enforced on every chunk, and the JPEG/PNG header is
+    checked as soon as enough bytes have arrived, so oversized or junk
+    uploads are refused before they are read in full or decoded.
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = config.MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+        self._md5 = hashlib.md5()
+        self._chunks = []
+        self.size = 0
+        self.header = INCOMPLETE
+
+    def feed(self, chunk):
+        if not chunk:
+            return
+        self.size += len(chunk)
+        if self.max_bytes and self.size > self.max_bytes:
+            raise UploadRejected(f"Upload exceeds {self.max_bytes} bytes", 413)
+        self._md5.update(chunk)
+        self._chunks.append(chunk)
+        if self.header == INCOMPLETE:
+            self._check_header()
+
+    def _check_header(self):
+        if len(self._chunks) > 1:
+            self._chunks = [b"".join(self._chunks)]
+        self.header = parse_image_header(self._chunks[0])
+        if self.header == INCOMPLETE and self.size >= HEADER_SCAN_LIMIT:
+            self.header = UNKNOWN
+        if self.header not in (INCOMPLETE, UNKNOWN):
+            check_dimensions(*self.header)
+
+    def finish(self):
+        """(image bytes, md5 hex digest) of the complete upload"""
+        if self.size == 0:
+            raise UploadRejected("Invalid or empty image data", 400)
+        if self.header == INCOMPLETE:
+            # Truncated header; the decoder will report it
+            self.header = UNKNOWN
+        return b"".join(self._chunks), self._md5.hexdigest()
+
+
+def read_upload(stream, max_bytes=None, chunk_size=CHUNK_SIZE):
+    """Read a file-like upload in chunks; returns (image bytes, md5 hex digest) or raises UploadRejected"""
+    reader = UploadReader(max_bytes)
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        reader.feed(chunk)
+    return reader.finish()
+
+
+class MultipartUpload:
+    """Feeds one file field of a multipart/form-data body into an UploadReader as the body streams in.
+
+    Nothing is spooled: the whole body is capped at the upload limit plus
+    MULTIPART_SLACK, and the image part goes through the reader's size and
+    header checks chunk by chunk. Other parts are skipped.
+    """
+
+    def __init__(self, content_type, field="image", max_bytes=None):
+        if MultipartParser is None:
+            raise RuntimeError("python-multipart is required to parse multipart uploads")
+        _, params = parse_options_header(content_type)
+        boundary = params.get(b"boundary")
+        if not boundary:
+            raise UploadRejected("Missing multipart boundary")
+        self.reader = UploadReader(max_bytes)
+        self.field = field.encode()
+        self.found = False
+        self.filename = None
+        self.size = 0
+        self.max_body = self.reader.max_bytes + MULTIPART_SLACK if self.reader.max_bytes else None
+        self._headers = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._in_field = False
+        self._parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+        })
+
+    def _on_part_begin(self):
+        self._headers = {}
+        self._in_field = False
+
+    def _on_header_field(self, data, start, end):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        # Only the first part carrying the field counts
+        if options.get(b"name") == self.field and not self.found:
+            self.found = True
+            self._in_field = True
+            self.filename = options.get(b"filename", b"").decode("utf-8", "replace")
+
+    def _on_part_data(self, data, start, end):
+        if self._in_field:
+            self.reader.feed(bytes(data[start:end]))
+
+    def feed(self, chunk):
+        self.size += len(chunk)
+        if self.max_body and self.size > self.max_body:
+            raise UploadRejected(f"Upload exceeds {self.reader.max_bytes} bytes", 413)
+        self._parser.write(chunk)
+
+    def finish(self):
+        """(image bytes, md5 hex digest) of the file field"""
+        self._parser.finalize()
+        if not self.found:
+            raise UploadRejected("No image file provided")
+        if not self.filename:
+            raise UploadRejected("No file selected")
+        return self.reader.finish()
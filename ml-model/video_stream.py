@@ -0,0 +1,304 @@
+"""Streaming analysis of video and live-camera frames with landmark tracking.
+
+A StreamSession owns MediaPipe graphs built in tracking mode, so after the
+first frame the pose graph follows the previous landmarks instead of running
+a cold detection. Frames are analysed only as often as the session keeps up
+with, body_type/skin_tone/face_shape are smoothed over recent frames, and
+push() returns an update only when the smoothed features change.
+
+The sessions' graphs are stateful, so frames are always analysed in this
+process, whatever ANALYSIS_BACKEND says.
+"""
+import hashlib
+import logging
+import threading
+import time
+import uuid
+
+import cv2
+
+import config
+import metrics
+from image_analysis import MediaPipeModels, analyze_frame, decode_image, get_pose_profile
+
+logger = logging.getLogger(__name__)
+
+SMOOTHED_FEATURES = ("body_type", "skin_tone", "face_shape")
+# Vote weight of a frame's classification by its confidence
+CONFIDENCE_WEIGHTS = {"high": 1.0, "medium": 0.7, "low": 0.4}
+# Votes decayed below this are forgotten
+MIN_VOTE = 0.01
+# Weight of the newest measurement in the analysis cost average
+COST_SMOOTHING = 0.3
+
+
+class SessionLimitError(Exception):
+    """Raised when STREAM_MAX_SESSIONS sessions are already open"""
+
+
+class FeatureSmoother:
+    """Confidence-weighted, exponentially decaying votes per feature.
+
+    A value takes over only once its votes outweigh the current value's, so
+    a single misclassified frame does not flip the result.
+    """
+
+    def __init__(self, decay):
+        self.decay = decay
+        self.votes = {name: {} for name in SMOOTHED_FEATURES}
+        self.current = {}
+
+    def update(self, features):
+        """Fold in one frame's features; returns the smoothed values"""
+        confidence = features.get("confidence_scores", {})
+        for name in SMOOTHED_FEATURES:
+            votes = self.votes[name]
+            for value in list(votes):
+                votes[value] *= self.decay
+                if votes[value] < MIN_VOTE:
+                    del votes[value]
+            value = features[name]
+            votes[value] = votes.get(value, 0.0) + CONFIDENCE_WEIGHTS.get(confidence.get(name), 0.7)
+            leader = max(votes, key=votes.get)
+            held = self.current.get(name)
+            if held is None or votes[leader] > votes.get(held, 0.0):
+                self.current[name] = leader
+        return dict(self.current)
+
+
+class StreamSession:
+    """Tracking graphs, frame skipping and feature smoothing for one frame sequence.
+
+    profile is a PoseProfile (None = deployment default). Classification
+    varies with the image hash, so the whole session uses one hash derived
+    from its id to keep the features stable from frame to frame.
+    """
+
+    def __init__(self, profile=None, session_id=None):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.profile = profile or get_pose_profile()
+        self.image_hash = hashlib.md5(self.session_id.encode()).hexdigest()[:8]
+        self.models = None
+        self.smoother = FeatureSmoother(config.STREAM_SMOOTHING)
+        self.features = None
+        self.frames = 0
+        self.analysed = 0
+        self.cost = None
+        self.backoff = 1
+        self.last_analysed = None
+        self.last_seen = time.monotonic()
+        self.closed = False
+        self._lock = threading.Lock()
+        # Held only to count frames: _lock is busy for a whole analysis
+        self._count_lock = threading.Lock()
+
+    @property
+    def interval(self):
+        """Least time between analysed frames: the analysis cost (or the fps cap), stretched while features hold"""
+        floor = 1.0 / config.STREAM_MAX_FPS if config.STREAM_MAX_FPS > 0 else 0.0
+        return max(floor, self.cost or 0.0) * self.backoff
+
+    def push(self, frame, timestamp=None):
+        """Offer one frame (BGR array or encoded image bytes); returns an update dict or None.
+
+        timestamp is the frame time in seconds, the arrival time when omitted.
+        Frames arriving while an earlier one is still being analysed, or
+        sooner than interval after the last analysed one, are skipped. An
+        update is returned only when the smoothed features changed, or an
+        {"error": ...} dict when the frame could not be analysed: flagged
+        "invalid" for an undecodable frame, "busy" when the graphs could not
+        be built and "closed" once the session has been closed.
+        """
+        self.last_seen = time.monotonic()
+        if timestamp is None:
+            timestamp = self.last_seen
+        number = self._count_frame()
+        if not self._lock.acquire(blocking=False):
+            metrics.stream_frames_total.inc(result="skipped")
+            return None
+        try:
+            if self.closed:
+                # A caller still holding a session that was closed or expired
+                return {"error": "Stream session is closed", "closed": True, "frame": number}
+            if self.last_analysed is not None and timestamp - self.last_analysed < self.interval:
+                metrics.stream_frames_total.inc(result="skipped")
+                return None
+            return self._analyse(frame, timestamp, number)
+        finally:
+            self._lock.release()
+
+    def _count_frame(self):
+        with self._count_lock:
+            self.frames += 1
+            return self.frames
+
+    def _analyse(self, frame, timestamp, number):
+        if isinstance(frame, (bytes, bytearray, memoryview)):
+            frame = decode_image(frame, config.DECODE_REDUCTION)
+        if frame is None:
+            metrics.stream_frames_total.inc(result="error")
+            return {"error": "Failed to decode frame", "invalid": True, "frame": number}
+
+        if self.models is None:
+            try:
+                self.models = MediaPipeModels(self.profile, tracking=True)
+            except Exception as e:
+                logger.error("❌ Tracking graphs unavailable for session %s: %s", self.session_id, e)
+                metrics.stream_frames_total.inc(result="error")
+                return {"error": "Analysis models unavailable", "busy": True, "frame": number}
+
+        try:
+            started = time.perf_counter()
+            with metrics.stage_seconds.time(stage="stream_frame"):
+                features = analyze_frame(frame, self.image_hash, self.models, self.profile)
+        except Exception as e:
+            logger.error("❌ Frame analysis failed for session %s: %s", self.session_id, e)
+            metrics.stream_frames_total.inc(result="error")
+            return {"error": f"Frame analysis failed: {e}", "frame": number}
+
+        elapsed = time.perf_counter() - started
+        self.cost = elapsed if self.cost is None else self.cost + COST_SMOOTHING * (elapsed - self.cost)
+        self.last_analysed = timestamp
+        self.analysed += 1
+        metrics.stream_frames_total.inc(result="analysed")
+
+        smoothed = self.smoother.update(features)
+        if smoothed == self.features:
+            # Steady features: look less often until something changes
+            self.backoff = min(self.backoff * 2, max(1, config.STREAM_MAX_BACKOFF))
+            return None
+        self.backoff = 1
+        self.features = smoothed
+        logger.info("🎥 Session %s features now %s (frame %s)", self.session_id, smoothed, number)
+        return {
+            "session_id": self.session_id,
+            "frame": number,
+            "timestamp": timestamp,
+            "features": dict(
+                smoothed,
+                image_hash=self.image_hash,
+                profile=self.profile.name,
+                confidence_scores=features["confidence_scores"],
+                measurements=features["measurements"]),
+        }
+
+    def stats(self):
+        return {
+            "session_id": self.session_id,
+            "profile": self.profile.name,
+            "frames": self.frames,
+            "analysed_frames": self.analysed,
+            "analysis_ms": round(self.cost * 1000, 1) if self.cost is not None else None,
+            "interval_ms": round(self.interval * 1000, 1),
+            "features": self.features,
+        }
+
+    def drop(self):
+        """Count a frame discarded before push(), e.g. superseded by a newer one"""
+        self._count_frame()
+        metrics.stream_frames_total.inc(result="skipped")
+
+    def close(self):
+        """Release the tracking graphs, waiting for a frame in progress; later pushes are refused"""
+        with self._lock:
+            self.closed = True
+            if self.models is not None:
+                self.models.close()
+                self.models = None
+
+
+class StreamSessions:
+    """Open sessions by id, at most max_sessions; sessions idle for idle_timeout seconds are closed"""
+
+    def __init__(self, max_sessions, idle_timeout):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _expire(self):
+        now = time.monotonic()
+        with self._lock:
+            idle = [s for s in self._sessions.values() if now - s.last_seen > self.idle_timeout]
+            for session in idle:
+                del self._sessions[session.session_id]
+        for session in idle:
+            logger.info("⌛ Closing idle stream session %s", session.session_id)
+            session.close()
+
+    def open(self, profile=None):
+        """Start a session; raises SessionLimitError when too many are open"""
+        self._expire()
+        session = StreamSession(profile)
+        with self._lock:
+            if len(self._sessions) >= self.max_sessions:
+                raise SessionLimitError(f"{self.max_sessions} stream sessions already open")
+            self._sessions[session.session_id] = session
+        logger.info("🎥 Opened stream session %s (%s profile)", session.session_id, session.profile.name)
+        return session
+
+    def get(self, session_id):
+        """The open session with this id, or None"""
+        self._expire()
+        return self._sessions.get(session_id)
+
+    def close(self, session_id):
+        """Close a session; returns its final stats, or None when it was not open"""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return None
+        session.close()
+        logger.info("🎬 Closed stream session %s after %s frame(s)", session_id, session.frames)
+        return session.stats()
+
+
+sessions = StreamSessions(config.STREAM_MAX_SESSIONS, config.STREAM_SESSION_TTL)
+
+metrics.Collected(
+    "fashion_stream_sessions", "Open video streaming sessions", "gauge",
+    lambda: [({}, len(sessions))])
+
+
+def iter_updates(frames, profile=None):
+    """Updates for a sequence of frames, yielded only when the smoothed features change.
+
+    frames holds BGR arrays or encoded images, optionally as (timestamp,
+    frame) pairs; iter_video_frames() produces such pairs from a video file
+    or camera.
+    """
+    session = StreamSession(profile)
+    try:
+        for item in frames:
+            timestamp, frame = item if isinstance(item, tuple) else (None, item)
+            update = session.push(frame, timestamp)
+            if update is not None:
+                yield update
+    finally:
+        session.close()
+
+
+def iter_video_frames(source):
+    """(timestamp, BGR frame) pairs from a video file path or camera index.
+
+    File frames are stamped with their position in the video, so frame
+    skipping follows video time; camera frames with the time they were read.
+    """
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise ValueError(f"Cannot open video source {source!r}")
+    live = isinstance(source, int)
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    try:
+        index = 0
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            yield (time.monotonic() if live else index / fps), frame
+            index += 1
+    finally:
+        capture.release()